@@ -0,0 +1,101 @@
+"""
+Benchmark del clasificador de categorias
+
+Latencia por pregunta de LinearCategoryModel contra transform + predict +
+predict_proba de sklearn, y comparacion de los modos de rasgos (TF-IDF y
+hashing de varios tamaños): exactitud con validacion cruzada estratificada,
+latencia y memoria del modelo entrenado con todos los datos. La paridad con
+sklearn se verifica en tests/test_category_model.py.
+
+Uso (desde la raiz del repositorio):
+    python -m benchmarks.bench_category_model
+"""
+
+import contextlib
+import io
+import pickle
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.chatbot.category_model import CLASSIFIER_PARAMS, LinearCategoryModel, build_vectorizer
+
+
+def _per_call(function, texts: List[str], repeat: int = 3) -> float:
+    """Mejor tiempo por llamada en microsegundos"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            function(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(texts) * 1e6
+
+
+def latency(texts: List[str], vectorizer, classifier) -> Dict:
+    """Microsegundos por pregunta de ambos caminos"""
+    model = LinearCategoryModel(vectorizer, classifier)
+
+    def sklearn_call(text):
+        X = vectorizer.transform([text])
+        classifier.predict(X)
+        classifier.predict_proba(X)
+
+    return {
+        "sklearn_us": round(_per_call(sklearn_call, texts), 1),
+        "linear_us": round(_per_call(model.predict, texts), 1)
+    }
+
+
+def compare_feature_modes(texts: List[str], labels: List[str], folds: int = 5,
+                          hashing_sizes: Tuple[int, ...] = (2 ** 12, 2 ** 14, 2 ** 18)) -> List[Dict]:
+    """Exactitud (validacion cruzada), latencia y memoria de cada modo de rasgos"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold
+
+    configurations = [("tfidf", None)] + [("hashing", size) for size in hashing_sizes]
+    splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    texts_array = np.array(texts, dtype=object)
+    labels_array = np.array(labels)
+
+    results = []
+    for feature_mode, n_features in configurations:
+        correct = 0
+        for train, test in splitter.split(texts_array, labels_array):
+            vectorizer, _ = build_vectorizer(feature_mode, n_features or 2 ** 14)
+            classifier = LogisticRegression(**CLASSIFIER_PARAMS)
+            classifier.fit(vectorizer.fit_transform(texts_array[train]), labels_array[train])
+            model = LinearCategoryModel(vectorizer, classifier)
+            correct += sum(model.predict(text)[0] == label
+                           for text, label in zip(texts_array[test], labels_array[test]))
+
+        vectorizer, _ = build_vectorizer(feature_mode, n_features or 2 ** 14)
+        classifier = LogisticRegression(**CLASSIFIER_PARAMS)
+        classifier.fit(vectorizer.fit_transform(texts), labels)
+
+        results.append({
+            "mode": feature_mode if n_features is None else f"hashing 2^{n_features.bit_length() - 1}",
+            "cv_accuracy": round(correct / len(texts), 4),
+            **latency(texts, vectorizer, classifier),
+            "vectorizer_bytes": len(pickle.dumps(vectorizer)),
+            "coef_bytes": classifier.coef_.nbytes
+        })
+
+    return results
+
+
+def main():
+    from src.chatbot.core import ChatBot
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot = ChatBot(use_spacy=False)
+
+    texts, labels, _ = chatbot._classifier_training_data()
+    print(f"{len(texts)} preguntas, modelo en uso: {latency(texts, chatbot.vectorizer, chatbot.classifier)}")
+    for result in compare_feature_modes(texts, labels):
+        print(f"   {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Micro-benchmark de QueryMatcher.normalize_text
+
+Compara la implementacion de referencia (cadena de str.replace y dos
+expresiones regulares, normalize_reference.py) contra la actual sin memo y
+con memo, sobre las preguntas, respuestas y sinónimos de la base incluida.
+
+Uso (desde la raiz del repositorio):
+    python -m benchmarks.bench_normalize [pasadas]
+"""
+
+import sys
+import time
+
+from benchmarks.normalize_reference import knowledge_texts, normalize_reference
+from src.chatbot.matcher import _normalize_cached
+
+
+def _timed(function, texts, passes: int) -> float:
+    started = time.perf_counter()
+    for _ in range(passes):
+        for text in texts:
+            function(text)
+    return time.perf_counter() - started
+
+
+def main(passes: int = 50):
+    texts = [text for text in knowledge_texts() if text]
+
+    # Sin memo: la funcion envuelta por lru_cache
+    uncached = _normalize_cached.__wrapped__
+
+    mismatches = sum(uncached(text) != normalize_reference(text) for text in texts)
+
+    reference = _timed(normalize_reference, texts, passes)
+    plain = _timed(uncached, texts, passes)
+    _normalize_cached.cache_clear()
+    memoized = _timed(_normalize_cached, texts, passes)
+
+    calls = passes * len(texts)
+    print(f"{len(texts)} textos x {passes} pasadas ({calls} llamadas), {mismatches} diferencias")
+    for name, seconds in (("referencia", reference), ("sin memo", plain), ("con memo", memoized)):
+        print(f"   {name:<11} {seconds:.3f}s  {seconds * 1e6 / calls:.2f} us/llamada  "
+              f"x{reference / seconds:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,99 @@
+"""
+Benchmark del tiempo de importacion (arranque)
+
+Mide con `python -X importtime` el costo de importar los modulos del
+chatbot en un proceso nuevo. "diferido" es el codigo actual (spaCy y
+scikit-learn se importan al usarse); "inmediato" importa antes lo que esos
+modulos importaban al cargarse (spacy, sklearn, sklearn.linear_model y
+sklearn.feature_extraction.text), como hacian antes de diferirlo. Se
+reporta el mejor de varias corridas, en milisegundos, y si spacy o sklearn
+quedaron cargados.
+
+Uso (desde la raiz del repositorio):
+    python -m benchmarks.bench_startup [corridas] [interprete]
+"""
+
+import importlib.util
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+MODULES = ["src.main", "src.chatbot.core", "src.chatbot.retrieval", "src.chatbot.category_model"]
+
+# Lo que core, retrieval y category_model importaban a nivel de modulo
+EAGER_IMPORTS = ["spacy", "sklearn", "sklearn.linear_model", "sklearn.feature_extraction.text"]
+
+HEAVY_PACKAGES = ("spacy", "sklearn")
+
+
+def _import_time(python: str, statements: List[str]) -> Tuple[float, set]:
+    """
+    Importa en un proceso nuevo y devuelve (milisegundos, paquetes cargados).
+    El tiempo es la suma de las importaciones de primer nivel (columna
+    cumulative de -X importtime), sin el arranque del interprete.
+    """
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", "; ".join(statements)],
+        capture_output=True, text=True, check=True
+    )
+
+    total_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part for part in line[len("import time:"):].split("|"))
+        package = name.strip().split(".")[0]
+        if package in HEAVY_PACKAGES:
+            loaded.add(package)
+        # Primer nivel: el nombre no tiene sangría extra
+        if name[1:2] != " ":
+            total_us += int(cumulative)
+    return total_us / 1000, loaded
+
+
+def _available(python: str, modules: List[str]) -> List[str]:
+    """Modulos instalados en el interprete dado"""
+    if python == sys.executable:
+        return [module for module in modules if importlib.util.find_spec(module.split(".")[0])]
+
+    check = "import importlib.util, sys; print(' '.join(m for m in sys.argv[1:] if importlib.util.find_spec(m.split('.')[0])))"
+    completed = subprocess.run([python, "-c", check, *modules], capture_output=True, text=True, check=True)
+    return completed.stdout.split()
+
+
+def measure(module: str, python: str, runs: int, eager: List[str]) -> Dict:
+    """Mejor tiempo de importacion del modulo, diferido e inmediato"""
+    results = {}
+    for label, statements in (("lazy", [f"import {module}"]),
+                              ("eager", [f"import {name}" for name in eager] + [f"import {module}"])):
+        best, loaded = min(_import_time(python, statements) for _ in range(runs))
+        results[label] = (best, loaded)
+    return results
+
+
+def main(runs: int = 3, python: str = sys.executable):
+    eager = _available(python, EAGER_IMPORTS)
+    print(f"Interprete: {python}")
+    print(f"Importaciones inmediatas simuladas: {', '.join(eager) or 'ninguna (no instaladas)'}")
+    print(f"{'modulo':<30}{'inmediato':>12}{'diferido':>12}{'mejora':>9}   cargados (diferido)")
+
+    for module in MODULES:
+        try:
+            results = measure(module, python, runs, eager)
+        except subprocess.CalledProcessError as e:
+            # p.ej. src.main sin FastAPI en un entorno solo con spaCy
+            error = e.stderr.strip().splitlines()[-1] if e.stderr.strip() else "error"
+            print(f"{module:<30}  no se pudo importar: {error}")
+            continue
+        eager_ms, _ = results["eager"]
+        lazy_ms, loaded = results["lazy"]
+        print(f"{module:<30}{eager_ms:>10.0f}ms{lazy_ms:>10.0f}ms{eager_ms / lazy_ms:>8.1f}x   "
+              f"{', '.join(sorted(loaded)) or '-'}")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 3,
+        sys.argv[2] if len(sys.argv) > 2 else sys.executable
+    )
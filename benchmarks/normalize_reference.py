@@ -0,0 +1,60 @@
+"""
+Referencias compartidas por tests/test_normalize.py y bench_normalize.py:
+la normalizacion original de QueryMatcher.normalize_text (cadena de
+str.replace y dos expresiones regulares) y los textos de la base incluida.
+"""
+
+import json
+import os
+import re
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def normalize_reference(text: str) -> str:
+    """QueryMatcher.normalize_text antes de la tabla de traduccion y el memo"""
+    if not text:
+        return ""
+
+    text = text.lower()
+
+    problematic_synonyms = {
+        "conseguir": "reservar",
+        "obtener": "reservar",
+        "tomar": "prestar"
+    }
+
+    for problematic, replacement in problematic_synonyms.items():
+        if problematic in text:
+            text = text.replace(problematic, replacement)
+
+    replacements = {
+        'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
+        'ü': 'u', 'ñ': 'n'
+    }
+    for old, new in replacements.items():
+        text = text.replace(old, new)
+
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+
+    return text
+
+
+def knowledge_texts():
+    """Preguntas, respuestas y sinónimos de la base incluida"""
+    texts = []
+    knowledge_path = os.path.join(ROOT, "knowledge")
+    for filename in sorted(os.listdir(knowledge_path)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(knowledge_path, filename), 'r', encoding='utf-8') as f:
+            for rule in json.load(f).values():
+                texts.extend(rule.get("preguntas", []))
+                texts.append(rule.get("respuesta", ""))
+
+    with open(os.path.join(ROOT, "synonyms", "synonyms.json"), 'r', encoding='utf-8') as f:
+        for word, synonym_list in json.load(f).items():
+            texts.append(word)
+            texts.extend(synonym_list)
+    return texts
@@ -1,16 +1,35 @@
+import asyncio
 import os
-from fastapi import APIRouter, HTTPException, Request, Response, Header
-from src.chatbot.core import ChatBot
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, Header
+from src.api.executor import QueueFullError
+from src.chatbot.answer_pool import AnswerPoolClosedError
 from src.models.schemas import ChatRequest, ChatResponse
 
 router = APIRouter(prefix="/chatbot", tags=["chatbot"])
-chatbot = ChatBot()
 
 ADMIN_TOKEN = os.environ.get("CHATBOT_ADMIN_TOKEN", "PassTest123")
 ENABLE_ADMIN_ENDPOINTS = os.environ.get("ENABLE_ADMIN", "true").lower() == "true"
 
+
+def get_chatbot(request: Request):
+    """ChatBot de la aplicación (create_app); 503 mientras se construye"""
+    chatbot = request.app.state.chatbot
+    if chatbot is None:
+        startup_error = request.app.state.startup_error
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "STARTUP_FAILED" if startup_error else "STARTING",
+                "message": startup_error or "El servicio se está iniciando. Intenta de nuevo en unos segundos."
+            },
+            headers={"Retry-After": "5"}
+        )
+    return chatbot
+
+
 @router.post("/query", response_model=ChatResponse)
-async def process_query(request: ChatRequest, response: Response, http_request: Request):
+async def process_query(request: ChatRequest, response: Response, http_request: Request,
+                        chatbot=Depends(get_chatbot)):
     """Endpoint principal para procesar preguntas del usuario"""
     
     # Validar session_id recibida por programa principal
@@ -24,8 +43,27 @@ async def process_query(request: ChatRequest, response: Response, http_request:
         )
 
     try:
-        # Validacion de id para sesion, 
-        result = chatbot.process_question(request.question, request.session_id)
+        # Validacion de id para sesion (el pipeline corre fuera del event loop)
+        try:
+            result = await http_request.app.state.executor.run(chatbot.process_question, request.question, request.session_id)
+        except QueueFullError:
+            raise HTTPException(
+                status_code=503,
+                detail={
+                    "error": "SERVER_BUSY",
+                    "message": "El servicio está ocupado. Intenta de nuevo en unos segundos."
+                },
+                headers={"Retry-After": "1"}
+            )
+        except AnswerPoolClosedError:
+            raise HTTPException(
+                status_code=503,
+                detail={
+                    "error": "SHUTTING_DOWN",
+                    "message": "El servicio se está deteniendo. Intenta de nuevo en unos segundos."
+                },
+                headers={"Retry-After": "5"}
+            )
         
         if result.get("error") == "missing_session_id":
             raise HTTPException(
@@ -61,6 +99,7 @@ async def process_query(request: ChatRequest, response: Response, http_request:
             confidence=result["confidence"],
             source=result["source"],
             entities=result["entities"],
+            alternatives=result.get("alternatives", []),
             session_id=result["session_id"]
         )
         
@@ -77,7 +116,7 @@ async def process_query(request: ChatRequest, response: Response, http_request:
 
 
 @router.get("/session/{session_id}")
-async def get_session_info(session_id: str):
+async def get_session_info(session_id: str, chatbot=Depends(get_chatbot)):
     """Recuperar informacion de la sesion"""
     
     session = chatbot.session_manager.get_session_summary(session_id)
@@ -93,7 +132,7 @@ async def get_session_info(session_id: str):
 
 
 @router.delete("/session/{session_id}")
-async def delete_session(session_id: str):
+async def delete_session(session_id: str, chatbot=Depends(get_chatbot)):
     """
     Eliminar sesion
     Para no depender exclusivamente de timeout
@@ -115,7 +154,7 @@ async def delete_session(session_id: str):
 
 
 @router.delete("/sessions/all")
-async def delete_all_sessions():
+async def delete_all_sessions(chatbot=Depends(get_chatbot)):
     """Borrado de todas las sesiones"""
     count = chatbot.session_manager.delete_all_sessions()
     return {
@@ -126,7 +165,7 @@ async def delete_all_sessions():
 
 
 @router.get("/stats")
-async def get_stats():
+async def get_stats(request: Request, chatbot=Depends(get_chatbot)):
     """Obtener las estadisticas de sesion"""
     active_sessions = chatbot.session_manager.get_active_sessions_count()
     
@@ -147,17 +186,25 @@ async def get_stats():
         },
         "rate_limit_stats": rate_limit_stats,
         "chatbot_mode": "spacy" if chatbot.use_spacy else "basic",
+        "retrieval_engine": chatbot.retrieval_engine,
+        "search_top_k": chatbot.search_top_k,
         "ml_classifier": {
             "enabled": chatbot.enable_ml_classifier,
             "ready": chatbot.ml_ready,
-            "threshold_rule": chatbot.ml_confidence_threshold,
-            "threshold_override": chatbot.ml_override_threshold
-        }
+            "training": chatbot.get_ml_training_status()
+        },
+        "answer_cache": chatbot.answer_cache.get_stats(),
+        "near_duplicate_cache": chatbot.get_near_duplicate_stats(),
+        "cascade": chatbot.get_cascade_stats(),
+        "warmup": chatbot.get_warmup_status(),
+        "executor": request.app.state.executor.get_stats(),
+        "answer_pool": chatbot.answer_pool.get_stats() if chatbot.answer_pool is not None else None
     }
 
 if ENABLE_ADMIN_ENDPOINTS:
     @router.post("/admin/reload")
-    async def reload_knowledge(admin_token: str = Header(None, alias="Admin-Token")):
+    async def reload_knowledge(admin_token: str = Header(None, alias="Admin-Token"),
+                               chatbot=Depends(get_chatbot)):
         """
         Recarga la base de conocimiento sin reiniciar el servicio.
         
@@ -174,8 +221,13 @@ if ENABLE_ADMIN_ENDPOINTS:
             )
         
         try:
-            # Recargar recursos
-            chatbot.load_resources()
+            # Recargar recursos fuera del event loop; las consultas siguen con
+            # la base anterior hasta que la nueva se publica
+            await asyncio.get_running_loop().run_in_executor(None, chatbot.load_resources)
+            
+            # El clasificador se reentrena en segundo plano; mientras tanto
+            # las consultas siguen usando el modelo anterior
+            ml_training = chatbot.retrain_classifier_async()
             
             # Obtener estadísticas actualizadas
             categories_info = {}
@@ -188,7 +240,8 @@ if ENABLE_ADMIN_ENDPOINTS:
                 "status": "success",
                 "message": "Base de conocimiento recargada correctamente",
                 "rules_loaded": categories_info,
-                "synonyms_loaded": len(chatbot.matcher.synonyms) if hasattr(chatbot.matcher, 'synonyms') else 0
+                "synonyms_loaded": len(chatbot.matcher.synonyms) if hasattr(chatbot.matcher, 'synonyms') else 0,
+                "ml_training": ml_training
             }
             
         except Exception as e:
@@ -201,11 +254,42 @@ if ENABLE_ADMIN_ENDPOINTS:
             )
 
 @router.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Endpoint para validar comunicacion"""
+    chatbot = request.app.state.chatbot
+    if chatbot is None:
+        return {
+            "status": "starting",
+            "service": "library_chatbot",
+            "session_count": 0,
+            "mode": None
+        }
     return {
         "status": "healthy",
         "service": "library_chatbot",
         "session_count": chatbot.session_manager.get_active_sessions_count(),
         "mode": "spacy" if chatbot.use_spacy else "basic"
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/ready")
+async def readiness_check(request: Request, response: Response):
+    """
+    Listo para recibir tráfico: componentes cargados y calentamiento
+    terminado. Responde 503 mientras no lo esté (a diferencia de /health)
+    """
+    chatbot = request.app.state.chatbot
+    if chatbot is None:
+        startup_error = request.app.state.startup_error
+        readiness = {
+            "ready": False,
+            "components": {"chatbot": "failed" if startup_error else "starting"},
+            "error": startup_error
+        }
+    else:
+        readiness = chatbot.get_readiness()
+        readiness["components"] = {"chatbot": "ready", **readiness["components"]}
+
+    if not readiness["ready"]:
+        response.status_code = 503
+    return readiness
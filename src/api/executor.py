@@ -0,0 +1,131 @@
+"""
+Ejecución del pipeline fuera del event loop
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+class QueueFullError(Exception):
+    """No hay lugar en la cola del executor"""
+
+
+class QueryExecutor:
+    """
+    Corre las llamadas sincronas (process_question) en un pool de hilos
+    acotado para que el event loop siga atendiendo otras solicitudes.
+
+    Modos:
+        inline  - en el event loop (comportamiento anterior)
+        thread  - en el pool de hilos
+        process - en el pool de hilos; el ChatBot calcula la respuesta en
+                  procesos hijos (ChatBot.enable_answer_pool)
+
+    Si ya hay max_queue llamadas esperando un hilo libre, las nuevas se
+    rechazan con QueueFullError en lugar de acumularse.
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = 4, max_queue: int = 32):
+        """
+        Args:
+            mode: Uno de EXECUTION_MODES
+            max_workers: Hilos del pool (y procesos en modo 'process')
+            max_queue: Llamadas que pueden esperar un hilo libre
+        """
+        if mode not in EXECUTION_MODES:
+            print(f"⚠️  Modo de ejecución desconocido '{mode}', usando 'thread'")
+            mode = "thread"
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pool = None
+        if mode != "inline":
+            self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chatbot-query")
+
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Ejecuta func(*args) según el modo y devuelve su resultado
+
+        Raises:
+            QueueFullError: Si la cola está llena
+        """
+        if self.pool is None:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._finished(0.0, time.perf_counter() - started)
+
+        with self.lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(f"{self.queued} consultas en espera")
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            try:
+                return func(*args)
+            finally:
+                with self.lock:
+                    self.running -= 1
+                self._finished(started - submitted, time.perf_counter() - started)
+
+        future = self.pool.submit(task)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Solicitud cancelada antes de empezar: ya no ocupa la cola
+            if future.cancel():
+                with self.lock:
+                    self.queued -= 1
+            raise
+
+    def _finished(self, waited: float, ran: float):
+        with self.lock:
+            self.completed += 1
+            self.wait_seconds += waited
+            self.run_seconds += ran
+
+    def shutdown(self):
+        """Esperar las llamadas en curso y detener el pool"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        """Profundidad de cola y tiempos (en milisegundos)"""
+        with self.lock:
+            completed = self.completed
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "max_queue_depth": self.max_queued,
+                "completed": completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_seconds * 1000 / completed, 3) if completed else 0.0,
+                "avg_run_ms": round(self.run_seconds * 1000 / completed, 3) if completed else 0.0
+            }
@@ -0,0 +1,112 @@
+"""
+Cache de respuestas para asistente virtual
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+class AnswerCache:
+    """Cache LRU con expiracion (TTL) en memoria."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 600):
+        """
+        Inicializar cache.
+
+        Args:
+            max_size: Numero maximo de entradas (se desaloja la menos usada)
+            ttl_seconds: Vigencia de cada entrada (segundos)
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        # Formato: {key: (timestamp, value)}
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Cada vaciado incrementa la generacion; los resultados calculados
+        # antes de un vaciado ya no se guardan
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.flushes = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Obtener una entrada vigente o None"""
+        return self.get_any([key])
+
+    def get_any(self, keys: Iterable[Hashable]) -> Optional[Any]:
+        """
+        Obtener la primera entrada vigente entre varias llaves candidatas.
+        Cuenta como un solo acierto o fallo.
+        """
+        now = time.time()
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is None:
+                    continue
+
+                timestamp, value = entry
+                if now - timestamp > self.ttl_seconds:
+                    del self.entries[key]
+                    self.expirations += 1
+                    continue
+
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> bool:
+        """
+        Guardar una entrada.
+
+        Args:
+            generation: Generacion observada al iniciar el calculo; si la cache
+                se vació desde entonces, el valor se descarta
+        """
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return False
+
+            self.entries[key] = (time.time(), value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+            return True
+
+    def clear(self) -> int:
+        """Vaciar la cache de forma atomica"""
+        with self.lock:
+            count = len(self.entries)
+            self.entries = OrderedDict()
+            self.generation += 1
+            self.flushes += 1
+            return count
+
+    def get_stats(self) -> Dict:
+        """Estadisticas de uso"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "flushes": self.flushes
+            }
@@ -0,0 +1,217 @@
+"""
+Pool de procesos para el pipeline de respuesta
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from .cascade import CascadeMetrics
+from .rwlock import ReadWriteLock
+
+# ChatBot de los procesos hijos: se hereda del padre al hacer fork
+_worker_chatbot = None
+
+# Contadores de NearDuplicateCache.get_stats que se suman entre procesos hijos
+_NEAR_DUPLICATE_COUNTERS = ("hits", "misses", "searches_saved", "evictions")
+
+
+class AnswerPoolClosedError(Exception):
+    """El pool de procesos ya se detuvo (p.ej. durante el apagado)"""
+
+
+def _init_worker():
+    """
+    Inicializador de cada proceso hijo. Los locks se copian tal como estaban
+    en el padre (posiblemente tomados por otro hilo), así que se reemplazan
+    los que usa el pipeline.
+    """
+    chatbot = _worker_chatbot
+    chatbot.near_duplicate_cache.lock = threading.Lock()
+    chatbot.cascade_metrics.lock = threading.Lock()
+    chatbot.resources_lock = ReadWriteLock()
+
+
+def _worker_pid() -> int:
+    return os.getpid()
+
+
+def _answer(question: str, question_for_processing: str, context_category: Optional[str]):
+    """Decision y estadisticas acumuladas del proceso hijo"""
+    chatbot = _worker_chatbot
+    decision = chatbot._answer_question(question, question_for_processing, context_category)
+    return (
+        decision,
+        os.getpid(),
+        chatbot.cascade_metrics.snapshot(),
+        chatbot.near_duplicate_cache.get_stats()
+    )
+
+
+class AnswerProcessPool:
+    """
+    Ejecuta ChatBot._answer_question en procesos hijos para que varias
+    preguntas se calculen en paralelo (sin el GIL).
+
+    Sesiones, rate limiting y cache de respuestas se quedan en el proceso
+    principal; los hijos solo calculan la decision. Los hijos se crean con
+    fork y comparten (copy-on-write) la base y los modelos ya cargados; tras
+    recargar la base o reentrenar el clasificador se reinicia el pool para
+    que vean el estado nuevo.
+
+    Si el pool se crea dentro de un event loop, los fork se hacen siempre en
+    el hilo de ese loop: un reinicio pedido desde otro hilo (recarga,
+    reentrenamiento) se programa en el loop en lugar de hacer fork desde un
+    hilo que puede estar en medio de una operacion con locks tomados.
+
+    Las métricas de la cascada y de la cache de casi duplicados se registran
+    en los hijos; cada respuesta trae las acumuladas de su proceso y
+    get_cascade_stats / get_near_duplicate_stats las suman.
+    """
+
+    def __init__(self, chatbot, workers: int = 2):
+        """
+        Args:
+            chatbot: ChatBot ya inicializado
+            workers: Numero de procesos hijos
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ValueError("El pool de procesos requiere el método de inicio 'fork'")
+
+        self.chatbot = chatbot
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.closed = False
+
+        try:
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+
+        # Formato: {pid: (generacion, snapshot de la cascada, stats de casi duplicados)}
+        self.worker_stats: Dict[int, tuple] = {}
+
+        self._restart()
+
+    def restart(self):
+        """
+        Reemplaza los procesos hijos por unos con el estado actual del ChatBot.
+        Llamado fuera del hilo del event loop, el reinicio se programa en el loop.
+        """
+        loop = self.loop
+        if loop is not None:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+
+            if running is not loop:
+                try:
+                    loop.call_soon_threadsafe(self._restart)
+                except RuntimeError:
+                    # Loop cerrado: la aplicación se está apagando
+                    pass
+                return
+
+        self._restart()
+
+    def _restart(self):
+        global _worker_chatbot
+
+        with self.lock:
+            if self.closed:
+                return
+
+            _worker_chatbot = self.chatbot
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker
+            )
+            # Con fork todos los hijos se crean en la primera tarea: crearlos ya
+            executor.submit(_worker_pid).result()
+
+            previous, self.executor = self.executor, executor
+            self.restarts += 1
+
+        # Las preguntas en curso terminan con los procesos anteriores
+        if previous is not None:
+            previous.shutdown(wait=False)
+
+    def answer(self, question: str, question_for_processing: str,
+               context_category: Optional[str] = None) -> Dict:
+        """
+        Decision de ChatBot._answer_question calculada en un proceso hijo
+
+        Raises:
+            AnswerPoolClosedError: Si el pool ya se detuvo
+        """
+        future = None
+        for _ in range(2):
+            executor = self.executor
+            if executor is None:
+                raise AnswerPoolClosedError("El pool de procesos está detenido")
+            try:
+                future = executor.submit(_answer, question, question_for_processing, context_category)
+                break
+            except RuntimeError:
+                # El pool se reemplazó (o se detuvo) entre la lectura y el envío
+                continue
+        if future is None:
+            raise AnswerPoolClosedError("El pool de procesos está detenido")
+
+        decision, pid, cascade, near_duplicate = future.result()
+        with self.lock:
+            self.worker_stats[pid] = (self.restarts, cascade, near_duplicate)
+        return decision
+
+    def shutdown(self):
+        """Detener los procesos hijos"""
+        with self.lock:
+            self.closed = True
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def get_cascade_stats(self) -> Dict:
+        """Métricas de la cascada sumadas de todos los procesos hijos (incluidos los reemplazados)"""
+        metrics = CascadeMetrics()
+        with self.lock:
+            snapshots = [cascade for _, cascade, _ in self.worker_stats.values()]
+        for snapshot in snapshots:
+            metrics.merge(snapshot)
+        return metrics.get_stats()
+
+    def get_near_duplicate_stats(self) -> Dict:
+        """
+        Estadisticas de la cache de casi duplicados de los procesos hijos:
+        contadores sumados de todos y tamaño de los procesos actuales (las
+        recargas, flushes, se cuentan en el proceso principal)
+        """
+        stats = dict(self.chatbot.near_duplicate_cache.get_stats())
+        for counter in _NEAR_DUPLICATE_COUNTERS + ("size",):
+            stats[counter] = 0
+
+        with self.lock:
+            current = self.restarts
+            workers: List[tuple] = list(self.worker_stats.values())
+        for generation, _, near_duplicate in workers:
+            for counter in _NEAR_DUPLICATE_COUNTERS:
+                stats[counter] += near_duplicate[counter]
+            if generation == current:
+                stats["size"] += near_duplicate["size"]
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def get_stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "restarts": self.restarts
+        }
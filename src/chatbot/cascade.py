@@ -0,0 +1,88 @@
+"""
+Metricas de la cascada de respuesta (etapas con salida temprana)
+"""
+
+import threading
+import time
+from typing import Dict
+
+# Orden de las etapas del pipeline
+CASCADE_STAGES = ("exact", "keyword", "token", "priors", "global")
+
+
+class CascadeMetrics:
+    """
+    Cuenta, por etapa, cuantas veces se ejecuto, cuantas veces decidio
+    (supero su umbral) y el tiempo acumulado; y en que etapa termino
+    cada pregunta.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reiniciar contadores"""
+        with self.lock:
+            self.runs = {stage: 0 for stage in CASCADE_STAGES}
+            self.decided = {stage: 0 for stage in CASCADE_STAGES}
+            self.seconds = {stage: 0.0 for stage in CASCADE_STAGES}
+            self.exits = {stage: 0 for stage in CASCADE_STAGES}
+
+    def record(self, stage: str, started: float, decided: bool) -> bool:
+        """
+        Registra una ejecucion de la etapa
+
+        Args:
+            started: time.perf_counter() al iniciar la etapa
+            decided: Si la etapa supero su umbral
+
+        Returns:
+            decided (para usarlo directamente en la condicion de salida)
+        """
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.runs[stage] += 1
+            self.seconds[stage] += elapsed
+            if decided:
+                self.decided[stage] += 1
+        return decided
+
+    def record_exit(self, stage: str):
+        """Etapa en la que termino una pregunta"""
+        with self.lock:
+            self.exits[stage] += 1
+
+    def snapshot(self) -> Dict:
+        """Contadores sin procesar (para sumarlos con merge en otro proceso)"""
+        with self.lock:
+            return {
+                "runs": dict(self.runs),
+                "decided": dict(self.decided),
+                "seconds": dict(self.seconds),
+                "exits": dict(self.exits)
+            }
+
+    def merge(self, snapshot: Dict):
+        """Suma los contadores de un snapshot (p.ej. de un proceso hijo)"""
+        with self.lock:
+            for name in ("runs", "decided", "seconds", "exits"):
+                counters = getattr(self, name)
+                for stage, value in snapshot[name].items():
+                    counters[stage] += value
+
+    def get_stats(self) -> Dict:
+        """Estadisticas por etapa (tiempos en milisegundos)"""
+        with self.lock:
+            total = sum(self.exits.values())
+            stages = {}
+            for stage in CASCADE_STAGES:
+                runs = self.runs[stage]
+                stages[stage] = {
+                    "runs": runs,
+                    "decided": self.decided[stage],
+                    "exits": self.exits[stage],
+                    "total_ms": round(self.seconds[stage] * 1000, 3),
+                    "avg_ms": round(self.seconds[stage] * 1000 / runs, 3) if runs else 0.0
+                }
+            return {"questions": total, "stages": stages}
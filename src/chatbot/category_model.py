@@ -0,0 +1,244 @@
+"""
+Clasificadores de categorias y de reglas, y sus vectorizadores
+
+LinearCategoryModel predice con el vocabulario, los idf, los coeficientes y
+las clases de un LogisticRegression ya entrenado: un producto punto sobre los
+n-gramas de la pregunta mas softmax (o sigmoide en el caso binario). scikit-learn
+se importa al construir o entrenar un modelo, no al importar este modulo.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+FEATURE_MODES = ("tfidf", "hashing")
+
+CLASSIFIER_PARAMS = {
+    "max_iter": 1000,
+    "random_state": 42,
+    "class_weight": 'balanced'
+}
+
+
+def build_vectorizer(feature_mode: str = "tfidf", n_features: int = 2 ** 14) -> Tuple[object, Dict]:
+    """
+    Vectorizador (sin entrenar) del clasificador y sus parametros.
+
+    Args:
+        feature_mode: "tfidf" (vocabulario + idf aprendidos) o "hashing"
+            (sin estado: espacio de rasgos de tamaño fijo, nada que aprender)
+        n_features: Tamaño del espacio de rasgos en modo hashing
+
+    Returns:
+        (vectorizer, parametros) - los parametros forman parte de la llave
+        de los artefactos guardados
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+    if feature_mode == "hashing":
+        params = {
+            "analyzer": 'char_wb',
+            "ngram_range": (3, 5),
+            "n_features": n_features,
+            "alternate_sign": False,
+            "norm": 'l2'
+        }
+        return HashingVectorizer(**params), params
+
+    params = {
+        "analyzer": 'char_wb',
+        "ngram_range": (3, 5),
+        "max_features": 800,
+        "sublinear_tf": True
+    }
+    return TfidfVectorizer(**params), params
+
+
+class LinearCategoryModel:
+    """Par (vectorizer, classifier) entrenado, con prediccion en una sola llamada"""
+
+    def __init__(self, vectorizer, classifier):
+        """
+        Args:
+            vectorizer: TfidfVectorizer (u otro vectorizador de sklearn) ya entrenado
+            classifier: LogisticRegression ya entrenado
+        """
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+        # Modelo de reglas que comparte el vectorizer (opcional, ver RuleModel)
+        self.rule_model = None
+
+        self.classes = classifier.classes_
+        # (n_clases, n_rasgos); en el caso binario una sola fila
+        self.coef = np.asarray(classifier.coef_, dtype=np.float64)
+        self.intercept = np.asarray(classifier.intercept_, dtype=np.float64)
+        self.binary = len(self.classes) <= 2
+        # Versiones anteriores de sklearn permiten uno-contra-todos en multiclase
+        self.ovr = getattr(classifier, "multi_class", "auto") == "ovr"
+
+        # Rutas rapidas: TF-IDF (vocabulario explicito) y hashing con murmurhash
+        self.vocabulary = getattr(vectorizer, "vocabulary_", None)
+        self.hashing = isinstance(vectorizer, HashingVectorizer)
+        self.fast_path = self.hashing or (self.vocabulary is not None and hasattr(vectorizer, "idf_"))
+        if self.fast_path:
+            self.analyzer = vectorizer.build_analyzer()
+            self.binary_tf = vectorizer.binary
+            self.norm = vectorizer.norm
+            if self.hashing:
+                from sklearn.utils import murmurhash3_32
+
+                self.murmurhash = murmurhash3_32
+                self.n_features = vectorizer.n_features
+                self.alternate_sign = vectorizer.alternate_sign
+                self.idf = None
+                self.sublinear_tf = False
+            else:
+                self.idf = vectorizer.idf_ if vectorizer.use_idf else None
+                self.sublinear_tf = vectorizer.sublinear_tf
+
+    def features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices (ordenados) y pesos de los rasgos presentes en el texto"""
+        if self.hashing:
+            counts = self._hashed_counts(text)
+        else:
+            counts: Dict[int, int] = {}
+            vocabulary = self.vocabulary
+            for ngram in self.analyzer(text):
+                index = vocabulary.get(ngram)
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+
+        if not counts:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+        indices = np.fromiter(sorted(counts), dtype=np.intp, count=len(counts))
+        values = np.array([counts[index] for index in indices], dtype=np.float64)
+
+        if self.binary_tf:
+            values[:] = 1.0
+        if self.sublinear_tf:
+            np.log(values, values)
+            values += 1.0
+        if self.idf is not None:
+            values *= self.idf[indices]
+
+        if self.norm == "l2":
+            norm = np.sqrt(np.dot(values, values))
+            if norm > 0:
+                values /= norm
+        elif self.norm == "l1":
+            norm = np.abs(values).sum()
+            if norm > 0:
+                values /= norm
+
+        return indices, values
+
+    def _hashed_counts(self, text: str) -> Dict[int, int]:
+        """Conteos por columna como FeatureHasher (murmurhash3 con semilla 0)"""
+        counts: Dict[int, int] = {}
+        n_features = self.n_features
+        murmurhash = self.murmurhash
+        for ngram in self.analyzer(text):
+            hashed = murmurhash(ngram, seed=0)
+            if hashed == -2147483648:
+                index = (2147483647 - (n_features - 1)) % n_features
+            else:
+                index = abs(hashed) % n_features
+            value = -1 if self.alternate_sign and hashed < 0 else 1
+            counts[index] = counts.get(index, 0) + value
+        # Las colisiones con signo opuesto se cancelan (como sum_duplicates)
+        return {index: count for index, count in counts.items() if count != 0}
+
+    def decision_function(self, text: str) -> np.ndarray:
+        """Puntaje lineal por clase (una sola fila en el caso binario)"""
+        if self.fast_path:
+            indices, values = self.features(text)
+            return self.coef[:, indices] @ values + self.intercept
+
+        # Vectorizador generico: transform y producto disperso
+        row = self.vectorizer.transform([text]).tocsr()
+        return self.coef[:, row.indices] @ row.data + self.intercept
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Probabilidad por clase, en el orden de self.classes"""
+        scores = self.decision_function(text)
+
+        if self.binary:
+            positive = 1.0 / (1.0 + np.exp(-scores[0]))
+            return np.array([1.0 - positive, positive])
+
+        if self.ovr:
+            probabilities = 1.0 / (1.0 + np.exp(-scores))
+            return probabilities / probabilities.sum()
+
+        # Softmax estable
+        exp_scores = np.exp(scores - scores.max())
+        return exp_scores / exp_scores.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Returns:
+            (categoria, probabilidad de esa categoria)
+        """
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.classes[best], float(probabilities[best])
+
+
+class RuleModel(LinearCategoryModel):
+    """
+    Clasificador entrenado con las mismas preguntas pero con la regla como
+    etiqueta: propone las k reglas mas probables para puntuar solo esas.
+    """
+
+    def __init__(self, vectorizer, classifier, rule_labels: List[Tuple[str, str]]):
+        """
+        Args:
+            classifier: LogisticRegression cuyas clases son indices de rule_labels
+            rule_labels: [(categoria, rule_id), ...]
+        """
+        super().__init__(vectorizer, classifier)
+        self.rule_labels = [rule_labels[index] for index in self.classes]
+
+        # Columnas de probabilidad de cada categoria, para restringir el top-k
+        category_columns: Dict[str, List[int]] = {}
+        for column, (category, _) in enumerate(self.rule_labels):
+            category_columns.setdefault(category, []).append(column)
+        self.category_columns = {
+            category: np.array(columns, dtype=np.intp)
+            for category, columns in category_columns.items()
+        }
+
+    def top_k(self, text: str, k: int = 5, category: str = None) -> List[Tuple[str, str, float]]:
+        """
+        Reglas mas probables para el texto
+
+        Args:
+            category: Considerar solo las reglas de esta categoria (opcional)
+
+        Returns:
+            [(categoria, rule_id, probabilidad), ...] de mayor a menor
+        """
+        probabilities = self.predict_proba(text)
+
+        if category is None:
+            columns = np.arange(len(probabilities))
+        else:
+            columns = self.category_columns.get(category)
+            if columns is None:
+                return []
+
+        k = min(k, len(columns))
+        if k <= 0:
+            return []
+
+        column_probabilities = probabilities[columns]
+        top = np.argpartition(-column_probabilities, k - 1)[:k]
+        top = top[np.argsort(-column_probabilities[top], kind='stable')]
+
+        return [
+            (*self.rule_labels[columns[index]], float(column_probabilities[index]))
+            for index in top
+        ]
@@ -1,50 +1,152 @@
+import hashlib
+import heapq
+import importlib.util
 import json
 import os
+import threading
+import time
+from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from .session_manager import SessionManager
 from .rate_limiter import RateLimiter, TieredRateLimiter
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-import pickle  # optional, if you want to save/load model later
+import pickle
 
-# Intentar importar Spacy, pero tener fallback
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-    print("✅ Spacy disponible")
-except ImportError:
-    SPACY_AVAILABLE = False
-    print("⚠️  Spacy no disponible, usando sistema básico")
+# Spacy y scikit-learn son pesados: se importan al usarlos (modo Spacy,
+# entrenamiento del clasificador, motor tfidf), no al importar este modulo
+SPACY_AVAILABLE = importlib.util.find_spec("spacy") is not None
 
+from .answer_cache import AnswerCache
+from .answer_pool import AnswerProcessPool
+from .cascade import CascadeMetrics
+from .category_model import CLASSIFIER_PARAMS, FEATURE_MODES, LinearCategoryModel, RuleModel, build_vectorizer
+from .keyword_automaton import KeywordAutomaton
 from .knowledge_base import KnowledgeBase
 from .matcher import QueryMatcher
+from .near_duplicate import NearDuplicateCache
+from .query_analysis import QueryAnalysis
+from .retrieval import TfidfRetriever
+from .rwlock import ReadWriteLock
 
 class ChatBot:
-    def __init__(self, knowledge_path: str = "knowledge/", synonyms_path: str = "synonyms/", use_spacy: bool = True):
+    def __init__(self, knowledge_path: str = "knowledge/", synonyms_path: str = "synonyms/", use_spacy: bool = True,
+                 retrieval_engine: str = "fuzzy"):
 
         self.knowledge_base = KnowledgeBase(knowledge_path)
         self.matcher = QueryMatcher(synonyms_path)
         self.use_spacy = use_spacy and SPACY_AVAILABLE
 
+        # Motor de busqueda: "fuzzy" (Jaccard + similitud textual por frase) o "tfidf" (matriz dispersa)
+        if retrieval_engine not in ("fuzzy", "tfidf"):
+            print(f"⚠️  Motor de busqueda desconocido '{retrieval_engine}', usando 'fuzzy'")
+            retrieval_engine = "fuzzy"
+        self.retrieval_engine = retrieval_engine
+        self.retriever = TfidfRetriever()
+
         fallback_threshold: float = 0.25
         log_low_confidence: bool = False
         low_confidence_log_path: str = "logs/low_confidence_queries.log"
 
-        enable_ml_classifier: bool = True
-        ml_confidence_threshold: float = 0.35   # Rule confidence below this triggers ML
-        ml_override_threshold: float = 0.65 
+        enable_ml_classifier: bool = True       # Sus probabilidades son los priors de la busqueda global
+        ml_model_dir: str = "models/"           # Artefactos entrenados ("" desactiva la persistencia)
+        ml_feature_mode: str = "tfidf"          # "tfidf" o "hashing" (sin vocabulario, tamaño fijo)
+        ml_hashing_features: int = 2 ** 14
+        ml_rule_model: bool = True              # Modelo de reglas: la busqueda global puntua solo su top-k
+        ml_rule_top_k: int = 5
+        ml_rule_min_rules: int = 100            # Con menos reglas en total no se entrena (la poda basta)
+
+        # Busqueda global: respuesta y alternativas (las k reglas con mejor puntaje ponderado)
+        search_top_k: int = 3
+
+        # Cache de respuestas por pregunta normalizada (0 desactiva)
+        answer_cache_size: int = 1024
+        answer_cache_ttl: int = 600             # segundos
+
+        # Cache de consultas casi duplicadas por categoria (0 desactiva)
+        near_duplicate_size: int = 2048
+        near_duplicate_threshold: float = 0.85  # Similitud de Jaccard estimada (shingles de 3 caracteres)
+
+        # Cascada con salida temprana: exacta -> palabra exclusiva -> cotas de tokens -> difusa -> ML
+        enable_cascade: bool = True
+
+        # Preguntas de calentamiento (ver warmup): redactadas distinto a la base
+        # para que recorran la cascada completa y no solo la coincidencia exacta
+        warmup_questions: List[str] = [
+            "¿a que hora abre la biblioteca el sabado?",
+            "me cobran algo si entrego tarde un libro",
+            "necesito usar una computadora para imprimir",
+            "quiero apartar un cubiculo para mi equipo",
+            "¿que cosas sabes hacer?"
+        ]
 
         self.enable_ml_classifier = enable_ml_classifier
-        self.ml_confidence_threshold = ml_confidence_threshold
-        self.ml_override_threshold = ml_override_threshold
+        self.ml_model_dir = ml_model_dir
+        
+        if ml_feature_mode not in FEATURE_MODES:
+            print(f"⚠️  Modo de rasgos desconocido '{ml_feature_mode}', usando 'tfidf'")
+            ml_feature_mode = "tfidf"
+        self.ml_feature_mode = ml_feature_mode
+        self.ml_hashing_features = ml_hashing_features
+        self.ml_rule_model = ml_rule_model
+        self.ml_rule_top_k = ml_rule_top_k
+        self.ml_rule_min_rules = ml_rule_min_rules
+        self.search_top_k = max(1, search_top_k)
 
         self.vectorizer = None
         self.classifier = None
+        # Modelo en uso (LinearCategoryModel con su vectorizer y classifier);
+        # se reemplaza completo al reentrenar
+        self.ml_model = None
         self.ml_ready = False
+        
+        # Reentrenamiento en segundo plano (ver retrain_classifier_async)
+        self.ml_training_lock = threading.Lock()
+        self.ml_status_lock = threading.Lock()
+        self.ml_training_thread = None
+        self.ml_retrain_pending = False
+        self.ml_training_status = {
+            "state": "idle",
+            "source": None,
+            "examples": 0,
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "error": None
+        }
 
         self.debug_mode = False
 
+        self.answer_cache_enabled = answer_cache_size > 0
+        self.answer_cache = AnswerCache(max_size=answer_cache_size, ttl_seconds=answer_cache_ttl)
+
+        self.near_duplicate_enabled = near_duplicate_size > 0
+        self.near_duplicate_cache = NearDuplicateCache(
+            threshold=near_duplicate_threshold,
+            max_size=near_duplicate_size
+        )
+
+        self.enable_cascade = enable_cascade
+        self.cascade_metrics = CascadeMetrics()
+        self._exact_entities = {}
+
+        self.warmup_questions = warmup_questions
+        self.warmup_status = {
+            "state": "pending",
+            "questions": 0,
+            "started_at": None,
+            "finished_at": None,
+            "duration_seconds": None,
+            "slowest_ms": None,
+            "error": None
+        }
+
+        # Pool de procesos para _answer_question (ver enable_answer_pool)
+        self.answer_pool = None
+
+        # Las consultas leen la base, el indice y las tablas derivadas con el
+        # lock de lectura; load_resources los reemplaza con el de escritura
+        self.resources_lock = ReadWriteLock()
+
         #Initialize session manager
         self.session_manager = SessionManager(session_timeout=1800)
 
@@ -58,20 +160,9 @@ class ChatBot:
         # Inicializar Spacy si está disponible
         if self.use_spacy:
             self._init_spacy()
+        elif use_spacy:
+            print("⚠️  Spacy no disponible, usando sistema básico")
         
-        self.load_resources()
-        
-        self.fallback_threshold = fallback_threshold
-        self.log_low_confidence = log_low_confidence
-        self.low_confidence_log_path = low_confidence_log_path
-        
-        if self.enable_ml_classifier:
-            self._train_classifier()
-        
-        # Crear directorio de logs si está habilitado
-        if self.log_low_confidence:
-            os.makedirs(os.path.dirname(low_confidence_log_path), exist_ok=True)
-
         # Configuracion de categorias
         self.category_keywords = {
             "books": {
@@ -114,10 +205,24 @@ class ChatBot:
                 "exclusivas": ["biblio", "asistente", "qué haces", "quién eres"]
             }
         }
+        
+        self.load_resources()
+        
+        self.fallback_threshold = fallback_threshold
+        self.log_low_confidence = log_low_confidence
+        self.low_confidence_log_path = low_confidence_log_path
+        
+        if self.enable_ml_classifier:
+            self._train_classifier()
+        
+        # Crear directorio de logs si está habilitado
+        if self.log_low_confidence:
+            os.makedirs(os.path.dirname(low_confidence_log_path), exist_ok=True)
     
     def _init_spacy(self):
         """Inicializa Spacy si está disponible"""
         try:
+            import spacy
             
             self.nlp = spacy.load("es_core_news_sm")
             print("✅ Spacy inicializado con modelo 'es_core_news_sm'")
@@ -181,48 +286,254 @@ class ChatBot:
             return []
         
         try:
-            doc = self.nlp(text)
-            lemmas = []
-            
-            for token in doc:
-                # Filtrar stop words, puntuación y espacios
-                if not token.is_stop and not token.is_punct and not token.is_space:
-                    lemma = token.lemma_.lower().strip()
-                    if lemma and len(lemma) > 2:
-                        lemmas.append(lemma)
-            
-            return lemmas
+            return self._lemmas_from_doc(self.nlp(text))
             
         except Exception as e:
             print(f"⚠️  Error en extract_lemmas_spacy: {e}")
             return []
     
-    def categorize_question(self, question: str, context_category: str = None) -> Tuple[str, float]:
+    def _lemmas_from_doc(self, doc) -> List[str]:
+        """Lemas de un documento Spacy ya procesado"""
+        lemmas = []
+        
+        for token in doc:
+            # Filtrar stop words, puntuación y espacios
+            if not token.is_stop and not token.is_punct and not token.is_space:
+                lemma = token.lemma_.lower().strip()
+                if lemma and len(lemma) > 2:
+                    lemmas.append(lemma)
+        
+        return lemmas
+    
+    def _cache_phrase_lemmas(self, knowledge_base: KnowledgeBase, matcher: QueryMatcher):
+        """
+        Lematiza una sola vez (en lote con nlp.pipe) todas las preguntas de la
+        base de conocimiento y guarda los lemas junto a la frase compilada.
+        Los lemas también se agregan al indice invertido.
+        """
+        if not self.use_spacy or not hasattr(self, 'nlp'):
+            return
+        
+        entries = []
+        for category, rules in knowledge_base.compiled.items():
+            for rule_id, phrases in rules.items():
+                for phrase_id, phrase in enumerate(phrases):
+                    entries.append((category, rule_id, phrase_id, phrase))
+        
+        try:
+            docs = self.nlp.pipe((entry[3]["text"] for entry in entries), batch_size=256)
+            for (category, rule_id, phrase_id, phrase), doc in zip(entries, docs):
+                lemmas = set(self._lemmas_from_doc(doc))
+                phrase["lemmas"] = lemmas
+                knowledge_base.index_tokens(
+                    category, rule_id, phrase_id,
+                    {matcher.normalize_text(lemma) for lemma in lemmas}
+                )
+            print(f"✅ Lemas precalculados para {len(entries)} frases")
+        except Exception as e:
+            print(f"⚠️  Error precalculando lemas: {e}")
+    
+    def _cache_exact_entities(self, knowledge_base: KnowledgeBase, entity_types: List[str],
+                              entity_lookup: Dict[str, str]) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Entidades de cada pregunta de la base (normalizada), para que la etapa de
+        coincidencia exacta responda sin analizar la pregunta con Spacy.
+        """
+        exact_questions = [
+            normalized for normalized, rule in knowledge_base.exact_index.items()
+            if rule is not None
+        ]
+        
+        exact_entities = {}
+        try:
+            if self.use_spacy and hasattr(self, 'nlp'):
+                # El mismo texto normalizado que analizaría analyze_question
+                docs = self.nlp.pipe(exact_questions, batch_size=256)
+                for normalized, doc in zip(exact_questions, docs):
+                    exact_entities[normalized] = self._entities_from_words(
+                        normalized.split(), self._entity_lemmas_from_doc(doc), entity_types, entity_lookup
+                    )
+            else:
+                for normalized in exact_questions:
+                    exact_entities[normalized] = self._entities_from_words(
+                        normalized.split(), [], entity_types, entity_lookup
+                    )
+        except Exception as e:
+            # Sin entidades precalculadas la etapa exacta simplemente no se usa
+            print(f"⚠️  Error precalculando entidades: {e}")
+            exact_entities = {}
+        
+        return exact_entities
+    
+    def _compile_category_model(self, matcher: QueryMatcher) -> Dict:
+        """
+        Precompila category_keywords: un automata con las palabras clave y
+        exclusivas normalizadas, la tabla lema -> categorías y el puntaje máximo.
+        Se ejecuta al iniciar y en cada recarga.
+        """
+        normalize = matcher.normalize_text
+        
+        exclusive_count = 0
+        lemma_categories = {}
+        automaton = KeywordAutomaton()
+        
+        for category, data in self.category_keywords.items():
+            for palabra in data.get("exclusivas", []):
+                palabra_normalizada = normalize(palabra)
+                # El orden de inserción define la prioridad entre exclusivas
+                automaton.add(palabra_normalizada, ("exclusiva", exclusive_count, category, palabra))
+                exclusive_count += 1
+            
+            keywords = [(keyword, normalize(keyword)) for keyword in data["palabras"]]
+            for index, (keyword, keyword_norm) in enumerate(keywords):
+                automaton.add(keyword_norm, ("palabra", index, category, keyword))
+            
+            # Cada categoría suma su peso una sola vez por lema coincidente
+            for keyword_norm in dict.fromkeys(norm for _, norm in keywords):
+                lemma_categories.setdefault(keyword_norm, []).append((category, data["peso"]))
+        
+        automaton.build()
+        
+        return {
+            "keyword_automaton": automaton,
+            "lemma_categories": lemma_categories,
+            "max_category_score": sum([data["peso"] * 3 for data in self.category_keywords.values()])
+        }
+    
+    def analyze_question(self, question: str) -> QueryAnalysis:
+        """
+        Normaliza y procesa la pregunta una sola vez (un unico analisis Spacy)
+        para que todas las etapas del pipeline compartan el resultado.
+        """
+        normalized = self.matcher.normalize_text(question)
+        tokens = normalized.split()
+        
+        lemmas = []
+        entity_lemmas = []
+        word_lemmas = {}
+        
+        if self.use_spacy and hasattr(self, 'nlp') and normalized:
+            try:
+                doc = self.nlp(normalized)
+                lemmas = self._lemmas_from_doc(doc)
+                entity_lemmas = self._entity_lemmas_from_doc(doc)
+                
+                # Lemas de contenido por palabra, para lematizar las expansiones sin reprocesar
+                word, word_content = "", []
+                for token in doc:
+                    word += token.text
+                    word_content.extend(self._lemmas_from_doc([token]))
+                    if token.whitespace_ or token.i == len(doc) - 1:
+                        word_lemmas[word] = word_content
+                        word, word_content = "", []
+                
+                if self.debug_mode:
+                    print(f"🔍 Lemmas: {lemmas}")
+            except Exception as e:
+                print(f"⚠️  Error en analyze_question: {e}")
+        
+        if self.use_spacy:
+            expanded_queries = self._expand_with_lemmas(normalized, lemmas)
+        else:
+            expanded_queries = self.matcher.expand_normalized(normalized)
+        
+        compiled_queries = [self.matcher.compile_phrase(query) for query in expanded_queries if query]
+        
+        query_lemmas = None
+        search_tokens = set()
+        for query in compiled_queries:
+            search_tokens |= query["content"]
+        
+        if self.use_spacy:
+            query_lemmas = [
+                set(self._lemmas_for_words(query.split(), word_lemmas))
+                for query in expanded_queries if query
+            ]
+            for query_lemma_set in query_lemmas:
+                search_tokens |= {self.matcher.normalize_text(lemma) for lemma in query_lemma_set}
+        
+        return QueryAnalysis(
+            question=question,
+            normalized=normalized,
+            tokens=tokens,
+            lemmas=lemmas,
+            entity_lemmas=entity_lemmas,
+            expanded_queries=expanded_queries,
+            compiled_queries=compiled_queries,
+            query_lemmas=query_lemmas,
+            search_tokens=self.matcher.related_tokens(search_tokens)
+        )
+    
+    def _entity_lemmas_from_doc(self, doc) -> List[str]:
+        """Lemas usados para extraer entidades (todo lo que no es stop word ni puntuación)"""
+        return [token.lemma_.lower() for token in doc if not token.is_stop and not token.is_punct]
+    
+    def _lemmas_for_words(self, words: List[str], word_lemmas: Dict[str, List[str]]) -> List[str]:
+        """
+        Lemas de una consulta expandida usando los lemas ya calculados de la pregunta.
+        Las palabras nuevas (sinónimos, lemas) se toman como su propio lema.
+        """
+        lemmas = []
+        for word in words:
+            if word in word_lemmas:
+                lemmas.extend(word_lemmas[word])
+                continue
+            
+            lexeme = self.nlp.vocab[word]
+            if not lexeme.is_stop and not lexeme.is_punct and len(word) > 2:
+                lemmas.append(word)
+        return lemmas
+    
+    def categorize_question(self, question: str, context_category: str = None,
+                            analysis: Optional[QueryAnalysis] = None) -> Tuple[str, float]:
         """
         Categoriza la pregunta usando texto NORMALIZADO y contexto de sesión
         Args:
             question: La pregunta del usuario (normalizada)
             context_category: Categoría anterior de la sesión (opcional)
+            analysis: Analisis ya calculado de la pregunta (opcional)
         Returns:
             Tuple[str, float]: (categoría, confianza)
         """
+        category, confidence, _ = self._categorize(question, context_category, analysis)
+        return category, confidence
+    
+    def _categorize(self, question: str, context_category: str = None,
+                    analysis: Optional[QueryAnalysis] = None,
+                    metrics: Optional[CascadeMetrics] = None) -> Tuple[str, float, bool]:
+        """
+        Implementacion de categorize_question
+        Args:
+            metrics: Metricas de la cascada; la busqueda de palabras exclusivas
+                se registra como la etapa "keyword"
+        Returns:
+            Tuple[str, float, bool]: (categoría, confianza, si el contexto de sesión
+            puede cambiar el resultado)
+        """
         # Normalizacion de la pregunta 
-        question_normalized = self.matcher.normalize_text(question)
+        if analysis is None:
+            analysis = self.analyze_question(question)
+        question_normalized = analysis.normalized
         
         if self.debug_mode:
             print(f" Pregunta normalizada: '{question}' → '{question_normalized}'")
             if context_category:
                 print(f" Contexto: categoría anterior = '{context_category}'")
         
+        # Una sola pasada del automata: todas las palabras clave y exclusivas
+        # presentes como palabras completas, con su posición
+        started = time.perf_counter()
+        keyword_hits = self._keyword_automaton.find_all(question_normalized)
+        
         # Buscar palabras exclusivas (ALTA CONFIANZA)
-        for category, data in self.category_keywords.items():
-            exclusivas = data.get("exclusivas", [])
-            for palabra in exclusivas:
-                palabra_normalizada = self.matcher.normalize_text(palabra)
-                if palabra_normalizada in question_normalized:
-                    if self.debug_mode:
-                        print(f" Categoría forzada a '{category}' por palabra exclusiva: '{palabra}' → '{palabra_normalizada}'")
-                    return category, 1.0
+        exclusive = self._exclusive_keyword(keyword_hits)
+        if metrics is not None:
+            metrics.record("keyword", started, exclusive is not None)
+        if exclusive is not None:
+            category, palabra = exclusive
+            if self.debug_mode:
+                print(f" Categoría forzada a '{category}' por palabra exclusiva: '{palabra}'")
+            return category, 1.0, False
         
         # Spacy para lematización (si está disponible) 
         spacy_score = 0.0
@@ -230,25 +541,19 @@ class ChatBot:
         
         if self.use_spacy:
             try:
-                lemmas = self.extract_lemmas_spacy(question)
+                lemmas = analysis.lemmas
                 if lemmas:
                     if self.debug_mode:
                         print(f" Lemas Spacy: {lemmas}")
                     
                     category_scores = {category: 0.0 for category in self.category_keywords}
                     
-                    for category, data in self.category_keywords.items():
-                        keywords = data["palabras"]
-                        weight = data["peso"]
-                        
-                        keywords_normalizadas = [self.matcher.normalize_text(k) for k in keywords]
-                        
-                        for lemma in lemmas:
-                            lemma_normalizado = self.matcher.normalize_text(lemma)
-                            if lemma_normalizado in keywords_normalizadas:
-                                category_scores[category] += weight
-                                if self.debug_mode:
-                                    print(f"   ✅ Lemma '{lemma}' → '{lemma_normalizado}' coincide con {category}")
+                    for lemma in lemmas:
+                        lemma_normalizado = self.matcher.normalize_text(lemma)
+                        for category, weight in self._lemma_categories.get(lemma_normalizado, ()):
+                            category_scores[category] += weight
+                            if self.debug_mode:
+                                print(f"   ✅ Lemma '{lemma}' → '{lemma_normalizado}' coincide con {category}")
                     
                     best_category = max(category_scores, key=category_scores.get)
                     best_score = category_scores[best_category]
@@ -267,35 +572,45 @@ class ChatBot:
         # Método tradicional con palabras clave
         category_scores = {category: 0.0 for category in self.category_keywords}
         
-        for category, data in self.category_keywords.items():
-            keywords = data["palabras"]
-            weight = data["peso"]
+        # Mejor posición de cada palabra clave: 0 inicio, 1 medio, 2 final, 3 pregunta completa
+        question_length = len(question_normalized)
+        keyword_positions = {}
+        for start, end, payload in keyword_hits:
+            if payload[0] != "palabra":
+                continue
             
-            keywords_normalizadas = [self.matcher.normalize_text(k) for k in keywords]
+            if start == 0 and end < question_length:
+                position = 0
+            elif start > 0 and end < question_length:
+                position = 1
+            elif start > 0:
+                position = 2
+            else:
+                position = 3
             
-            for keyword, keyword_norm in zip(keywords, keywords_normalizadas):
-                if keyword_norm in question_normalized:
-                    # Bonus si la palabra aparece al inicio
-                    if question_normalized.startswith(keyword_norm + " "):
-                        category_scores[category] += weight * 1.5
-                        if self.debug_mode:
-                            print(f" Bonus inicio: '{keyword}' → '{keyword_norm}' en {category}")
-                    
-                    elif f" {keyword_norm} " in question_normalized:
-                        category_scores[category] += weight
-                        if self.debug_mode:
-                            print(f"✅ Coincidencia: '{keyword}' → '{keyword_norm}' en {category}")
-                    
-                    elif question_normalized.endswith(" " + keyword_norm):
-                        category_scores[category] += weight
-                        if self.debug_mode:
-                            print(f" Coincidencia final: '{keyword}' → '{keyword_norm}' en {category}")
-                    
-                    else:
-                        # Palabra como substring
-                        category_scores[category] += weight * 0.7
-                        if self.debug_mode:
-                            print(f"🔍 Substring: '{keyword}' → '{keyword_norm}' en {category}")
+            key = (payload[2], payload[1])
+            if key not in keyword_positions or position < keyword_positions[key][0]:
+                keyword_positions[key] = (position, payload[3])
+        
+        for (category, _), (position, keyword) in keyword_positions.items():
+            weight = self.category_keywords[category]["peso"]
+            
+            if position == 0:
+                # Bonus si la palabra aparece al inicio
+                category_scores[category] += weight * 1.5
+                if self.debug_mode:
+                    print(f" Bonus inicio: '{keyword}' en {category}")
+            
+            elif position in (1, 2):
+                category_scores[category] += weight
+                if self.debug_mode:
+                    print(f"✅ Coincidencia: '{keyword}' en {category}")
+            
+            else:
+                # La pregunta es exactamente la palabra clave
+                category_scores[category] += weight * 0.7
+                if self.debug_mode:
+                    print(f"🔍 Pregunta completa: '{keyword}' en {category}")
         
         if self.debug_mode:
             print(f"\n📊 Puntuaciones tradicionales: {category_scores}")
@@ -320,191 +635,259 @@ class ChatBot:
             best_score = category_scores[best_category]
         
         # Normalizar score 
-        max_possible = sum([data["peso"] * 3 for data in self.category_keywords.values()])
-        normalized_score = min(best_score / max_possible, 1.0)
+        normalized_score = min(best_score / self._max_category_score, 1.0)
         
         if self.debug_mode:
             print(f" Score normalizado: {normalized_score:.2f}")
         
         # Verificar si necesita usar contexto
-        # Si la confianza es baja Y tenemos contexto de sesión
-        if context_category and normalized_score < 0.5:
-            
-            # Palabras que indican seguimiento de conversación
-            followup_indicators = [
-                "y", "tambien", "ademas", "entonces", "eso", "esa", "ese",
-                "y como", "y cuando", "y donde", "y que", "y cuanto",
-                "entonces como", "entonces cuando", "entonces donde",
-                "cual", "que", "cuanto", "como", "donde", "cuando"
-            ]
-            
-            # Detectar si es pregunta de seguimiento
-            is_followup = False
-            question_lower = question_normalized.lower()
-
-            is_short = len(question_normalized.split()) <= 6
-
-            for indicator in followup_indicators:
-                if question_lower.startswith(indicator) or f" {indicator} " in question_lower:
-                    is_followup = True
-                    break
-            
-            # preguntas muy cortas (probablemente seguimiento)
-            if len(question_normalized.split()) <= 5:
-                is_followup = True
+        # Si la confianza es baja, el contexto de sesión (si lo hay) decide la categoría
+        context_sensitive = normalized_score < 0.5 and self._is_followup_question(question_normalized)
+        
+        if context_category and context_sensitive:
+            if self.debug_mode:
+                print(f"📌 Detectada pregunta de seguimiento (score bajo: {normalized_score:.2f})")
+                print(f"   Usando contexto de sesión: '{context_category}'")
             
-            if is_followup or is_short:
-                if self.debug_mode:
-                    print(f"📌 Detectada pregunta de seguimiento (score bajo: {normalized_score:.2f})")
-                    print(f"   Usando contexto de sesión: '{context_category}'")
-                
-                # Usar la categoría del contexto con confianza moderada
-                return context_category, 0.65
+            # Usar la categoría del contexto con confianza moderada
+            return context_category, 0.65, True
         
         # Si no hay puntuación significativa, usar general 
         if normalized_score < 0.3:
             if self.debug_mode:
                 print(f"⚠️  Score bajo ({normalized_score:.2f}), usando 'general' por defecto")
-            return "general", 0.5
+            return "general", 0.5, context_sensitive
         
         if self.debug_mode:
             print(f" Ganador: {best_category} (confianza: {normalized_score:.2f})")
         
-        return best_category, normalized_score
+        return best_category, normalized_score, context_sensitive
+    
+    def _exclusive_keyword(self, keyword_hits: List[Tuple]) -> Optional[Tuple[str, str]]:
+        """
+        (categoría, palabra) de la primera palabra exclusiva según el orden de
+        categorías, o None
+        Args:
+            keyword_hits: Resultado de self._keyword_automaton.find_all
+        """
+        exclusive_hits = [payload for _, _, payload in keyword_hits if payload[0] == "exclusiva"]
+        if not exclusive_hits:
+            return None
+        _, _, category, palabra = min(exclusive_hits, key=lambda payload: payload[1])
+        return category, palabra
+    
+    def _is_followup_question(self, question_normalized: str) -> bool:
+        """Detecta preguntas de seguimiento (cortas o con indicadores de continuación)"""
+        # Palabras que indican seguimiento de conversación
+        followup_indicators = [
+            "y", "tambien", "ademas", "entonces", "eso", "esa", "ese",
+            "y como", "y cuando", "y donde", "y que", "y cuanto",
+            "entonces como", "entonces cuando", "entonces donde",
+            "cual", "que", "cuanto", "como", "donde", "cuando"
+        ]
+        
+        # Detectar si es pregunta de seguimiento
+        is_followup = False
+        question_lower = question_normalized.lower()
+
+        is_short = len(question_normalized.split()) <= 6
+
+        for indicator in followup_indicators:
+            if question_lower.startswith(indicator) or f" {indicator} " in question_lower:
+                is_followup = True
+                break
+        
+        # preguntas muy cortas (probablemente seguimiento)
+        if len(question_normalized.split()) <= 5:
+            is_followup = True
         
-    def extract_entities(self, question: str) -> Dict[str, List[str]]:
+        return is_followup or is_short
+        
+    def extract_entities(self, question: str, analysis: Optional[QueryAnalysis] = None) -> Dict[str, List[str]]:
         """
         Extraccion de entidades especificas de biblioteca.
         """
         # Normalizacion y lematizacion de la prgunta
-        question_norm = self.matcher.normalize_text(question)
-        lemmas = []
-        if self.use_spacy and hasattr(self, 'nlp'):
-            try:
-                doc = self.nlp(question)
-                lemmas = [token.lemma_.lower() for token in doc 
-                        if not token.is_stop and not token.is_punct]
-                if self.debug_mode:
-                    print(f"🔍 Lemmas: {lemmas}")
-            except Exception as e:
-                if self.debug_mode:
-                    print(f"⚠️ Error de lemmatizacion: {e}")
-
-        words = question_norm.split()
+        if analysis is None:
+            analysis = self.analyze_question(question)
+        return self._entities_from_words(analysis.tokens, analysis.entity_lemmas)
+    
+    def _entities_from_words(self, words: List[str], lemmas: List[str],
+                             entity_types: Optional[List[str]] = None,
+                             entity_lookup: Optional[Dict[str, str]] = None) -> Dict[str, List[str]]:
+        """
+        Entidades a partir de las palabras y lemas de una pregunta ya analizada
+        (con las tablas dadas, o las publicadas por load_resources)
+        """
+        if entity_lookup is None:
+            entity_types, entity_lookup = self._entity_types, self._entity_lookup
         
-        entities = {
-            "locations": [],
-            "resources": [],
-            "actions": [],
-            "time_related": [],
-            "urgency": []
+        # Una busqueda O(1) por palabra en la tabla palabra -> tipo de entidad
+        entities = {}
+        
+        for word in words + lemmas:
+            word_lower = word.lower()
+            entity_type = entity_lookup.get(word_lower)
+            if entity_type:
+                # dict como conjunto ordenado (sin duplicados, en orden de aparicion)
+                entities.setdefault(entity_type, {})[word_lower] = None
+        
+        return {
+            entity_type: list(entities[entity_type])
+            for entity_type in entity_types if entity_type in entities
         }
+    
+    def _load_entity_lexicon(self, matcher: QueryMatcher) -> Tuple[List[str], Dict[str, str]]:
+        """
+        Carga los tipos de entidad desde entities.json (junto a synonyms.json)
+        y compila la tabla palabra -> tipo. Si una palabra aparece en varios
+        tipos, gana el primero del archivo.
         
-        # Formas base para el mapeo de entidad 
-        location_keywords = {"cubiculo", "sala", "cabina", "espacio", "area"}
-        resource_keywords = {"libro", "computadora", "ordenador", "texto", "obra", "volumen"}
-        action_keywords = {"reservar", "prestar", "devolver", "usar", "utilizar", "solicitar"}
-        time_keywords = {"hora", "dia", "plazo", "tiempo", "minuto"}
-        urgency_keywords = {"urgente", "problema", "multa", "cobro", "error", "emergencia"}
+        Returns:
+            (tipos de entidad en orden, tabla palabra -> tipo)
+        """
+        entity_types = None
+        filepath = os.path.join(matcher.synonyms_path, "entities.json")
         
-        # Comparacion de palabras 
-        all_words_to_check = words + lemmas 
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                entity_types = json.load(f)
+            if not isinstance(entity_types, dict):
+                print("❌ Estructura inválida en entities.json: debe ser un objeto JSON")
+                entity_types = None
+        except FileNotFoundError:
+            print(f"⚠️  Archivo no encontrado: {filepath}, usando entidades por defecto")
+        except Exception as e:
+            print(f"❌ Error cargando entidades: {e}")
+        
+        # Formas base por defecto para el mapeo de entidad
+        if entity_types is None:
+            entity_types = {
+                "locations": ["cubiculo", "sala", "cabina", "espacio", "area"],
+                "resources": ["libro", "computadora", "ordenador", "texto", "obra", "volumen"],
+                "actions": ["reservar", "prestar", "devolver", "usar", "utilizar", "solicitar"],
+                "time_related": ["hora", "dia", "plazo", "tiempo", "minuto"],
+                "urgency": ["urgente", "problema", "multa", "cobro", "error", "emergencia"]
+            }
         
-        for word in all_words_to_check:
-            word_lower = word.lower()
-            
-            # Checar forma base
-            if word_lower in location_keywords and word_lower not in entities["locations"]:
-                entities["locations"].append(word_lower)
-            elif word_lower in resource_keywords and word_lower not in entities["resources"]:
-                entities["resources"].append(word_lower)
-            elif word_lower in action_keywords and word_lower not in entities["actions"]:
-                entities["actions"].append(word_lower)
-            elif word_lower in time_keywords and word_lower not in entities["time_related"]:
-                entities["time_related"].append(word_lower)
-            elif word_lower in urgency_keywords and word_lower not in entities["urgency"]:
-                entities["urgency"].append(word_lower)
-        
-        return {k: v for k, v in entities.items() if v}
-
-    def expand_query_with_spacy(self, query: str) -> List[str]:
-        """Expande consultas usando lematización de Spacy"""
-        # Usar metodo tradicional
-        traditional_expanded = self.matcher.expand_with_synonyms(query.lower())
-        expanded_queries = list(set(traditional_expanded))  
-        # Eliminar duplicados
+        entity_lookup = {}
+        for entity_type, words in entity_types.items():
+            for word in words:
+                entity_lookup.setdefault(matcher.normalize_text(word), entity_type)
+        
+        print(f"✅ Entidades cargadas: {len(entity_lookup)} palabras en {len(entity_types)} tipos")
+        return list(entity_types), entity_lookup
+
+    def _expand_with_lemmas(self, normalized_query: str, lemmas: List[str]) -> List[str]:
+        """Expansion por sinónimos mas la consulta de lemas, sin volver a procesar con Spacy"""
+        # Usar metodo tradicional (sin duplicados)
+        expanded_queries = list(dict.fromkeys(self.matcher.expand_normalized(normalized_query)))
         
         # Agregar lemas de Spacy si esta disponible
-        if self.use_spacy and hasattr(self, 'nlp'):
-            try:
-                lemmas = self.extract_lemmas_spacy(query)
-                if lemmas:
-                    lemma_query = " ".join(lemmas)
-                    normalized_query = self.matcher.normalize_text(query)
-                    
-                    if lemma_query != normalized_query and lemma_query not in expanded_queries:
-                        expanded_queries.append(lemma_query)
-                        
-            except Exception as e:
-                print(f"⚠️  Error en expand_query_with_spacy: {e}")
+        if lemmas:
+            lemma_query = " ".join(lemmas)
+            
+            if lemma_query != normalized_query and lemma_query not in expanded_queries:
+                expanded_queries.append(lemma_query)
         
         return expanded_queries
     
-    def calculate_similarity_enhanced(self, queries: List[str], target_phrases: List[str]) -> float:
-        """Calcula similitud"""
-        # Usar metodo tradicional
-        traditional_similarity = self.matcher.calculate_similarity(queries, target_phrases)
+    def calculate_similarity_enhanced(self, queries: List[str], target_phrases: List[str],
+                                      compiled_queries: Optional[List[Dict]] = None,
+                                      compiled_phrases: Optional[List[Dict]] = None,
+                                      query_lemmas: Optional[List[set]] = None,
+                                      min_score: float = 0.0) -> float:
+        """
+        Calcula similitud (usa las frases precompiladas si se proporcionan)
         
-        # Si Spacy no está disponible, retornar tradicional
+        Args:
+            query_lemmas: Lemas de cada consulta no vacía, para no lematizarlas por regla
+            min_score: Puntaje a superar; por debajo de él el resultado puede ser una cota
+        """
+        # Si Spacy no está disponible, usar metodo tradicional
         if not self.use_spacy or not hasattr(self, 'nlp'):
-            return traditional_similarity
+            return self._traditional_similarity(
+                queries, target_phrases, compiled_queries, compiled_phrases, min_score
+            )
         
         try:
             # Intentar con Spacy
-            max_similarity = 0.0
+            if query_lemmas is None:
+                query_lemmas = [set(self.extract_lemmas_spacy(query)) for query in queries if query]
             
-            for query in queries:
-                if not query:
-                    continue
-                
-                query_lemmas = set(self.extract_lemmas_spacy(query))
-                
-                for phrase in target_phrases:
-                    if not phrase:
-                        continue
-                    
-                    phrase_lemmas = set(self.extract_lemmas_spacy(phrase))
-                    
-                    # Similaridad Jaccard con lemas
-                    if query_lemmas and phrase_lemmas:
-                        intersection = len(query_lemmas & phrase_lemmas)
-                        union = len(query_lemmas | phrase_lemmas)
-                        
-                        if union > 0:
-                            lemma_similarity = intersection / union
-                        else:
-                            lemma_similarity = 0
-                    else:
-                        lemma_similarity = 0
-                    
-                    # Combinar con tradicional
-                    combined = (lemma_similarity * 0.6) + (traditional_similarity * 0.4)
-                    
-                    if combined > max_similarity:
-                        max_similarity = combined
+            # Lemas de las frases: precalculados en la carga o, si faltan, calculados aqui
+            if compiled_phrases is not None:
+                phrase_lemmas = [
+                    phrase["lemmas"] if "lemmas" in phrase
+                    else set(self.extract_lemmas_spacy(phrase["text"]))
+                    for phrase in compiled_phrases
+                ]
+            else:
+                phrase_lemmas = [set(self.extract_lemmas_spacy(phrase)) for phrase in target_phrases if phrase]
             
-            return max_similarity
+            if not query_lemmas or not phrase_lemmas:
+                return 0.0
+            
+            # Similaridad Jaccard con lemas (la mejor pareja consulta/frase)
+            lemma_similarity = self._lemma_similarity(query_lemmas, phrase_lemmas)
+            
+            # Lo que la parte tradicional necesita aportar para superar min_score
+            traditional_min = max(0.0, (min_score - lemma_similarity * 0.6) / 0.4)
+            traditional_similarity = self._traditional_similarity(
+                queries, target_phrases, compiled_queries, compiled_phrases, traditional_min
+            )
+            
+            # Combinar con tradicional
+            return (lemma_similarity * 0.6) + (traditional_similarity * 0.4)
             
         except Exception as e:
             print(f"⚠️  Error en calculate_similarity_enhanced: {e}")
             # Fallback a tradicional
-            return traditional_similarity
+            return self._traditional_similarity(queries, target_phrases, compiled_queries, compiled_phrases)
+    
+    def _lemma_similarity(self, query_lemmas: List[set], phrase_lemmas: List[set]) -> float:
+        """Mejor Jaccard de lemas entre cualquier consulta y cualquier frase"""
+        lemma_similarity = 0.0
+        for lemmas_query in query_lemmas:
+            for lemmas_phrase in phrase_lemmas:
+                if lemmas_query and lemmas_phrase:
+                    intersection = len(lemmas_query & lemmas_phrase)
+                    union = len(lemmas_query | lemmas_phrase)
+                    
+                    if union > 0 and intersection / union > lemma_similarity:
+                        lemma_similarity = intersection / union
+        return lemma_similarity
+    
+    def _traditional_similarity(self, queries: List[str], target_phrases: List[str],
+                                compiled_queries: Optional[List[Dict]] = None,
+                                compiled_phrases: Optional[List[Dict]] = None,
+                                min_score: float = 0.0) -> float:
+        """Similitud del matcher, sobre frases compiladas si están disponibles"""
+        if compiled_queries is None:
+            compiled_queries = [self.matcher.compile_phrase(query) for query in queries if query]
+        if compiled_phrases is None:
+            compiled_phrases = [self.matcher.compile_phrase(phrase) for phrase in target_phrases if phrase]
+        return self.matcher.calculate_similarity_compiled(compiled_queries, compiled_phrases, min_score)
     
     def load_resources(self):
-        """Carga recursos"""
+        """
+        Carga (o recarga) la base, los sinónimos, el indice y las tablas
+        derivadas. Todo se construye aparte y se publica de una vez con el lock
+        de escritura: las consultas en curso terminan con los recursos
+        anteriores y las siguientes ven solo los nuevos.
+        """
+        matcher = QueryMatcher(self.matcher.synonyms_path)
+        matcher.debug = self.matcher.debug
+        knowledge_base = KnowledgeBase(self.knowledge_base.knowledge_path)
+        retriever = TfidfRetriever()
+        
         try:
-            self.knowledge_base.load_all_knowledge()
-            self.matcher.load_synonyms()
+            matcher.load_synonyms()
+            knowledge_base.load_all_knowledge(matcher)
+            self._cache_phrase_lemmas(knowledge_base, matcher)
+            
+            if self.retrieval_engine == "tfidf":
+                retriever.fit(knowledge_base)
             
             mode = "Spacy" if self.use_spacy else "Básico"
             print(f"✅ Chatbot inicializado en modo {mode}")
@@ -512,7 +895,7 @@ class ChatBot:
             # Mostrar estadísticas
             print("\n ESTADISTICAS:")
             for category in ["general", "books", "computers", "cubicles", "biblio"]:
-                knowledge = self.knowledge_base.get_knowledge(category)
+                knowledge = knowledge_base.get_knowledge(category)
                 if knowledge:
                     print(f"   {category}: {len(knowledge)} reglas")
                 else:
@@ -522,24 +905,83 @@ class ChatBot:
             print(f"❌ Error cargando recursos: {e}")
 
             for category in ["general", "books", "computers", "cubicles", "biblio"]:
-                if not self.knowledge_base.get_knowledge(category):
-                    self.knowledge_base.knowledge[category] = {}
+                if not knowledge_base.get_knowledge(category):
+                    knowledge_base.knowledge[category] = {}
+        
+        # Modelo de categorias y tabla de entidades precompilados (también en cada recarga)
+        category_model = self._compile_category_model(matcher)
+        entity_types, entity_lookup = self._load_entity_lexicon(matcher)
+        exact_entities = self._cache_exact_entities(knowledge_base, entity_types, entity_lookup)
+        
+        with self.resources_lock.write():
+            self.matcher = matcher
+            self.knowledge_base = knowledge_base
+            self.retriever = retriever
+            self._keyword_automaton = category_model["keyword_automaton"]
+            self._lemma_categories = category_model["lemma_categories"]
+            self._max_category_score = category_model["max_category_score"]
+            self._entity_types = entity_types
+            self._entity_lookup = entity_lookup
+            self._exact_entities = exact_entities
+            
+            # Las respuestas guardadas pueden venir de la base anterior
+            self.answer_cache.clear()
+            self.near_duplicate_cache.clear()
+        
+        # Los procesos del pool todavía tienen la base anterior
+        if self.answer_pool is not None:
+            self.answer_pool.restart()
     
-    def search_in_category(self, category: str, expanded_queries: List[str]) -> Tuple[Optional[str], float]:
-        """Busca en categoria"""
-        best_answer = None
+    def _search_category(self, category: str, analysis: QueryAnalysis,
+                         rule_ids: List[str]) -> Tuple[Optional[str], float]:
+        """
+        Puntaje exacto (motor difuso) de algunas reglas de la categoria
+        Args:
+            rule_ids: Reglas a puntuar, en este orden
+        Returns:
+            Tuple[Optional[str], float]: (id de la mejor regla, confianza)
+        """
+        best_rule = None
         best_confidence = 0.0
         
         knowledge = self.knowledge_base.get_knowledge(category)
         if not knowledge:
             return None, 0.0
         
-        for key, data in knowledge.items():
+        compiled = self.knowledge_base.get_compiled(category)
+        expanded_queries = analysis.expanded_queries
+        compiled_queries = analysis.compiled_queries
+        query_lemmas = analysis.query_lemmas
+        
+        # Solo se puntuan las frases que comparten un token (o sinónimo) con las consultas
+        candidates = self.knowledge_base.get_candidates(category, analysis.search_tokens)
+        
+        for key in rule_ids:
+            data = knowledge.get(key)
+            if data is None:
+                continue
+            
+            phrases = compiled.get(key)
+            if phrases is None:
+                phrases = [self.matcher.compile_phrase(p) for p in data["preguntas"] if p]
+            
+            if candidates is not None:
+                phrase_ids = candidates.get(key)
+                if not phrase_ids:
+                    continue
+                phrases = [phrases[i] for i in phrase_ids]
+            
             # Usar similitud mejorada si Spacy está disponible
+            # (solo hace falta un puntaje exacto si puede superar al mejor actual)
             if self.use_spacy:
-                confidence = self.calculate_similarity_enhanced(expanded_queries, data["preguntas"])
+                confidence = self.calculate_similarity_enhanced(
+                    expanded_queries, data["preguntas"], compiled_queries, phrases, query_lemmas,
+                    min_score=best_confidence
+                )
             else:
-                confidence = self.matcher.calculate_similarity(expanded_queries, data["preguntas"])
+                confidence = self.matcher.calculate_similarity_compiled(
+                    compiled_queries, phrases, min_score=best_confidence
+                )
             
             # # Boost para categorías específicas (debug)
             # if category != "general":
@@ -547,9 +989,13 @@ class ChatBot:
             
             if confidence > best_confidence:
                 best_confidence = confidence
-                best_answer = data["respuesta"]
+                best_rule = key
+                
+                # Nada puede superar una coincidencia perfecta
+                if best_confidence >= 1.0:
+                    break
         
-        return best_answer, best_confidence
+        return best_rule, best_confidence
     
     def process_question(self, question: str, session_id: str = None) -> Dict:
         """
@@ -626,43 +1072,297 @@ class ChatBot:
             if self.debug_mode:
                 print(f"📌 Contexto: última categoría fue '{session['last_category']}'")
         
-        # Normalizar la pregunta al inicio 
+        # La cache se consulta con el texto normalizado, sin analisis Spacy
         question_for_processing = self.matcher.normalize_text(question)
+        context_category = session.get('last_category')
         
         if self.debug_mode:
             print(f"\n{'='*60}")
             print(f" PROCESANDO: '{question}'")
             print(f" Sesión: {session_id[:8]}..." if len(session_id) > 8 else f" Sesión: {session_id}")
             print(f" Normalizado: '{question_for_processing}'")
-            if session.get('last_category'):
-                print(f" Contexto: última categoría = '{session['last_category']}'")
+            if context_category:
+                print(f" Contexto: última categoría = '{context_category}'")
             print(f"{'='*60}")
-
+        
+        # Llaves posibles: respuesta independiente del contexto, o la de esta
+        # última categoría si la pregunta es de seguimiento
+        cache_keys = [(question_for_processing, "*"), (question_for_processing, context_category)]
+        decision = self.answer_cache.get_any(cache_keys) if self.answer_cache_enabled else None
+        
+        if decision is not None:
+            if self.debug_mode:
+                print(f"⚡ Respuesta desde cache (fuente: {decision['source']})")
+        else:
+            generation = self.answer_cache.generation
+            if self.answer_pool is not None:
+                decision = self.answer_pool.answer(question, question_for_processing, context_category)
+            else:
+                decision = self._answer_question(question, question_for_processing, context_category)
+            
+            if self.answer_cache_enabled:
+                # Solo las preguntas de seguimiento dependen del contexto de sesión
+                cache_context = context_category if decision["context_sensitive"] else "*"
+                self.answer_cache.put((question_for_processing, cache_context), decision, generation)
+        
+        if decision["low_confidence"] is not None and self.log_low_confidence:
+            confidence, attempted_source = decision["low_confidence"]
+            self._log_low_confidence(question, session_id, confidence, attempted_source)
+        
+        best_answer = decision["answer"]
+        best_source = decision["source"]
+        final_confidence = decision["confidence"]
+        category_confidence = decision["category_confidence"]
+        # Copia: el resultado queda en el historial y no debe compartir listas con la cache
+        entities = {entity_type: list(words) for entity_type, words in decision["entities"].items()}
+        alternatives = [
+            {"answer": alt["answer"], "confidence": round(alt["confidence"], 3), "source": alt["source"]}
+            for alt in decision["alternatives"]
+        ]
+        
+        result = {
+            "answer": best_answer,
+            "confidence": round(final_confidence, 3),
+            "source": best_source,
+            "mode": "basic" if not self.use_spacy else "spacy",
+            "entities": entities,
+            "alternatives": alternatives,
+            "session_id": session_id,
+            "rate_limited": False,                    
+            "rate_limit_remaining": remaining,        
+            "details": {
+                "category_confidence": round(category_confidence, 3),
+                "expanded_queries_count": decision["expanded_queries_count"],
+                "conversation_count": session.get('conversation_count', 0)
+            }
+        }
+        
+        # Guardar en el historial de sesion
+        self.session_manager.add_to_history(session_id, question, result)
+        
+        # Actualizar sesion con el contexto reciente
+        self.session_manager.update_session(session_id, {
+            'last_category': best_source,
+            'last_entities': entities,
+            'last_question': question,
+            'last_response': best_answer[:200]
+        })
+        
+        if self.debug_mode:
+            print(f"\n RESULTADO FINAL:")
+            print(f"   Respuesta: {best_answer[:80]}...")
+            print(f"   Confianza: {final_confidence:.3f}")
+            print(f"   Conversación #{session.get('conversation_count', 0)}")
+            print(f"   Rate limit restante: {remaining}/{self.rate_limiter.max_requests}")
+            print(f"{'='*60}\n")
+        
+        return result
+    
+    def warmup(self, questions: Optional[List[str]] = None) -> Dict:
+        """
+        Pasa preguntas de ejemplo por el pipeline de respuesta (sin sesiones
+        ni rate limiting) antes de recibir tráfico: la primera llamada a Spacy,
+        al clasificador y a la busqueda paga costos que de otro modo pagarían
+        las primeras consultas reales. Las respuestas quedan en la cache.
+        
+        Args:
+            questions: Preguntas a usar (por defecto self.warmup_questions;
+                una lista vacía omite el calentamiento)
+        
+        Returns:
+            Estado del calentamiento
+        """
+        questions = self.warmup_questions if questions is None else questions
+        if not questions:
+            self._update_warmup_status(state="skipped", questions=0)
+            return self.get_warmup_status()
+        
+        self._update_warmup_status(
+            state="running",
+            questions=len(questions),
+            started_at=datetime.now().isoformat(),
+            error=None
+        )
+        
+        started = time.perf_counter()
+        slowest = 0.0
+        try:
+            for question in questions:
+                question_started = time.perf_counter()
+                question_for_processing = self.matcher.normalize_text(question)
+                generation = self.answer_cache.generation
+                if self.answer_pool is not None:
+                    decision = self.answer_pool.answer(question, question_for_processing, None)
+                else:
+                    decision = self._answer_question(question, question_for_processing, None)
+                
+                if self.answer_cache_enabled and not decision["context_sensitive"]:
+                    self.answer_cache.put((question_for_processing, "*"), decision, generation)
+                slowest = max(slowest, time.perf_counter() - question_started)
+        except Exception as e:
+            self._update_warmup_status(
+                state="failed",
+                finished_at=datetime.now().isoformat(),
+                error=str(e)
+            )
+            print(f"❌ Error en el calentamiento: {e}")
+            return self.get_warmup_status()
+        
+        duration = time.perf_counter() - started
+        self._update_warmup_status(
+            state="done",
+            finished_at=datetime.now().isoformat(),
+            duration_seconds=round(duration, 3),
+            slowest_ms=round(slowest * 1000, 3)
+        )
+        print(f"✅ Calentamiento: {len(questions)} preguntas en {duration * 1000:.0f} ms")
+        return self.get_warmup_status()
+    
+    def _update_warmup_status(self, **changes):
+        self.warmup_status = {**self.warmup_status, **changes}
+    
+    def get_warmup_status(self) -> Dict:
+        return dict(self.warmup_status)
+    
+    def get_readiness(self) -> Dict:
+        """
+        Estado de cada componente (para /chatbot/ready). Spacy y el
+        clasificador son opcionales: sin ellos se responde en modo básico o sin
+        priors, así que solo bloquean mientras el clasificador se entrena por
+        primera vez.
+        """
+        if not self.enable_ml_classifier:
+            classifier = "disabled"
+        elif self.ml_ready:
+            classifier = "ready"
+        else:
+            classifier = self.get_ml_training_status()["state"]
+        
+        if self.retrieval_engine != "tfidf":
+            retriever = "disabled"
+        else:
+            retriever = "ready" if self.retriever.ready else "not_ready"
+        
+        warmup = self.get_warmup_status()
+        components = {
+            "spacy": "ready" if self.use_spacy else "unavailable",
+            "knowledge_index": "ready" if self.knowledge_base.exact_index else "empty",
+            "retriever": retriever,
+            "classifier": classifier,
+            "warmup": warmup["state"]
+        }
+        
+        ready = (
+            components["knowledge_index"] == "ready"
+            and retriever != "not_ready"
+            and classifier not in ("queued", "training")
+            and warmup["state"] in ("done", "skipped")
+        )
+        return {"ready": ready, "components": components, "warmup": warmup}
+    
+    def enable_answer_pool(self, workers: int = 2) -> bool:
+        """
+        Calcula las respuestas en procesos hijos (AnswerProcessPool) en lugar
+        del hilo que llama a process_question
+        
+        Returns:
+            bool: Si el pool quedó activo
+        """
+        if self.answer_pool is not None:
+            return True
+        
+        try:
+            self.answer_pool = AnswerProcessPool(self, workers=workers)
+        except Exception as e:
+            print(f"⚠️  No se pudo iniciar el pool de procesos: {e}")
+            return False
+        
+        print(f"✅ Pool de procesos: {workers} procesos")
+        return True
+    
+    def get_cascade_stats(self) -> Dict:
+        """Métricas de la cascada (con el pool de procesos, las de los procesos hijos)"""
+        if self.answer_pool is not None:
+            return self.answer_pool.get_cascade_stats()
+        return self.cascade_metrics.get_stats()
+    
+    def get_near_duplicate_stats(self) -> Dict:
+        """Estadisticas de la cache de casi duplicados (con el pool, las de los procesos hijos)"""
+        if self.answer_pool is not None:
+            return self.answer_pool.get_near_duplicate_stats()
+        return self.near_duplicate_cache.get_stats()
+    
+    def _answer_question(self, question: str, question_for_processing: str,
+                         context_category: Optional[str] = None) -> Dict:
+        """
+        Pipeline de respuesta sin sesión ni rate limiting, para poder guardar
+        el resultado en cache. Es una cascada: cada etapa solo se ejecuta si
+        las anteriores no superaron su umbral. Corre con el lock de lectura
+        para no mezclar recursos de antes y después de una recarga.
+        
+            exact   - la pregunta normalizada es una pregunta de la base
+            keyword - una palabra exclusiva fija la categoría (en _categorize)
+            token   - las cotas de Jaccard separan una regla de las demás
+            priors  - confianza de la categorización y probabilidades ML
+            global  - una sola busqueda en todas las reglas, con los priors
+        
+        Returns:
+            Dict con answer, confidence (final), source, category_confidence,
+            entities, expanded_queries_count, context_sensitive,
+            low_confidence ((confianza, fuente intentada) o None), stage y
+            alternatives (otras respuestas de la busqueda global)
+        """
+        with self.resources_lock.read():
+            return self._run_cascade(question, question_for_processing, context_category)
+    
+    def _run_cascade(self, question: str, question_for_processing: str,
+                     context_category: Optional[str]) -> Dict:
+        """Cuerpo de _answer_question (requiere el lock de lectura)"""
+        metrics = self.cascade_metrics
+        
+        # ===== Etapa 1: coincidencia exacta (sin analisis Spacy) =====
+        if self.enable_cascade:
+            started = time.perf_counter()
+            exact = self.knowledge_base.get_exact(question_for_processing)
+            entities = self._exact_entities.get(question_for_processing) if exact else None
+            if metrics.record("exact", started, entities is not None):
+                category, rule_id = exact
+                if self.debug_mode:
+                    print(f"⚡ Coincidencia exacta: '{category}' / '{rule_id}'")
+                metrics.record_exit("exact")
+                return {
+                    "answer": self.knowledge_base.get_knowledge(category)[rule_id]["respuesta"],
+                    "confidence": 1.0,
+                    "source": category,
+                    "category_confidence": 1.0,
+                    "entities": entities,
+                    "expanded_queries_count": 0,  # No hizo falta expandir
+                    "context_sensitive": False,
+                    "low_confidence": None,
+                    "stage": "exact",
+                    "alternatives": []
+                }
+        
+        analysis = self.analyze_question(question)
+        
+        # ===== Etapa 2: palabra exclusiva (dentro de la categorización) =====
         # Paso de contexto para categoria
-        category, category_confidence = self.categorize_question(
+        category, category_confidence, context_sensitive = self._categorize(
             question_for_processing,
-            context_category=session.get('last_category')
+            context_category=context_category,
+            analysis=analysis,
+            metrics=metrics if self.enable_cascade else None
         )
         
         if self.debug_mode:
             print(f" Categoria: {category} (confianza: {category_confidence:.2f})")
         
-        # Expandir consulta usando texto normalizado
-        if self.use_spacy:
-            expanded_queries = self.expand_query_with_spacy(question_for_processing)
-        else:
-            expanded_queries = self.matcher.expand_with_synonyms(question_for_processing)
+        # Consultas expandidas del analisis (sinónimos y lemas)
+        expanded_queries = analysis.expanded_queries
         
         if self.debug_mode and expanded_queries:
             print(f" Consultas expandidas ({len(expanded_queries)}): {expanded_queries[:3]}...")
         
-        # Buscar en categoria principal
-        best_answer, best_confidence = self.search_in_category(category, expanded_queries)
-        best_source = category
-        
-        if self.debug_mode:
-            print(f" Mejor coincidencia en {category}: {best_confidence:.3f}")
-        
         # Umbrales por categoria
         category_thresholds = {
             "books": 0.4,
@@ -673,185 +1373,622 @@ class ChatBot:
         }
         
         threshold = category_thresholds.get(category, 0.4)
-        
-        # Si no supera umbral, buscar en general
-        if best_confidence < threshold:
-            if self.debug_mode:
-                print(f"⚠️  Confianza baja ({best_confidence:.3f} < {threshold}), probando 'general'")
+        stage = "global"
+        alternatives = []
+        
+        # ===== Etapa 3: cotas baratas de tokens (solo se puntua la regla ganadora) =====
+        token_result = None
+        if self.enable_cascade and self.retrieval_engine == "fuzzy":
+            started = time.perf_counter()
+            token_result = self._token_stage(category, analysis)
+            if metrics.record("token", started, token_result is not None and token_result[1] >= threshold):
+                stage = "token"
+        
+        if stage == "token":
+            best_answer, best_confidence = token_result
+            best_source = category
+        else:
+            # ===== Etapa 4: priors por categoría (categorización y clasificador ML) =====
+            started = time.perf_counter()
+            priors = self._category_priors(category, category_confidence, analysis)
+            metrics.record("priors", started, len(priors) > 1)
             
-            general_answer, general_confidence = self.search_in_category("general", expanded_queries)
+            # ===== Etapa 5: una sola busqueda sobre todas las reglas =====
+            started = time.perf_counter()
+            results = self.search_all(expanded_queries, analysis, priors, scope=category)
+            metrics.record("global", started, bool(results) and results[0][2] >= self.fallback_threshold)
             
-            if general_confidence > best_confidence + 0.1:
-                best_answer = general_answer
-                best_confidence = general_confidence
-                best_source = "general"
-                
-                if self.debug_mode:
-                    print(f"🔄 Cambiando a 'general': {general_confidence:.3f}")
-        
-         # ===== ML CLASSIFIER FALLBACK (Complement to rule-based) =====
-        # Only trigger if rule confidence is low AND ML is enabled AND ready
-        if (self.enable_ml_classifier and self.ml_ready and 
-            best_confidence < self.ml_confidence_threshold):
+            if results:
+                best_source, rule_id, best_confidence, _ = results[0]
+                best_answer = self.knowledge_base.get_knowledge(best_source)[rule_id]["respuesta"]
+                # La confianza final se pondera con el prior de la categoría elegida
+                category_confidence = priors.get(best_source, 0.0)
+            else:
+                best_answer, best_confidence, best_source = None, 0.0, category
             
-            ml_category, ml_confidence = self._ml_categorize(question)
+            alternatives = [
+                {
+                    "source": alt_category,
+                    "answer": self.knowledge_base.get_knowledge(alt_category)[alt_rule]["respuesta"],
+                    "confidence": min(ranked, 1.0)
+                }
+                for alt_category, alt_rule, alt_confidence, ranked in results[1:]
+                if alt_confidence >= self.fallback_threshold
+            ]
             
             if self.debug_mode:
-                print(f"🤖 ML suggests: {ml_category} (conf: {ml_confidence:.3f})")
-            
-            # Only use ML suggestion if it's confident AND differs from current best source
-            if ml_confidence > self.ml_override_threshold and ml_category != best_source:
-                # Search again in ML's suggested category
-                ml_answer, ml_match_conf = self.search_in_category(ml_category, expanded_queries)
-                
-                if ml_match_conf > best_confidence + 0.1:  # Significant improvement
-                    best_answer = ml_answer
-                    best_confidence = ml_match_conf
-                    best_source = ml_category
-                    
-                    if self.debug_mode:
-                        print(f"🔄 ML override: using '{ml_category}' (match conf: {ml_match_conf:.3f})")
+                for result_category, result_rule, result_confidence, ranked in results:
+                    print(f" {result_category}/{result_rule}: {result_confidence:.3f} (con prior {ranked:.3f})")
+        
+        metrics.record_exit(stage)
 
         # Usar respuesta de fallback 
+        low_confidence = None
         if best_confidence < self.fallback_threshold:
             if self.debug_mode:
                 print(f"⚠️  Confianza ({best_confidence:.3f}) por debajo del umbral ({self.fallback_threshold})")
                 print("   Activando respuesta 'No sé'")
             
-            if self.log_low_confidence:
-                self._log_low_confidence(question, session_id, best_confidence, best_source)
-            
+            low_confidence = (best_confidence, best_source)
             best_answer = self.get_idk_response()
             best_confidence = 0.0
             best_source = "fallback"
         
-        entities = self.extract_entities(question)
+        entities = self.extract_entities(question, analysis)
 
         final_confidence = min(best_confidence * (0.5 + category_confidence * 0.5), 1.0)
         
-        result = {
+        return {
             "answer": best_answer,
-            "confidence": round(final_confidence, 3),
+            "confidence": final_confidence,
             "source": best_source,
-            "mode": "basic" if not self.use_spacy else "spacy",
+            "category_confidence": category_confidence,
             "entities": entities,
-            "session_id": session_id,
-            "rate_limited": False,                    
-            "rate_limit_remaining": remaining,        
-            "details": {
-                "category_confidence": round(category_confidence, 3),
-                "expanded_queries_count": len(expanded_queries),
-                "conversation_count": session.get('conversation_count', 0)
-            }
+            "expanded_queries_count": len(expanded_queries),
+            "context_sensitive": context_sensitive,
+            "low_confidence": low_confidence,
+            "stage": stage,
+            "alternatives": alternatives
         }
+    
+    def _category_priors(self, category: str, category_confidence: float,
+                         analysis: QueryAnalysis) -> Dict[str, float]:
+        """
+        Prior de cada categoría para la busqueda global: la confianza de la
+        categorización para la categoría elegida y la probabilidad del
+        clasificador ML para las demás
+        """
+        priors = {}
+        model = self.ml_model
+        if self.enable_ml_classifier and self.ml_ready and model is not None:
+            try:
+                priors = dict(zip(model.classes, model.predict_proba(analysis.normalized).tolist()))
+            except Exception as e:
+                if self.debug_mode:
+                    print(f"⚠️  ML prediction error: {e}")
+                priors = {}
         
-        # Guardar en el historial de sesion
-        self.session_manager.add_to_history(session_id, question, result)
+        priors[category] = category_confidence
+        return priors
+    
+    def search_all(self, expanded_queries: List[str], analysis: QueryAnalysis,
+                   priors: Optional[Dict[str, float]] = None, top_k: Optional[int] = None,
+                   scope: Optional[str] = None) -> List[Tuple[str, str, float, float]]:
+        """
+        Una sola pasada de puntaje sobre las reglas de todas las categorías.
+        Cada regla se ordena por su confianza ponderada con el prior de su
+        categoría, igual que la confianza final: confianza * (0.5 + prior * 0.5).
         
-        # Actualizar sesion con el contexto reciente
-        self.session_manager.update_session(session_id, {
-            'last_category': best_source,
-            'last_entities': entities,
-            'last_question': question,
-            'last_response': best_answer[:200]
-        })
+        Args:
+            priors: {categoria: prior entre 0 y 1}; sin prior, 0
+            top_k: Reglas a devolver (por defecto search_top_k)
+            scope: Ámbito para la cache de consultas casi duplicadas (p.ej. la
+                categoría de la pregunta); None no usa la cache
         
-        if self.debug_mode:
-            print(f"\n RESULTADO FINAL:")
-            print(f"   Respuesta: {best_answer[:80]}...")
-            print(f"   Confianza: {final_confidence:.3f}")
-            print(f"   Conversación #{session.get('conversation_count', 0)}")
-            print(f"   Rate limit restante: {remaining}/{self.rate_limiter.max_requests}")
-            print(f"{'='*60}\n")
+        Returns:
+            [(categoria, rule_id, confianza, confianza ponderada), ...] de mayor
+            a menor confianza ponderada
+        """
+        priors = priors or {}
+        top_k = top_k or self.search_top_k
+        weights = {
+            category: 0.5 + priors.get(category, 0.0) * 0.5
+            for category, knowledge in self.knowledge_base.knowledge.items() if knowledge
+        }
         
-        return result
+        if self.retrieval_engine == "tfidf" and self.retriever.ready:
+            return [
+                (category, rule_id, score, score * weights.get(category, 0.5))
+                for category, rule_id, score in self.retriever.search(
+                    analysis.expanded_queries, top_k=top_k, weights=weights
+                )
+            ]
+        
+        if not self.near_duplicate_enabled or scope is None or not analysis.normalized:
+            return self._search_all(expanded_queries, analysis, weights, top_k)
+        
+        # Una consulta casi igual a otra ya resuelta reutiliza sus reglas;
+        # solo se puntuan esas en lugar de todas
+        rules, signature = self.near_duplicate_cache.lookup(scope, analysis.normalized)
+        if rules is not None:
+            if self.debug_mode:
+                print(f"⚡ Consulta casi duplicada: se puntuan {len(rules)} reglas")
+            return self._search_all(expanded_queries, analysis, weights, top_k, rules=rules)
+        
+        generation = self.near_duplicate_cache.generation
+        results = self._search_all(expanded_queries, analysis, weights, top_k)
+        if results:
+            rules = [(category, rule_id) for category, rule_id, _, _ in results]
+            self.near_duplicate_cache.store(scope, analysis.normalized, rules, signature, generation)
+        return results
     
-    def _train_classifier(self):
+    def _search_all(self, expanded_queries: List[str], analysis: QueryAnalysis,
+                    weights: Dict[str, float], top_k: int,
+                    rules: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str, float, float]]:
         """
-        Train a logistic regression classifier using the questions from the knowledge base.
-        The classifier learns to predict the category (books, computers, etc.) from the text.
+        Implementacion de search_all para el motor difuso (ramificación y
+        acotamiento con el k-ésimo mejor puntaje ponderado)
+        Args:
+            rules: Puntuar solo estas reglas [(categoria, rule_id), ...] (opcional)
         """
-        try:
-            texts = []
-            labels = []
+        knowledge_base = self.knowledge_base
+        
+        if rules is None:
+            # Categorías de mayor prior primero (su mejor puntaje poda pronto al resto)
+            categories = sorted(weights, key=lambda category: -weights[category])
+            rules = [(category, rule_id) for category in categories for rule_id in knowledge_base.knowledge[category]]
+            
+            # Con el modelo de reglas solo se puntuan sus k reglas mas probables
+            shortlist = set(self._rule_model_shortlist(analysis, len(rules)))
+            if shortlist:
+                rules = [rule for rule in rules if rule in shortlist]
+        # Los empates se resuelven por este orden
+        positions = {rule: position for position, rule in enumerate(rules)}
+        
+        candidates = knowledge_base.get_all_candidates(analysis.search_tokens)
+        compiled_queries = analysis.compiled_queries
+        query_lemmas = analysis.query_lemmas
+        
+        # Monticulo de las k mejores: (ponderada, -posicion, categoria, rule_id, confianza)
+        top = []
+        for category, rule_id in rules:
+            data = knowledge_base.knowledge.get(category, {}).get(rule_id)
+            weight = weights.get(category)
+            if data is None or weight is None:
+                continue
+            
+            phrases = knowledge_base.get_compiled(category).get(rule_id)
+            if phrases is None:
+                phrases = [self.matcher.compile_phrase(p) for p in data["preguntas"] if p]
             
-            # Extract all questions and their categories from the knowledge base
-            for category, knowledge in self.knowledge_base.knowledge.items():
-                if not knowledge:
+            category_candidates = candidates.get(category)
+            if category_candidates is not None:
+                phrase_ids = category_candidates.get(rule_id)
+                if not phrase_ids:
                     continue
-                for rule_id, rule_data in knowledge.items():
-                    for pregunta in rule_data.get("preguntas", []):
-                        # Normalize the question before training
-                        normalized = self.matcher.normalize_text(pregunta)
-                        if normalized and len(normalized) > 3:
-                            texts.append(normalized)
-                            labels.append(category)
-            
-            if len(texts) < 10:
-                print(f"⚠️  ML Classifier: Insufficient training data ({len(texts)} examples). Disabling.")
-                self.ml_ready = False
-                return
-            
-            # Create TF-IDF vectorizer (unigrams + bigrams)
-            self.vectorizer = TfidfVectorizer(
-                analyzer='char_wb',
-                ngram_range=(3, 5),
-                max_features=800,
-                sublinear_tf=True
-            )
-            X = self.vectorizer.fit_transform(texts)
+                phrases = [phrases[i] for i in phrase_ids]
             
-            # Train logistic regression classifier
-            self.classifier = LogisticRegression(
-                max_iter=1000,
-                random_state=42,
-                class_weight='balanced'
-            )
-            self.classifier.fit(X, labels)
+            # Solo hace falta un puntaje exacto si puede entrar al top-k
+            min_score = top[0][0] / weight if len(top) >= top_k else 0.0
+            if self.use_spacy:
+                confidence = self.calculate_similarity_enhanced(
+                    expanded_queries, data["preguntas"], compiled_queries, phrases, query_lemmas,
+                    min_score=min_score
+                )
+            else:
+                confidence = self.matcher.calculate_similarity_compiled(
+                    compiled_queries, phrases, min_score=min_score
+                )
             
-            self.ml_ready = True
-            print(f"✅ ML Classifier trained on {len(texts)} examples across {len(set(labels))} categories")
+            if confidence <= 0.0:
+                continue
             
+            entry = (confidence * weight, -positions[(category, rule_id)], category, rule_id, confidence)
+            if len(top) < top_k:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+        
+        return [
+            (category, rule_id, confidence, ranked)
+            for ranked, _, category, rule_id, confidence in sorted(top, reverse=True)
+        ]
+    
+    def _rule_model_shortlist(self, analysis: QueryAnalysis, total_rules: int) -> List[Tuple[str, str]]:
+        """
+        Las ml_rule_top_k reglas que el modelo de reglas considera mas probables,
+        o [] si no hay modelo o la base tiene menos de ml_rule_min_rules reglas
+        (p.ej. tras una recarga, hasta que termine el reentrenamiento)
+        """
+        model = self.ml_model
+        rule_model = model.rule_model if model is not None else None
+        if rule_model is None or total_rules < self.ml_rule_min_rules:
+            return []
+        
+        try:
+            top_rules = rule_model.top_k(analysis.normalized, self.ml_rule_top_k)
+        except Exception as e:
             if self.debug_mode:
-                # Print top features per category (optional)
-                self._print_top_features()
-                
+                print(f"⚠️  ML prediction error: {e}")
+            return []
+        
+        if self.debug_mode:
+            print(f"🎯 Reglas sugeridas por ML: {[(rule_id, round(p, 3)) for _, rule_id, p in top_rules]}")
+        return [(category, rule_id) for category, rule_id, _ in top_rules]
+    
+    def _token_stage(self, category: str, analysis: QueryAnalysis) -> Optional[Tuple[str, float]]:
+        """
+        Etapa barata de la cascada: cotas del puntaje de cada regla candidata
+        usando solo conjuntos de palabras (y lemas). Si la cota inferior de una
+        regla supera la cota superior de todas las demás, esa regla es la que
+        elegiría la busqueda completa y solo se calcula su puntaje exacto.
+        
+        Returns:
+            (respuesta, confianza) o None si ninguna regla queda separada
+        """
+        knowledge = self.knowledge_base.get_knowledge(category)
+        if not knowledge or not analysis.compiled_queries:
+            return None
+        
+        compiled = self.knowledge_base.get_compiled(category)
+        candidates = self.knowledge_base.get_candidates(category, analysis.search_tokens)
+        spacy_scoring = self.use_spacy and hasattr(self, 'nlp')
+        
+        best_rule = None
+        best_lower = best_upper = 0.0
+        other_upper = 0.0  # Mejor cota superior entre las reglas no elegidas
+        for rule_id in knowledge:
+            phrases = compiled.get(rule_id)
+            if phrases is None:
+                return None
+            
+            if candidates is not None:
+                phrase_ids = candidates.get(rule_id)
+                if not phrase_ids:
+                    continue
+                phrases = [phrases[i] for i in phrase_ids]
+            
+            lower, upper = self._rule_bounds(analysis, phrases, spacy_scoring)
+            if lower > best_lower:
+                other_upper = max(other_upper, best_upper)
+                best_rule, best_lower, best_upper = rule_id, lower, upper
+            else:
+                other_upper = max(other_upper, upper)
+        
+        if best_rule is None or best_lower <= other_upper + 1e-9:
+            return None
+        
+        rule_id, confidence = self._search_category(category, analysis, [best_rule])
+        if rule_id is None:
+            return None
+        
+        if self.debug_mode:
+            print(f"⚡ Etapa de tokens: '{rule_id}' separada ({best_lower:.3f} > {other_upper:.3f})")
+        return knowledge[rule_id]["respuesta"], confidence
+    
+    def _rule_bounds(self, analysis: QueryAnalysis, phrases: List[Dict],
+                     spacy_scoring: bool) -> Tuple[float, float]:
+        """Cotas (inferior, superior) del puntaje de una regla, como en _search_category"""
+        lower, upper = self.matcher.similarity_bounds(analysis.compiled_queries, phrases)
+        if not spacy_scoring:
+            return lower, upper
+        
+        phrase_lemmas = [phrase.get("lemmas") for phrase in phrases]
+        if any(lemmas is None for lemmas in phrase_lemmas):
+            # Sin lemas precalculados no hay cota; nunca separa la regla
+            return 0.0, 1.0
+        if not analysis.query_lemmas or not phrase_lemmas:
+            return 0.0, 0.0
+        
+        lemma_similarity = self._lemma_similarity(analysis.query_lemmas, phrase_lemmas)
+        return lemma_similarity * 0.6 + lower * 0.4, lemma_similarity * 0.6 + upper * 0.4
+    
+    def _train_classifier(self) -> bool:
+        """
+        Train a logistic regression classifier using the questions from the knowledge base.
+        The classifier learns to predict the category (books, computers, etc.) from the text.
+        The new (vectorizer, classifier) pair replaces the old one in a single assignment,
+        so concurrent requests keep using the previous model until it is ready.
+        """
+        started = time.perf_counter()
+        self._update_training_status(
+            state="training",
+            started_at=datetime.now().isoformat(),
+            finished_at=None,
+            duration_seconds=None,
+            error=None
+        )
+        
+        try:
+            fitted = self._fit_classifier()
         except Exception as e:
             print(f"❌ ML Classifier training failed: {e}")
+            if self.ml_model is None:
+                self.ml_ready = False
+            self._update_training_status(
+                state="failed",
+                finished_at=datetime.now().isoformat(),
+                duration_seconds=round(time.perf_counter() - started, 3),
+                error=str(e)
+            )
+            return False
+        
+        if fitted is None:
+            # Sin datos suficientes: un modelo anterior predeciría categorias obsoletas
+            self.ml_model = None
+            self.vectorizer = None
+            self.classifier = None
             self.ml_ready = False
+            self._update_training_status(
+                state="disabled",
+                finished_at=datetime.now().isoformat(),
+                duration_seconds=round(time.perf_counter() - started, 3)
+            )
+            return False
+        
+        artifacts, source, examples = fitted
+        vectorizer = artifacts["vectorizer"]
+        classifier = artifacts["classifier"]
+        
+        model = LinearCategoryModel(vectorizer, classifier)
+        if "rule_classifier" in artifacts:
+            model.rule_model = RuleModel(vectorizer, artifacts["rule_classifier"], artifacts["rule_labels"])
+        
+        # Intercambio atómico (categorias y reglas juntos, con su ruta de inferencia ligera)
+        self.ml_model = model
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+        self.ml_ready = True
+        
+        # Las respuestas guardadas se calcularon con el modelo anterior
+        self.answer_cache.clear()
+        self.near_duplicate_cache.clear()
+        if self.answer_pool is not None:
+            self.answer_pool.restart()
+        
+        self._update_training_status(
+            state="ready",
+            source=source,
+            examples=examples,
+            finished_at=datetime.now().isoformat(),
+            duration_seconds=round(time.perf_counter() - started, 3)
+        )
+        
+        if self.debug_mode:
+            # Print top features per category (optional)
+            self._print_top_features()
+        
+        return True
     
-    def _ml_categorize(self, question: str) -> Tuple[str, float]:
+    def _fit_classifier(self) -> Optional[Tuple]:
         """
-        Use the trained ML classifier to predict the category of a question.
-        Returns (category, confidence) where confidence is the predicted probability.
+        Entrena (o carga del disco) el clasificador sin modificar el modelo en uso
+        Returns:
+            (artefactos, origen "trained"/"loaded", ejemplos) o None si no hay
+            datos suficientes. Artefactos: vectorizer, classifier y, si está
+            habilitado, rule_classifier y rule_labels
         """
-        if not self.ml_ready or self.classifier is None or self.vectorizer is None:
-            return "general", 0.0
+        texts, labels, rules = self._classifier_training_data()
+        
+        if len(texts) < 10:
+            print(f"⚠️  ML Classifier: Insufficient training data ({len(texts)} examples). Disabling.")
+            return None
+        
+        vectorizer, vectorizer_params = build_vectorizer(self.ml_feature_mode, self.ml_hashing_features)
+        classifier_params = dict(CLASSIFIER_PARAMS)
+        
+        # Si la base, los sinónimos y la configuracion no cambiaron, reutilizar el modelo guardado
+        artifacts_key = self._classifier_artifacts_key(texts, labels, rules, vectorizer_params, classifier_params)
+        artifacts = self._load_classifier_artifacts(artifacts_key)
+        if artifacts is not None:
+            print(f"✅ ML Classifier loaded from {self._classifier_artifacts_path(artifacts_key)}")
+            return artifacts, "loaded", len(texts)
+        
+        # TF-IDF learns its vocabulary here; hashing has nothing to fit
+        X = vectorizer.fit_transform(texts)
+        
+        # Train logistic regression classifier
+        from sklearn.linear_model import LogisticRegression
+        
+        classifier = LogisticRegression(**classifier_params)
+        classifier.fit(X, labels)
+        
+        print(f"✅ ML Classifier trained on {len(texts)} examples across {len(set(labels))} categories")
+        
+        artifacts = {"vectorizer": vectorizer, "classifier": classifier}
+        
+        # Segundo modelo sobre los mismos rasgos: la etiqueta es la regla. Con
+        # pocas reglas _search_all no lo usaría, así que no se entrena
+        rule_labels = sorted(set(rules))
+        if self.ml_rule_model and len(rule_labels) >= self.ml_rule_min_rules:
+            rule_index = {rule: index for index, rule in enumerate(rule_labels)}
+            rule_classifier = LogisticRegression(**classifier_params)
+            rule_classifier.fit(X, [rule_index[rule] for rule in rules])
+            artifacts["rule_classifier"] = rule_classifier
+            artifacts["rule_labels"] = rule_labels
+            print(f"✅ ML Rule model trained on {len(rule_labels)} rules")
+        
+        self._save_classifier_artifacts(artifacts_key, artifacts)
+        return artifacts, "trained", len(texts)
+    
+    def _classifier_training_data(self) -> Tuple[List[str], List[str], List[Tuple[str, str]]]:
+        """Preguntas normalizadas de la base, su categoria y su regla (categoria, rule_id)"""
+        texts = []
+        labels = []
+        rules = []
+        
+        # Extract all questions and their categories from the knowledge base
+        # (una sola lectura: una recarga puede reemplazar la base)
+        knowledge_base = self.knowledge_base
+        for category, knowledge in knowledge_base.knowledge.items():
+            if not knowledge:
+                continue
+            for rule_id, rule_data in knowledge.items():
+                for pregunta in rule_data.get("preguntas", []):
+                    # Normalize the question before training
+                    normalized = self.matcher.normalize_text(pregunta)
+                    if normalized and len(normalized) > 3:
+                        texts.append(normalized)
+                        labels.append(category)
+                        rules.append((category, rule_id))
+        
+        return texts, labels, rules
+    
+    def retrain_classifier_async(self) -> Dict:
+        """
+        Reentrena el clasificador en un hilo de fondo (p.ej. tras recargar la base).
+        Si ya hay un entrenamiento en curso, se repite al terminar para tomar
+        la base mas reciente.
+        
+        Returns:
+            Estado del entrenamiento
+        """
+        if not self.enable_ml_classifier:
+            return self.get_ml_training_status()
+        
+        with self.ml_training_lock:
+            if self.ml_training_thread is not None:
+                self.ml_retrain_pending = True
+            else:
+                self._update_training_status(state="queued")
+                self.ml_training_thread = threading.Thread(
+                    target=self._retrain_worker,
+                    name="ml-classifier-retrain",
+                    daemon=True
+                )
+                self.ml_training_thread.start()
+        
+        return self.get_ml_training_status()
+    
+    def _retrain_worker(self):
+        """Hilo de reentrenamiento: entrena hasta que no queden recargas pendientes"""
+        while True:
+            self._train_classifier()
+            
+            with self.ml_training_lock:
+                if not self.ml_retrain_pending:
+                    self.ml_training_thread = None
+                    return
+                self.ml_retrain_pending = False
+    
+    def _update_training_status(self, **changes):
+        with self.ml_status_lock:
+            self.ml_training_status = {**self.ml_training_status, **changes}
+    
+    def get_ml_training_status(self) -> Dict:
+        """Estado del ultimo entrenamiento del clasificador (para /chatbot/stats)"""
+        with self.ml_status_lock:
+            status = dict(self.ml_training_status)
+        status["pending_retrain"] = self.ml_retrain_pending
+        return status
+    
+    def _classifier_artifacts_key(self, texts: List[str], labels: List[str], rules: List[Tuple[str, str]],
+                                  vectorizer_params: Dict, classifier_params: Dict) -> str:
+        """
+        Hash SHA-256 de todo lo que determina el modelo: archivos de conocimiento
+        y sinónimos, ejemplos de entrenamiento ya normalizados, parametros y
+        version de scikit-learn (los pickles no son portables entre versiones).
+        """
+        import sklearn
+        
+        digest = hashlib.sha256()
+        digest.update(
+            f"category-classifier/v2 features={self.ml_feature_mode} rules={self.ml_rule_model} "
+            f"min_rules={self.ml_rule_min_rules} "
+            f"sklearn={sklearn.__version__}\n".encode("utf-8")
+        )
+        digest.update(repr(sorted(vectorizer_params.items())).encode("utf-8"))
+        digest.update(repr(sorted(classifier_params.items())).encode("utf-8"))
+        
+        for directory in (self.knowledge_base.knowledge_path, self.matcher.synonyms_path):
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith(".json"):
+                    continue
+                with open(os.path.join(directory, filename), 'rb') as f:
+                    digest.update(filename.encode("utf-8") + b"\0" + f.read() + b"\0")
+        
+        for text, label, (_, rule_id) in zip(texts, labels, rules):
+            digest.update(f"{label}\t{rule_id}\t{text}\n".encode("utf-8"))
+        
+        return digest.hexdigest()
+    
+    def _classifier_artifacts_prefix(self) -> str:
+        return f"category_classifier_{self.ml_feature_mode}_"
+    
+    def _classifier_artifacts_path(self, artifacts_key: str) -> str:
+        return os.path.join(self.ml_model_dir, f"{self._classifier_artifacts_prefix()}{artifacts_key[:16]}.pkl")
+    
+    def _load_classifier_artifacts(self, artifacts_key: str) -> Optional[Dict]:
+        """Carga los artefactos guardados con la misma llave, o None"""
+        if not self.ml_model_dir:
+            return None
+        
+        filepath = self._classifier_artifacts_path(artifacts_key)
+        if not os.path.exists(filepath):
+            return None
         
         try:
-            normalized = self.matcher.normalize_text(question)
-            X = self.vectorizer.transform([normalized])
+            # Solo se cargan archivos escritos por _save_classifier_artifacts
+            with open(filepath, 'rb') as f:
+                artifacts = pickle.load(f)
             
-            predicted_category = self.classifier.predict(X)[0]
-            probabilities = self.classifier.predict_proba(X)[0]
-            confidence = max(probabilities)
+            if artifacts.get("key") != artifacts_key:
+                print(f"⚠️  ML Classifier: llave distinta en {filepath}, reentrenando")
+                return None
             
-            return predicted_category, confidence
+            del artifacts["key"]
+            return artifacts
         except Exception as e:
+            print(f"⚠️  ML Classifier: no se pudo cargar {filepath}: {e}")
+            return None
+    
+    def _save_classifier_artifacts(self, artifacts_key: str, artifacts: Dict):
+        """
+        Guarda el modelo entrenado (escritura atómica) y borra las versiones
+        anteriores del mismo modo de rasgos; los archivos de otros modos (p.ej.
+        de otra instancia que comparte el directorio) no se tocan.
+        """
+        if not self.ml_model_dir:
+            return
+        
+        filepath = self._classifier_artifacts_path(artifacts_key)
+        try:
+            os.makedirs(self.ml_model_dir, exist_ok=True)
+            
+            # Archivo temporal por proceso: varios workers pueden entrenar a la vez
+            temp_path = f"{filepath}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump({"key": artifacts_key, **artifacts}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, filepath)
+            
+            current = os.path.basename(filepath)
+            prefix = self._classifier_artifacts_prefix()
+            for filename in os.listdir(self.ml_model_dir):
+                if filename.startswith(prefix) and filename.endswith(".pkl") and filename != current:
+                    os.remove(os.path.join(self.ml_model_dir, filename))
+            
             if self.debug_mode:
-                print(f"⚠️  ML prediction error: {e}")
-            return "general", 0.0
+                print(f"💾 ML Classifier guardado en {filepath}")
+        except Exception as e:
+            print(f"⚠️  ML Classifier: no se pudo guardar {filepath}: {e}")
     
     def _print_top_features(self, n: int = 5):
         """Print the top n features (words/bigrams) for each category."""
-        if not self.ml_ready:
+        model = self.ml_model
+        if not self.ml_ready or model is None:
             return
         
-        feature_names = self.vectorizer.get_feature_names_out()
-        for i, category in enumerate(self.classifier.classes_):
-            coef = self.classifier.coef_[i]
+        # HashingVectorizer no guarda nombres de rasgos: se muestran las columnas
+        feature_names = None if model.hashing else model.vectorizer.get_feature_names_out()
+        for i, category in enumerate(model.classes):
+            coef = model.coef[i]
             top_indices = coef.argsort()[-n:][::-1]
-            top_features = [feature_names[idx] for idx in top_indices]
+            if feature_names is None:
+                top_features = [f"#{idx}" for idx in top_indices]
+            else:
+                top_features = [feature_names[idx] for idx in top_indices]
             print(f"   {category}: {', '.join(top_features)}")
 
     def get_fallback_response(self, category: str, question: str = "") -> str:
@@ -930,6 +2067,7 @@ class ChatBot:
             "spacy_available": SPACY_AVAILABLE,
             "spacy_enabled": self.use_spacy,
             "spacy_info": spacy_info,
+            "retrieval_engine": self.retrieval_engine,
             "rules_loaded": categories_info,
             "synonyms_loaded": len(self.matcher.synonyms) if hasattr(self.matcher, 'synonyms') else 0
         }
@@ -962,6 +2100,8 @@ def diagnose_spacy():
     print("✅ Spacy está instalado")
     
     try:
+        import spacy
+        
         nlp = spacy.load("es_core_news_sm")
         print("✅ Modelo 'es_core_news_sm' cargado correctamente")
         print(f" Pipeline: {nlp.pipe_names}")
@@ -0,0 +1,110 @@
+from collections import deque
+from typing import Any, Dict, List, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Automata Aho-Corasick para buscar muchas palabras clave a la vez.
+
+    Recorre el texto una sola vez sin importar cuantas palabras clave haya
+    y solo reporta coincidencias en limites de palabra, de modo que 'pc'
+    ya no coincide dentro de palabras mas largas. Se aceptan sufijos de
+    plural ('libro' coincide con 'libros').
+    """
+
+    def __init__(self, suffixes: Tuple[str, ...] = ("s", "es")):
+        """
+        Args:
+            suffixes: Terminaciones permitidas despues del patron (plurales)
+        """
+        self.suffixes = suffixes
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Por estado: [(longitud del patron, payload), ...]
+        self._output: List[List[Tuple[int, Any]]] = [[]]
+        self.patterns = 0
+
+    def add(self, pattern: str, payload: Any):
+        """Agrega un patron (ya normalizado) con un dato asociado"""
+        if not pattern:
+            return
+
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+
+        self._output[state].append((len(pattern), payload))
+        self.patterns += 1
+
+    def build(self):
+        """Calcula los enlaces de fallo (BFS); llamar despues de agregar los patrones"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+
+                # Heredar las salidas del estado de fallo
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, Any]]:
+        """
+        Coincidencias en limite de palabra (el texto debe estar normalizado,
+        con palabras separadas por un solo espacio)
+
+        Returns:
+            [(inicio, fin, payload), ...] en orden de aparicion del final
+        """
+        hits = []
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        text_length = len(text)
+        state = 0
+
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            if not output[state]:
+                continue
+
+            end = self._word_end(text, position + 1, text_length)
+            if end < 0:
+                continue
+
+            for length, payload in output[state]:
+                start = position + 1 - length
+                if start == 0 or text[start - 1] == " ":
+                    hits.append((start, end, payload))
+
+        return hits
+
+    def _word_end(self, text: str, end: int, text_length: int) -> int:
+        """Fin de la palabra si el patron termina en limite (o con un sufijo permitido), si no -1"""
+        if end == text_length or text[end] == " ":
+            return end
+
+        for suffix in self.suffixes:
+            suffix_end = end + len(suffix)
+            if text.startswith(suffix, end) and (suffix_end == text_length or text[suffix_end] == " "):
+                return suffix_end
+
+        return -1
@@ -1,6 +1,6 @@
 import json
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 
 class KnowledgeBase:
     def __init__(self, knowledge_path: str):
@@ -11,6 +11,12 @@ class KnowledgeBase:
             "computers": None,
             "cubicles": None
         }
+        # Frases precompiladas por categoria: {categoria: {rule_id: [frase_compilada, ...]}}
+        self.compiled = {}
+        # Indice invertido: {token: {(categoria, rule_id, indice_frase), ...}}
+        self.token_index: Dict[str, Set[Tuple[str, str, int]]] = {}
+        # Pregunta normalizada -> (categoria, rule_id); None si aparece en varias reglas
+        self.exact_index: Dict[str, Optional[Tuple[str, str]]] = {}
     
     def load_knowledge_file(self, filename: str) -> Optional[Dict]:
         """Carga un archivo JSON de conocimiento con manejo de errores"""
@@ -40,8 +46,13 @@ class KnowledgeBase:
             print(f"❌ Error leyendo {filename}: {e}")
             return None
     
-    def load_all_knowledge(self):
-        """Carga todos los archivos de conocimiento"""
+    def load_all_knowledge(self, matcher=None):
+        """
+        Carga todos los archivos de conocimiento
+        
+        Args:
+            matcher: QueryMatcher opcional, si se da se compila el indice de frases
+        """
         file_mapping = {
             "general": "general_rules.json",
             "books": "books_rules.json",
@@ -66,6 +77,47 @@ class KnowledgeBase:
                 if category in ["computers", "cubicles"]:
                     print(f"   📝 Creando datos de ejemplo para {category}...")
                     self.knowledge[category] = self._create_example_data(category)
+        
+        if matcher is not None:
+            self.compile_index(matcher)
+    
+    def compile_index(self, matcher):
+        """Precompila las preguntas de cada regla (texto normalizado y conjuntos de palabras)"""
+        compiled = {}
+        token_index = {}
+        exact_index = {}
+        total = 0
+        
+        for category, data in self.knowledge.items():
+            compiled[category] = {}
+            if not data:
+                continue
+            
+            for rule_id, rule in data.items():
+                phrases = [
+                    matcher.compile_phrase(pregunta)
+                    for pregunta in rule.get("preguntas", [])
+                    if pregunta
+                ]
+                compiled[category][rule_id] = phrases
+                total += len(phrases)
+                
+                for phrase_id, phrase in enumerate(phrases):
+                    for token in phrase["content"]:
+                        token_index.setdefault(token, set()).add((category, rule_id, phrase_id))
+                    
+                    normalized = phrase["normalized"]
+                    if normalized:
+                        if normalized in exact_index and exact_index[normalized] != (category, rule_id):
+                            exact_index[normalized] = None  # Ambigua: la decide la busqueda
+                        else:
+                            exact_index[normalized] = (category, rule_id)
+        
+        # Reemplazo en una sola asignacion para no exponer un indice a medias
+        self.compiled = compiled
+        self.token_index = token_index
+        self.exact_index = exact_index
+        print(f"✅ Indice compilado: {total} frases, {len(token_index)} tokens")
     
     def _create_example_data(self, category: str) -> Dict:
         """Datos de ejemplo en caso de no encontrar los archivos de conocimiento"""
@@ -96,6 +148,56 @@ class KnowledgeBase:
         """Obtiene conocimiento de una categoría especifica"""
         return self.knowledge.get(category, {})
     
+    def get_compiled(self, category: str) -> Dict:
+        """Obtiene las frases precompiladas de una categoría"""
+        return self.compiled.get(category, {})
+    
+    def get_exact(self, normalized: str) -> Optional[Tuple[str, str]]:
+        """(categoria, rule_id) de la unica regla con esta pregunta normalizada, o None"""
+        return self.exact_index.get(normalized)
+    
+    def index_tokens(self, category: str, rule_id: str, phrase_id: int, tokens: Iterable[str]):
+        """Agrega tokens extra (p.ej. lemas) al indice invertido para una frase"""
+        for token in tokens:
+            if token:
+                self.token_index.setdefault(token, set()).add((category, rule_id, phrase_id))
+    
+    def get_candidates(self, category: str, tokens: Iterable[str]) -> Optional[Dict[str, List[int]]]:
+        """
+        Frases de una categoría que comparten al menos un token con la consulta
+        
+        Returns:
+            {rule_id: [indices de frase]} o None si la categoría no está indexada
+        """
+        if category not in self.compiled:
+            return None
+        
+        candidates = {}
+        for token in tokens:
+            for entry_category, rule_id, phrase_id in self.token_index.get(token, ()):
+                if entry_category == category:
+                    candidates.setdefault(rule_id, set()).add(phrase_id)
+        
+        return {rule_id: sorted(ids) for rule_id, ids in candidates.items()}
+
+    def get_all_candidates(self, tokens: Iterable[str]) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Igual que get_candidates pero para todas las categorías en una sola
+        pasada por el indice
+
+        Returns:
+            {categoria: {rule_id: [indices de frase]}} (solo categorías indexadas)
+        """
+        candidates = {category: {} for category in self.compiled}
+        for token in tokens:
+            for category, rule_id, phrase_id in self.token_index.get(token, ()):
+                candidates[category].setdefault(rule_id, set()).add(phrase_id)
+
+        return {
+            category: {rule_id: sorted(ids) for rule_id, ids in rules.items()}
+            for category, rules in candidates.items()
+        }
+
     def list_loaded_categories(self):
         """Lista las categorias cargadas y sus reglas"""
         print("\n" + "="*50)
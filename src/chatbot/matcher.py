@@ -1,13 +1,55 @@
 import json
 import os
-from typing import List, Dict, Set
+from functools import lru_cache
+from typing import List, Dict, Set, Tuple
 import re
-from difflib import SequenceMatcher
+from .similarity import char_masks, char_positions, ratio
+
+# Reemplazar sinónimos problematicos (subcadenas, como str.replace)
+PROBLEMATIC_SYNONYMS = {
+    "conseguir": "reservar",
+    "obtener": "reservar",
+    "tomar": "prestar"
+}
+
+# Una sola tabla de traduccion: acentos y la puntuacion mas comun (a espacio)
+_TRANSLATE_TABLE = str.maketrans({
+    **dict(zip("áéíóúüñ", "aeiouun")),
+    **{char: " " for char in "¿?¡!.,;:()[]\"'-/"}
+})
+
+# Cualquier otro caracter especial que no cubra la tabla
+_SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s]')
+
+# Memo acotado: la misma pregunta, frase o palabra clave se normaliza muchas veces
+NORMALIZE_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _normalize_cached(text: str) -> str:
+    """Implementacion de QueryMatcher.normalize_text (sin estado, memoizada)"""
+    text = text.lower()
+    
+    for problematic, replacement in PROBLEMATIC_SYNONYMS.items():
+        if problematic in text:
+            text = text.replace(problematic, replacement)
+    
+    text = text.translate(_TRANSLATE_TABLE)
+    words = text.split()
+    
+    # Solo pasar por la expresion regular si queda algun caracter especial
+    if not "".join(words).isalnum():
+        words = _SPECIAL_CHARS_PATTERN.sub(" ", text).split()
+    
+    return " ".join(words)
+
 
 class QueryMatcher:
     def __init__(self, synonyms_path: str):
         self.synonyms_path = synonyms_path
         self.synonyms = {}
+        # Sinónimos normalizados por token, para el indice invertido
+        self.token_synonyms: Dict[str, Set[str]] = {}
         
         self.stop_words = {
             'cómo', 'cuál', 'dónde', 'qué', 'cuánto', 'cuánta', 'cuántos', 'cuántas',
@@ -31,6 +73,10 @@ class QueryMatcher:
             "cubiculo": ["libro", "computadora", "texto", "equipo"]
         }
         
+        # Palabras que definen la categoria y verbos de accion con bonus
+        self.critical_words = {"cubiculo", "libro", "computadora"}
+        self.action_verbs = {"reservar", "prestar", "usar", "devolver"}
+        
         self.debug = False
     
     def load_synonyms(self):
@@ -59,11 +105,13 @@ class QueryMatcher:
                         self.synonyms[synonym].append(word)
             
             self.clean_synonyms()
+            self.build_token_synonyms()
             print(f"✅ Sinónimos bidireccionales cargados: {len(self.synonyms)} palabras")
             
         except Exception as e:
             print(f"❌ Error cargando sinónimos: {e}")
             self.synonyms = {}
+            self.token_synonyms = {}
     
     def clean_synonyms(self):
         """Limpia sinonimos que puedan causar confusión entre categorías"""
@@ -71,45 +119,39 @@ class QueryMatcher:
         if "conseguir" in self.synonyms and "prestar" in self.synonyms["conseguir"]:
             self.synonyms["conseguir"].remove("prestar")
     
+    def build_token_synonyms(self):
+        """Construye el mapa token normalizado -> tokens normalizados de sus sinónimos"""
+        token_synonyms = {}
+        for word, synonym_list in self.synonyms.items():
+            word_norm = self.normalize_text(word)
+            if not word_norm or " " in word_norm:
+                continue
+            related = token_synonyms.setdefault(word_norm, set())
+            for synonym in synonym_list:
+                related.update(self.normalize_text(synonym).split())
+            related.discard(word_norm)
+        self.token_synonyms = token_synonyms
+    
+    def related_tokens(self, tokens: Set[str]) -> Set[str]:
+        """Tokens de la consulta más los tokens de sus sinónimos"""
+        related = set(tokens)
+        for token in tokens:
+            related.update(self.token_synonyms.get(token, ()))
+        return related
+    
     def normalize_text(self, text: str) -> str:
         """Normaliza el texto manteniendo palabras clave importantes"""
         if not text:
             return ""
         
-        text = text.lower()
-        
-        # Mantener palabras clave importantes sin modificar
-        important_words = ["cubiculo", "libro", "computadora", "reserva", "prestamo"]
-        
-        # Reemplazar sinónimos problematicos 
-        problematic_synonyms = {
-            "conseguir": "reservar",
-            "obtener": "reservar",
-            "tomar": "prestar"
-        }
-        
-        for problematic, replacement in problematic_synonyms.items():
-            if problematic in text:
-                text = text.replace(problematic, replacement)
-        
-        # Normalizar acentos
-        replacements = {
-            'á': 'a', 'é': 'e', 'í': 'i', 'ó': 'o', 'ú': 'u',
-            'ü': 'u', 'ñ': 'n'
-        }
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        # Quitar caracteres especiales
-        text = re.sub(r'[^\w\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return _normalize_cached(text)
     
     def expand_with_synonyms(self, query: str) -> List[str]:
         """Expande la consulta incluyendo sinónimos bidireccionalmente"""
-        normalized = self.normalize_text(query)
-        
+        return self.expand_normalized(self.normalize_text(query))
+    
+    def expand_normalized(self, normalized: str) -> List[str]:
+        """Igual que expand_with_synonyms, para una consulta ya normalizada"""
         if not normalized:
             return [""]
         
@@ -159,41 +201,81 @@ class QueryMatcher:
         
         return unique_queries
     
+    def compile_phrase(self, phrase: str) -> Dict:
+        """Precalcula la forma normalizada y los conjuntos de palabras de una frase"""
+        normalized = self.normalize_text(phrase)
+        words = set(normalized.split())
+        content = words - self.stop_words
+        
+        return {
+            "text": phrase,
+            "normalized": normalized,
+            "masks": char_masks(normalized),
+            "positions": char_positions(normalized),
+            "words": words,
+            "content": content,
+            "critical": words & self.critical_words,
+            "actions": content & self.action_verbs
+        }
+    
     def calculate_similarity(self, queries: List[str], target_phrases: List[str]) -> float:
         """Calcula similitud con penalizacion por categorías cruzadas"""
         if not queries or not target_phrases:
             return 0.0
         
+        compiled_queries = [self.compile_phrase(query) for query in queries if query]
+        compiled_phrases = [self.compile_phrase(phrase) for phrase in target_phrases if phrase]
+        
+        return self.calculate_similarity_compiled(compiled_queries, compiled_phrases)
+    
+    def calculate_similarity_compiled(self, queries: List[Dict], target_phrases: List[Dict],
+                                      min_score: float = 0.0) -> float:
+        """
+        Igual que calculate_similarity pero sobre frases ya compiladas
+        con compile_phrase (sin normalizar nada durante el puntaje)
+        
+        Ramificación y acotamiento: una frase solo se evalúa por completo si su
+        cota superior puede superar el mejor puntaje actual (o min_score).
+        El resultado es exacto siempre que sea mayor que min_score.
+        """
         max_similarity = 0.0
         
         for query in queries:
-            if not query:
-                continue
-                
-            query_normalized = self.normalize_text(query)
-            query_words = set(query_normalized.split())
+            query_normalized = query["normalized"]
+            query_length = len(query_normalized)
+            query_words = query["words"]
+            query_content = query["content"]
+            query_actions = query["actions"]
+            critical_words_query = query["critical"]
             
             for phrase in target_phrases:
-                if not phrase:
-                    continue
-                    
-                phrase_normalized = self.normalize_text(phrase)
-                phrase_words = set(phrase_normalized.split())
-                
-                # Comprobacion de palabras criticas
-                critical_words_query = query_words & {"cubiculo", "libro", "computadora"}
-                critical_words_phrase = phrase_words & {"cubiculo", "libro", "computadora"}
+                phrase_words = phrase["words"]
+                phrase_content = phrase["content"]
+                critical_words_phrase = phrase["critical"]
                 
                 # Penalizacion en ausencia de coincidencias para palabras criticas
                 if critical_words_query and critical_words_phrase:
                     if critical_words_query != critical_words_phrase:
-                  
                         continue  
                 
-                # Similitud Jaccard 
-                query_content = query_words - self.stop_words
-                phrase_content = phrase_words - self.stop_words
+                floor = max(max_similarity, min_score) - 1e-9
+                
+                # Penalización por no contener en la frase palabras clave
+                penalty = 0.0
+                if critical_words_query and not (critical_words_query & phrase_words):
+                    penalty = 0.3
+                
+                # Cota por tamaños: Jaccard <= min/max, similitud textual <= 1
+                if query_content and phrase_content:
+                    sizes = (len(query_content), len(phrase_content))
+                    jaccard_bound = min(sizes) / max(sizes)
+                else:
+                    jaccard_bound = 0.0
+                actions_bound = min(len(query_actions), len(phrase["actions"])) * 0.05
+                if jaccard_bound * 0.7 + 0.2 + actions_bound - penalty <= floor:
+                    continue
                 
+                # Similitud Jaccard 
                 keyword_similarity = 0.0
                 if query_content and phrase_content:
                     intersection = len(query_content & phrase_content)
@@ -202,21 +284,26 @@ class QueryMatcher:
                     if union > 0:
                         keyword_similarity = intersection / union
                 
-                # Similitud textual
-                textual_similarity = SequenceMatcher(
-                    None, 
-                    query_normalized, 
-                    phrase_normalized
-                ).ratio()
-                
                 # Bonus por coincidencia de verbos importantes
-                action_verbs = {"reservar", "prestar", "usar", "devolver"}
-                common_actions = query_content & phrase_content & action_verbs
-                bonus = len(common_actions) * 0.05
+                common_actions = query_actions & phrase["actions"]
+                bonus = len(common_actions) * 0.05 - penalty
                 
-                # Penalización por no contener en la frase palabras clave
-                if critical_words_query and not (critical_words_query & phrase_words):
-                    bonus -= 0.3  
+                # Cota de la similitud textual por longitudes (como real_quick_ratio)
+                phrase_length = len(phrase["normalized"])
+                total_length = query_length + phrase_length
+                textual_bound = 2.0 * min(query_length, phrase_length) / total_length if total_length else 1.0
+                base = (keyword_similarity * 0.7) + bonus
+                if base + textual_bound * 0.2 <= floor:
+                    continue
+                
+                # Similitud textual (la de SequenceMatcher, con los indices de la frase
+                # precalculados); el corte permite descartar el par si no puede
+                # superar el mejor puntaje
+                cutoff = max(0.0, (floor - base) / 0.2)
+                textual_similarity = ratio(
+                    query_normalized, phrase["normalized"], score_cutoff=cutoff,
+                    masks=phrase["masks"], positions=phrase["positions"]
+                )
                 
                 # Combinar
                 combined = (keyword_similarity * 0.7) + (textual_similarity * 0.2) + bonus
@@ -224,5 +311,55 @@ class QueryMatcher:
                 
                 if combined > max_similarity:
                     max_similarity = combined
+                    
+                    # Coincidencia perfecta: nada puede superarla
+                    if max_similarity >= 1.0:
+                        return 1.0
+        
+        return min(max_similarity, 1.0)
+    
+    def similarity_bounds(self, queries: List[Dict], target_phrases: List[Dict]) -> Tuple[float, float]:
+        """
+        Cotas baratas de calculate_similarity_compiled usando solo los conjuntos
+        de palabras (sin similitud textual)
+        
+        Returns:
+            (inferior, superior): el puntaje exacto está en ese rango. La inferior
+            supone similitud textual 0; la superior, la máxima que permiten las
+            longitudes.
+        """
+        lower = 0.0
+        upper = 0.0
+        
+        for query in queries:
+            query_length = len(query["normalized"])
+            query_content = query["content"]
+            query_actions = query["actions"]
+            critical_words_query = query["critical"]
+            
+            for phrase in target_phrases:
+                phrase_content = phrase["content"]
+                critical_words_phrase = phrase["critical"]
+                
+                if critical_words_query and critical_words_phrase:
+                    if critical_words_query != critical_words_phrase:
+                        continue
+                
+                penalty = 0.0
+                if critical_words_query and not (critical_words_query & phrase["words"]):
+                    penalty = 0.3
+                
+                keyword_similarity = 0.0
+                if query_content and phrase_content:
+                    keyword_similarity = len(query_content & phrase_content) / len(query_content | phrase_content)
+                
+                base = (keyword_similarity * 0.7) + len(query_actions & phrase["actions"]) * 0.05 - penalty
+                
+                phrase_length = len(phrase["normalized"])
+                total_length = query_length + phrase_length
+                textual_bound = 2.0 * min(query_length, phrase_length) / total_length if total_length else 1.0
+                
+                lower = max(lower, base)
+                upper = max(upper, base + textual_bound * 0.2)
         
-        return min(max_similarity, 1.0)
\ No newline at end of file
+        return min(max(lower, 0.0), 1.0), min(max(upper, 0.0), 1.0)
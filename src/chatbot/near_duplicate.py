@@ -0,0 +1,191 @@
+"""
+Cache de consultas casi duplicadas (MinHash + LSH)
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+# Primo de Mersenne 2^31 - 1 para las funciones hash (a*x + b) mod p
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+class NearDuplicateCache:
+    """
+    Asocia consultas casi iguales (erratas, signos, una palabra de mas) a una
+    decision ya calculada.
+
+    Cada consulta se representa por sus shingles de caracteres; la firma
+    MinHash estima la similitud de Jaccard entre dos consultas y el indice
+    LSH (bandas de la firma) encuentra candidatos sin comparar contra todas
+    las entradas guardadas.
+    """
+
+    def __init__(self, threshold: float = 0.85, max_size: int = 2048,
+                 num_perm: int = 64, bands: int = 16, shingle_size: int = 3,
+                 seed: int = 1):
+        """
+        Args:
+            threshold: Similitud estimada minima para reutilizar una decision
+            max_size: Numero maximo de entradas (se desaloja la menos usada)
+            num_perm: Longitud de la firma MinHash
+            bands: Bandas LSH (num_perm debe ser multiplo de bands)
+            shingle_size: Longitud de los shingles de caracteres
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm debe ser multiplo de bands")
+
+        self.threshold = threshold
+        self.max_size = max_size
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self._b = generator.randint(0, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+        # Formato: {(scope, texto): (firma, valor, llaves de banda)}
+        self.entries: "OrderedDict[Tuple[Hashable, str], tuple]" = OrderedDict()
+        # Formato: {(scope, banda, bytes de la banda): {(scope, texto), ...}}
+        self.buckets: Dict[tuple, set] = {}
+        self.lock = threading.Lock()
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+
+    def shingles(self, text: str) -> List[str]:
+        """Shingles de caracteres del texto (con espacios en los extremos)"""
+        padded = f" {text} "
+        size = self.shingle_size
+        if len(padded) <= size:
+            return [padded]
+        return [padded[i:i + size] for i in range(len(padded) - size + 1)]
+
+    def signature(self, text: str) -> np.ndarray:
+        """Firma MinHash del texto"""
+        hashes = np.array(
+            [zlib.crc32(shingle.encode("utf-8")) for shingle in set(self.shingles(text))],
+            dtype=np.uint64
+        )
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1)
+
+    def _band_keys(self, scope: Hashable, signature: np.ndarray) -> List[tuple]:
+        rows = self.rows
+        return [
+            (scope, band, signature[band * rows:(band + 1) * rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def lookup(self, scope: Hashable, text: str) -> Tuple[Optional[Any], np.ndarray]:
+        """
+        Busca una decision guardada para un texto casi igual dentro del mismo
+        scope (p.ej. la categoria).
+
+        Returns:
+            (valor o None, firma del texto para reutilizarla en store)
+        """
+        signature = self.signature(text)
+        band_keys = self._band_keys(scope, signature)
+
+        with self.lock:
+            entry = self.entries.get((scope, text))
+            if entry is not None:
+                self.entries.move_to_end((scope, text))
+                self.hits += 1
+                return entry[1], signature
+
+            candidates = set()
+            for band_key in band_keys:
+                candidates |= self.buckets.get(band_key, set())
+
+            best_key = None
+            best_similarity = self.threshold
+            for key in candidates:
+                similarity = float(np.count_nonzero(self.entries[key][0] == signature)) / self.num_perm
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None:
+                self.misses += 1
+                return None, signature
+
+            self.entries.move_to_end(best_key)
+            self.hits += 1
+            return self.entries[best_key][1], signature
+
+    def store(self, scope: Hashable, text: str, value: Any,
+              signature: Optional[np.ndarray] = None, generation: Optional[int] = None) -> bool:
+        """
+        Guarda una decision.
+
+        Args:
+            signature: Firma devuelta por lookup (se calcula si no se da)
+            generation: Generacion observada al iniciar el calculo; si la cache
+                se vació desde entonces, el valor se descarta
+        """
+        if signature is None:
+            signature = self.signature(text)
+        band_keys = self._band_keys(scope, signature)
+        key = (scope, text)
+
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return False
+
+            if key in self.entries:
+                self._remove(key)
+
+            self.entries[key] = (signature, value, band_keys)
+            for band_key in band_keys:
+                self.buckets.setdefault(band_key, set()).add(key)
+
+            while len(self.entries) > self.max_size:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+            return True
+
+    def _remove(self, key: Tuple[Hashable, str]):
+        """Quita una entrada y sus referencias en las bandas (con el lock tomado)"""
+        _, _, band_keys = self.entries.pop(key)
+        for band_key in band_keys:
+            bucket = self.buckets.get(band_key)
+            if bucket is None:
+                continue
+            bucket.discard(key)
+            if not bucket:
+                del self.buckets[band_key]
+
+    def clear(self) -> int:
+        """Vaciar la cache de forma atomica"""
+        with self.lock:
+            count = len(self.entries)
+            self.entries = OrderedDict()
+            self.buckets = {}
+            self.generation += 1
+            self.flushes += 1
+            return count
+
+    def get_stats(self) -> Dict:
+        """Estadisticas de uso (cada acierto es una busqueda completa evitada)"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "searches_saved": self.hits,
+                "evictions": self.evictions,
+                "flushes": self.flushes
+            }
@@ -0,0 +1,45 @@
+from typing import Dict, List, Optional, Set
+
+
+class QueryAnalysis:
+    """
+    Analisis de una pregunta, calculado una sola vez por solicitud.
+
+    Todas las etapas (categorizacion, expansion, busqueda y entidades)
+    consumen este objeto en lugar de volver a normalizar o a procesar
+    la pregunta con Spacy.
+    """
+
+    def __init__(
+        self,
+        question: str,
+        normalized: str,
+        tokens: List[str],
+        lemmas: List[str],
+        entity_lemmas: List[str],
+        expanded_queries: List[str],
+        compiled_queries: List[Dict],
+        query_lemmas: Optional[List[Set[str]]],
+        search_tokens: Set[str]
+    ):
+        """
+        Args:
+            question: Pregunta original del usuario
+            normalized: Pregunta normalizada
+            tokens: Palabras de la pregunta normalizada
+            lemmas: Lemas de contenido (sin stop words, longitud > 2)
+            entity_lemmas: Lemas usados para la extraccion de entidades
+            expanded_queries: Consultas expandidas con sinonimos y lemas
+            compiled_queries: Consultas expandidas compiladas por QueryMatcher
+            query_lemmas: Lemas de cada consulta expandida (None en modo basico)
+            search_tokens: Tokens (y sinonimos) para el indice invertido
+        """
+        self.question = question
+        self.normalized = normalized
+        self.tokens = tokens
+        self.lemmas = lemmas
+        self.entity_lemmas = entity_lemmas
+        self.expanded_queries = expanded_queries
+        self.compiled_queries = compiled_queries
+        self.query_lemmas = query_lemmas
+        self.search_tokens = search_tokens
@@ -2,6 +2,7 @@
 Rate Limiter para asistente virtual 
 """
 
+import threading
 import time
 from typing import Dict, List, Tuple, Optional
 from collections import defaultdict
@@ -28,6 +29,9 @@ class RateLimiter:
         
         self.blocked_requests: Dict[str, int] = defaultdict(int)
         
+        # Las consultas pueden procesarse en varios hilos a la vez
+        self.lock = threading.Lock()
+        
         # Limpieza
         self.last_cleanup = time.time()
         self.cleanup_interval = 300  
@@ -44,53 +48,56 @@ class RateLimiter:
             - Allowed: (True, remaining_requests)
             - Blocked: (False, seconds_to_wait)
         """
-        now = time.time()
-        
-        # Limpieza de solicitudes viejas
-        self._cleanup_if_needed(now)
-        
-        # Solicitar historial id
-        timestamps = self.requests[identifier]
-        
-        # Limpiar solicitudes mas viejas que el intervalo
-        while timestamps and timestamps[0] < now - self.window_seconds:
-            timestamps.pop(0)
-        
-        # Validar si se excedio el limite
-        if len(timestamps) >= self.max_requests:
-            # Cuanto falta para que expire ultimo request, y solicitudes bloqueadas 
-            oldest = timestamps[0]
-            wait_time = int(self.window_seconds - (now - oldest)) + 1
+        with self.lock:
+            now = time.time()
+            
+            # Limpieza de solicitudes viejas
+            self._cleanup_if_needed(now)
             
-            self.blocked_requests[identifier] += 1
+            # Solicitar historial id
+            timestamps = self.requests[identifier]
             
-            return False, wait_time
+            # Limpiar solicitudes mas viejas que el intervalo
+            while timestamps and timestamps[0] < now - self.window_seconds:
+                timestamps.pop(0)
+            
+            # Validar si se excedio el limite
+            if len(timestamps) >= self.max_requests:
+                # Cuanto falta para que expire ultimo request, y solicitudes bloqueadas 
+                oldest = timestamps[0]
+                wait_time = int(self.window_seconds - (now - oldest)) + 1
+            
+                self.blocked_requests[identifier] += 1
+            
+                return False, wait_time
 
-        timestamps.append(now)
-        remaining = self.max_requests - len(timestamps)
-        
-        return True, remaining
+            timestamps.append(now)
+            remaining = self.max_requests - len(timestamps)
+            
+            return True, remaining
     
     def get_remaining(self, identifier: str) -> int:
         """Recibe requests restantes."""
-        now = time.time()
-        timestamps = self.requests.get(identifier, [])
-        
-        while timestamps and timestamps[0] < now - self.window_seconds:
-            timestamps.pop(0)
-        
-        return self.max_requests - len(timestamps)
+        with self.lock:
+            now = time.time()
+            timestamps = self.requests.get(identifier, [])
+            
+            while timestamps and timestamps[0] < now - self.window_seconds:
+                timestamps.pop(0)
+            
+            return self.max_requests - len(timestamps)
     
     def get_reset_time(self, identifier: str) -> Optional[int]:
         """Regresa los segundos restantes para un nuevo in tervalo de preguntas, solo si se ha excedido."""
-        now = time.time()
-        timestamps = self.requests.get(identifier, [])
-        
-        if len(timestamps) < self.max_requests:
-            return None
-        
-        oldest = timestamps[0]
-        return int(self.window_seconds - (now - oldest)) + 1
+        with self.lock:
+            now = time.time()
+            timestamps = self.requests.get(identifier, [])
+            
+            if len(timestamps) < self.max_requests:
+                return None
+            
+            oldest = timestamps[0]
+            return int(self.window_seconds - (now - oldest)) + 1
     
     def reset(self, identifier: Optional[str] = None):
         """
@@ -100,32 +107,34 @@ class RateLimiter:
             identifier: Si se recibe ID, se resetea solo este.
                         Si no, todos son reseteados.
         """
-        if identifier:
-            self.requests.pop(identifier, None)
-            self.blocked_requests.pop(identifier, None)
-        else:
-            self.requests.clear()
-            self.blocked_requests.clear()
+        with self.lock:
+            if identifier:
+                self.requests.pop(identifier, None)
+                self.blocked_requests.pop(identifier, None)
+            else:
+                self.requests.clear()
+                self.blocked_requests.clear()
     
     def get_stats(self) -> Dict:
         """Estadisticas de rate limiter."""
-        total_active = len(self.requests)
-        total_blocked = sum(self.blocked_requests.values())
-        
-        # Top bloqueos
-        top_blocked = sorted(
-            self.blocked_requests.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-        
-        return {
-            "active_identifiers": total_active,
-            "total_blocked_requests": total_blocked,
-            "max_requests_per_window": self.max_requests,
-            "window_seconds": self.window_seconds,
-            "top_blocked": [{"identifier": id, "blocked": count} for id, count in top_blocked]
-        }
+        with self.lock:
+            total_active = len(self.requests)
+            total_blocked = sum(self.blocked_requests.values())
+            
+            # Top bloqueos
+            top_blocked = sorted(
+                self.blocked_requests.items(),
+                key=lambda x: x[1],
+                reverse=True
+            )[:5]
+            
+            return {
+                "active_identifiers": total_active,
+                "total_blocked_requests": total_blocked,
+                "max_requests_per_window": self.max_requests,
+                "window_seconds": self.window_seconds,
+                "top_blocked": [{"identifier": id, "blocked": count} for id, count in top_blocked]
+            }
     
     def _cleanup_if_needed(self, now: float):
         """Limpieza de solicitudes viejas para liberar memoria"""
@@ -0,0 +1,117 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class TfidfRetriever:
+    """
+    Motor de recuperacion vectorizado sobre todas las preguntas de la base.
+
+    Mantiene una matriz TF-IDF dispersa (una fila por frase, normalizada L2)
+    y responde una consulta con un producto matriz-vector disperso mas una
+    seleccion top-k, en lugar de recorrer regla por regla en Python.
+    """
+
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = None
+        # Regla de cada bloque de filas: [(categoria, rule_id), ...]
+        self.rules: List[Tuple[str, str]] = []
+        # Fila inicial de cada regla (las frases de una regla son contiguas)
+        self.rule_starts = None
+        # Categoria de cada regla, para filtrar sin recorrer en Python
+        self.rule_categories = None
+        self.ready = False
+
+    def fit(self, knowledge_base) -> bool:
+        """Construye la matriz a partir del indice compilado de KnowledgeBase"""
+        # Solo el motor "tfidf" necesita scikit-learn
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        texts = []
+        rules = []
+        rule_starts = []
+
+        for category, compiled_rules in knowledge_base.compiled.items():
+            for rule_id, phrases in compiled_rules.items():
+                phrase_texts = [phrase["normalized"] for phrase in phrases if phrase["normalized"]]
+                if not phrase_texts:
+                    continue
+                rule_starts.append(len(texts))
+                rules.append((category, rule_id))
+                texts.extend(phrase_texts)
+
+        if not texts:
+            self.ready = False
+            return False
+
+        vectorizer = TfidfVectorizer(
+            analyzer='char_wb',
+            ngram_range=(3, 5),
+            sublinear_tf=True
+        )
+        matrix = vectorizer.fit_transform(texts).tocsr()
+
+        # Reemplazo completo para que una busqueda concurrente no vea un estado mixto
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.rules = rules
+        self.rule_starts = np.array(rule_starts)
+        self.rule_categories = np.array([category for category, _ in rules])
+        self.ready = True
+
+        print(f"✅ Motor TF-IDF: {len(texts)} frases, {len(rules)} reglas, {matrix.shape[1]} rasgos")
+        return True
+
+    def search(self, queries: List[str], category: Optional[str] = None,
+               top_k: int = 1, weights: Optional[Dict[str, float]] = None) -> List[Tuple[str, str, float]]:
+        """
+        Reglas mas similares (coseno) a cualquiera de las consultas.
+
+        Args:
+            queries: Consultas normalizadas (p.ej. las expandidas)
+            category: Restringir a una categoria (opcional)
+            top_k: Numero de reglas a devolver
+            weights: Peso por categoria para ordenar (opcional); el score
+                devuelto sigue siendo la similitud sin ponderar
+
+        Returns:
+            [(categoria, rule_id, score), ...] ordenado de mayor a menor
+        """
+        queries = [query for query in queries if query]
+        if not self.ready or not queries:
+            return []
+
+        query_matrix = self.vectorizer.transform(queries)
+
+        # Un solo producto disperso: similitud de cada frase con cada consulta
+        phrase_scores = (self.matrix @ query_matrix.T).max(axis=1).toarray().ravel()
+
+        # Maximo por regla sobre sus filas contiguas
+        rule_scores = np.maximum.reduceat(phrase_scores, self.rule_starts)
+
+        if category is not None:
+            rule_scores = np.where(self.rule_categories == category, rule_scores, -1.0)
+
+        ranking = rule_scores
+        if weights is not None:
+            rule_weights = np.ones(len(rule_scores))
+            for weighted_category, weight in weights.items():
+                rule_weights[self.rule_categories == weighted_category] = weight
+            ranking = rule_scores * rule_weights
+
+        k = min(top_k, len(rule_scores))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-ranking, k - 1)[:k]
+        top = top[np.argsort(-ranking[top], kind='stable')]
+
+        results = []
+        for index in top:
+            score = float(rule_scores[index])
+            if score <= 0.0:
+                break
+            rule_category, rule_id = self.rules[index]
+            results.append((rule_category, rule_id, min(score, 1.0)))
+        return results
@@ -0,0 +1,159 @@
+"""
+Kernel de similitud textual para QueryMatcher.
+
+ratio(a, b) es exactamente difflib.SequenceMatcher(None, a, b).ratio():
+2 * M / (len(a) + len(b)), con M la suma de los bloques que encuentra
+SequenceMatcher (el bloque comun mas largo y, recursivamente, los de cada
+lado). La diferencia esta en el costo:
+
+- Los indices de b (char_positions) se precalculan una vez por frase de la
+  base en lugar de reconstruirse en cada llamada.
+- La subsecuencia comun mas larga (LCS, algoritmo bit-paralelo de
+  Allison-Dix/Hyyro) es una cota superior barata de M: si 2 * LCS / total no
+  alcanza score_cutoff, el par se descarta sin buscar bloques.
+
+tests/test_similarity.py compara ratio() con SequenceMatcher en todos los
+pares de frases de la base incluida.
+"""
+
+from typing import Dict, List, Optional
+
+# SequenceMatcher ignora (autojunk) los caracteres muy frecuentes de b
+# cuando b tiene al menos esta longitud
+AUTOJUNK_MIN_LENGTH = 200
+
+
+def char_masks(text: str) -> Dict[str, int]:
+    """Mascara de bits por caracter: bit i encendido si text[i] == caracter"""
+    masks = {}
+    bit = 1
+    for char in text:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def char_positions(text: str) -> Dict[str, List[int]]:
+    """
+    Posiciones de cada caracter en text, como SequenceMatcher.b2j
+    (incluida la eliminacion autojunk de caracteres populares)
+    """
+    positions = {}
+    for index, char in enumerate(text):
+        positions.setdefault(char, []).append(index)
+
+    length = len(text)
+    if length >= AUTOJUNK_MIN_LENGTH:
+        limit = length // 100 + 1
+        for char in [char for char, indexes in positions.items() if len(indexes) > limit]:
+            del positions[char]
+
+    return positions
+
+
+def lcs_length(a: str, b: str, masks: Optional[Dict[str, int]] = None) -> int:
+    """
+    Longitud de la subsecuencia comun mas larga de a y b
+
+    Args:
+        masks: char_masks(a) precalculado (p.ej. para frases de la base)
+    """
+    if not a or not b:
+        return 0
+    if masks is None:
+        masks = char_masks(a)
+
+    full = (1 << len(a)) - 1
+    v = full
+    for char in b:
+        u = v & masks.get(char, 0)
+        v = ((v + u) | (v - u)) & full
+
+    return len(a) - bin(v).count("1")
+
+
+def _longest_match(a: str, b: str, positions: Dict[str, List[int]],
+                   alo: int, ahi: int, blo: int, bhi: int):
+    """SequenceMatcher.find_longest_match sin isjunk: (i, j, tamaño)"""
+    best_i, best_j, best_size = alo, blo, 0
+    lengths = {}
+    nothing = []
+    for i in range(alo, ahi):
+        lengths_get = lengths.get
+        new_lengths = {}
+        for j in positions.get(a[i], nothing):
+            if j < blo:
+                continue
+            if j >= bhi:
+                break
+            k = new_lengths[j] = lengths_get(j - 1, 0) + 1
+            if k > best_size:
+                best_i, best_j, best_size = i - k + 1, j - k + 1, k
+        lengths = new_lengths
+
+    # Extiende sobre caracteres eliminados por autojunk, como SequenceMatcher
+    while best_i > alo and best_j > blo and a[best_i - 1] == b[best_j - 1]:
+        best_i, best_j, best_size = best_i - 1, best_j - 1, best_size + 1
+    while (best_i + best_size < ahi and best_j + best_size < bhi
+           and a[best_i + best_size] == b[best_j + best_size]):
+        best_size += 1
+
+    return best_i, best_j, best_size
+
+
+def matching_characters(a: str, b: str, positions: Optional[Dict[str, List[int]]] = None) -> int:
+    """
+    Suma de los bloques de SequenceMatcher(None, a, b).get_matching_blocks()
+
+    Args:
+        positions: char_positions(b) precalculado
+    """
+    if positions is None:
+        positions = char_positions(b)
+
+    matches = 0
+    queue = [(0, len(a), 0, len(b))]
+    while queue:
+        alo, ahi, blo, bhi = queue.pop()
+        i, j, k = _longest_match(a, b, positions, alo, ahi, blo, bhi)
+        if k:
+            matches += k
+            if alo < i and blo < j:
+                queue.append((alo, i, blo, j))
+            if i + k < ahi and j + k < bhi:
+                queue.append((i + k, ahi, j + k, bhi))
+
+    return matches
+
+
+def ratio(a: str, b: str, score_cutoff: float = 0.0,
+          masks: Optional[Dict[str, int]] = None,
+          positions: Optional[Dict[str, List[int]]] = None) -> float:
+    """
+    Similitud 0-1 entre a y b, igual a SequenceMatcher(None, a, b).ratio()
+
+    Args:
+        score_cutoff: Si el resultado no puede alcanzar este valor se devuelve 0.0
+            sin buscar los bloques
+        masks: char_masks(b) precalculado
+        positions: char_positions(b) precalculado
+    """
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+
+    # Cota por longitudes: ningun bloque supera la cadena mas corta
+    if score_cutoff > 0.0 and 2.0 * min(len(a), len(b)) / total < score_cutoff:
+        return 0.0
+
+    if not a or not b:
+        return 0.0
+
+    # Cota por LCS: los bloques de SequenceMatcher son una subsecuencia comun
+    if score_cutoff > 0.0 and 2.0 * lcs_length(b, a, masks) / total < score_cutoff:
+        return 0.0
+
+    result = 2.0 * matching_characters(a, b, positions) / total
+    if result < score_cutoff:
+        return 0.0
+    return result
@@ -1,20 +1,135 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.api.endpoints import router as chatbot_router
+from src.api.executor import QueryExecutor
+
+
+def build_chatbot():
+    """Construye el ChatBot (modelo Spacy, base de conocimiento, clasificador)"""
+    from src.chatbot.core import ChatBot
+
+    started = time.perf_counter()
+    chatbot = ChatBot(retrieval_engine=os.environ.get("CHATBOT_RETRIEVAL_ENGINE", "fuzzy"))
+    print(f"✅ ChatBot listo en {time.perf_counter() - started:.1f}s")
+    return chatbot
+
+
+def _attach_chatbot(app: FastAPI, chatbot):
+    """Publica el ChatBot para los endpoints"""
+    executor = app.state.executor
+    if executor.mode == "process" and chatbot.answer_pool is None:
+        chatbot.enable_answer_pool(workers=executor.max_workers)
+    app.state.chatbot = chatbot
+
+
+def _warmup_questions() -> Optional[List[str]]:
+    """
+    CHATBOT_WARMUP=false omite el calentamiento; CHATBOT_WARMUP_FILE (lista
+    JSON de preguntas) reemplaza las preguntas por defecto del ChatBot
+    """
+    if os.environ.get("CHATBOT_WARMUP", "true").lower() != "true":
+        return []
+
+    path = os.environ.get("CHATBOT_WARMUP_FILE")
+    if not path:
+        return None
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            questions = json.load(f)
+        if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+            print(f"❌ {path} debe ser una lista de preguntas, usando las preguntas por defecto")
+            return None
+        return questions
+    except Exception as e:
+        print(f"❌ Error leyendo {path}: {e}, usando las preguntas por defecto")
+        return None
+
+
+def warm_chatbot(chatbot):
+    """Calienta el ChatBot si todavía no se hizo (p.ej. en el proceso padre de src.prefork)"""
+    if chatbot.get_warmup_status()["state"] == "pending":
+        chatbot.warmup(_warmup_questions())
+
+
+async def _prepare_in_background(app: FastAPI, chatbot=None):
+    """Construye el ChatBot si falta y lo calienta, sin bloquear el event loop"""
+    loop = asyncio.get_running_loop()
+    try:
+        if chatbot is None:
+            chatbot = await loop.run_in_executor(None, build_chatbot)
+            _attach_chatbot(app, chatbot)
+        await loop.run_in_executor(None, warm_chatbot, chatbot)
+    except Exception as e:
+        app.state.startup_error = str(e)
+        print(f"❌ Error construyendo el ChatBot: {e}")
+
+
+def create_app(chatbot=None, background: Optional[bool] = None) -> FastAPI:
+    """
+    Crea la aplicación. El ChatBot se construye al iniciar (lifespan), no
+    al importar, y se calienta en segundo plano (ver /chatbot/ready).
+
+    Args:
+        chatbot: ChatBot ya construido (p.ej. en pruebas o en src.prefork);
+            si se da no se construye otro
+        background: Construir el ChatBot en segundo plano; el puerto acepta
+            conexiones de inmediato y los endpoints responden 503 hasta que
+            esté listo. Por defecto CHATBOT_BACKGROUND_STARTUP (false)
+    """
+    if background is None:
+        background = os.environ.get("CHATBOT_BACKGROUND_STARTUP", "false").lower() == "true"
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if app.state.chatbot is not None:
+            _attach_chatbot(app, app.state.chatbot)
+        elif not background:
+            _attach_chatbot(app, build_chatbot())
+        loader = asyncio.create_task(_prepare_in_background(app, app.state.chatbot))
+
+        yield
+
+        if not loader.done():
+            loader.cancel()
+        app.state.executor.shutdown()
+        if app.state.chatbot is not None and app.state.chatbot.answer_pool is not None:
+            app.state.chatbot.answer_pool.shutdown()
+
+    app = FastAPI(title="Library Chatbot Microservice", lifespan=lifespan)
+
+    app.state.chatbot = chatbot
+    app.state.startup_error = None
+    # "inline" (en el event loop), "thread" (pool de hilos) o "process" (pool de procesos)
+    app.state.executor = QueryExecutor(
+        mode=os.environ.get("CHATBOT_EXECUTION_MODE", "thread"),
+        max_workers=int(os.environ.get("CHATBOT_EXECUTOR_WORKERS", "4")),
+        max_queue=int(os.environ.get("CHATBOT_EXECUTOR_QUEUE", "32"))
+    )
+
+    # Placeholder CORS, para permitir conexión desde el programa principal principal
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:8001"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.include_router(chatbot_router)
 
-app = FastAPI(title="Library Chatbot Microservice")
+    @app.get("/")
+    def read_root():
+        return {"status": "Chatbot microservice running"}
 
-# Placeholder CORS, para permitir conexión desde el programa principal principal
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:8001"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    return app
 
-app.include_router(chatbot_router)
 
-@app.get("/")
-def read_root():
-    return {"status": "Chatbot microservice running"}
\ No newline at end of file
+app = create_app()
@@ -5,10 +5,16 @@ class ChatRequest(BaseModel):
     question: str = Field(..., min_length=1, description="Pregunta de usuario")
     session_id: str = Field(..., description="Identificador de sesion")
 
+class Alternative(BaseModel):
+    answer: str
+    confidence: float
+    source: str
+
 class ChatResponse(BaseModel):
     question: str
     answer: str
     confidence: float
     source: str
     entities: Dict[str, List[str]]
+    alternatives: List[Alternative] = []
     session_id: str  
\ No newline at end of file
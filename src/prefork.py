@@ -0,0 +1,128 @@
+"""
+Servidor con procesos preforkeados
+
+Carga y calienta la aplicación (ChatBot, modelo Spacy, base de conocimiento
+y clasificador) una sola vez en el proceso principal, congela el heap
+(gc.freeze) y crea los workers con fork. Los workers comparten esas
+páginas de solo lectura (copy-on-write) en lugar de cargar cada uno su
+propia copia como con `uvicorn --workers N`.
+
+Uso:
+    python -m src.prefork --workers 4 --port 8001
+
+Igual que con `uvicorn --workers`, cada worker tiene sus propias sesiones,
+rate limiting y caches, y /chatbot/admin/reload solo recarga el worker que
+recibe la solicitud.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict
+
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Socket compartido por todos los workers (el kernel reparte las conexiones)"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _spawn_worker(app, sock: socket.socket, log_level: str) -> int:
+    """Fork de un worker que atiende el socket con uvicorn"""
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Worker: las señales las maneja uvicorn, no las del proceso principal
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    exit_code = 0
+    try:
+        import uvicorn
+
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+        server.run(sockets=[sock])
+    except Exception as e:
+        print(f"❌ Worker {os.getpid()} terminó con error: {e}")
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Chatbot con workers preforkeados")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+
+    # Todo lo costoso se carga aquí, antes del fork
+    from src.main import build_chatbot, create_app, warm_chatbot
+
+    chatbot = build_chatbot()
+    warm_chatbot(chatbot)
+    app = create_app(chatbot=chatbot)
+
+    sock = _bind(args.host, args.port)
+
+    # Sin esto, la primera recolección de cada worker escribe en los
+    # encabezados de todos los objetos heredados y duplica sus páginas
+    gc.collect()
+    gc.freeze()
+
+    print(f"✅ Aplicación cargada en {time.perf_counter() - started:.1f}s "
+          f"({gc.get_freeze_count()} objetos congelados)")
+
+    workers: Dict[int, int] = {}
+    for index in range(args.workers):
+        workers[_spawn_worker(app, sock, args.log_level)] = index
+    print(f"✅ {args.workers} workers en http://{args.host}:{args.port} (pids: {sorted(workers)})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Reemplazar los workers que terminen inesperadamente
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        index = workers.pop(pid, None)
+        if index is None or stopping:
+            continue
+
+        print(f"⚠️  Worker {pid} terminó (estado {status}), creando uno nuevo")
+        workers[_spawn_worker(app, sock, args.log_level)] = index
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
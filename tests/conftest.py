@@ -0,0 +1,28 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+from src.chatbot.core import ChatBot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def models_workdir(tmp_path_factory):
+    """Directorio de trabajo compartido: el clasificador se entrena una sola vez"""
+    return tmp_path_factory.mktemp("chatbot")
+
+
+@pytest.fixture
+def chatbot(models_workdir, monkeypatch):
+    """ChatBot en modo básico con la base del repositorio (models/ queda fuera del repo)"""
+    monkeypatch.chdir(models_workdir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot = ChatBot(
+            knowledge_path=os.path.join(ROOT, "knowledge"),
+            synonyms_path=os.path.join(ROOT, "synonyms"),
+            use_spacy=False
+        )
+    return chatbot
@@ -0,0 +1,115 @@
+import pytest
+
+import src.chatbot.answer_cache as answer_cache_module
+from src.chatbot.answer_cache import AnswerCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(answer_cache_module.time, "time", clock.time)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = AnswerCache(max_size=4, ttl_seconds=10)
+    cache.put("a", 1)
+
+    clock.now += 10
+    assert cache.get("a") == 1
+
+    clock.now += 0.5
+    assert cache.get("a") is None
+    stats = cache.get_stats()
+    assert stats["expirations"] == 1
+    assert stats["size"] == 0
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = AnswerCache(max_size=2, ttl_seconds=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_get_any_returns_first_live_key_and_counts_once(clock):
+    cache = AnswerCache(max_size=4, ttl_seconds=10)
+    cache.put(("pregunta", "books"), "seguimiento")
+    assert cache.get_any([("pregunta", "*"), ("pregunta", "books")]) == "seguimiento"
+
+    cache.put(("pregunta", "*"), "general")
+    assert cache.get_any([("pregunta", "*"), ("pregunta", "books")]) == "general"
+    assert cache.get_any([("otra", "*"), ("otra", None)]) is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_clear_discards_results_computed_before_it(clock):
+    cache = AnswerCache(max_size=4, ttl_seconds=10)
+    cache.put("a", 1)
+    generation = cache.generation
+
+    assert cache.clear() == 1
+    assert cache.get("a") is None
+
+    # Un resultado calculado con la base anterior no se guarda
+    assert cache.put("b", 2, generation) is False
+    assert cache.get("b") is None
+    assert cache.put("b", 2, cache.generation) is True
+    assert cache.get("b") == 2
+    assert cache.get_stats()["flushes"] == 1
+
+
+def ask(chatbot, question, session_id, last_category=None):
+    chatbot.session_manager.create_session_with_id(session_id)
+    if last_category:
+        chatbot.session_manager.update_session(session_id, {"last_category": last_category})
+    return chatbot.process_question(question, session_id)
+
+
+def test_repeated_question_is_answered_from_cache(chatbot):
+    first = ask(chatbot, "¿Cuántos libros puedo pedir prestados?", "s1")
+    hits = chatbot.answer_cache.hits
+    second = ask(chatbot, "cuantos libros puedo pedir prestados", "s2")
+
+    assert chatbot.answer_cache.hits == hits + 1
+    assert (second["answer"], second["source"], second["confidence"]) == \
+        (first["answer"], first["source"], first["confidence"])
+
+
+def test_followup_answers_are_keyed_by_session_context(chatbot):
+    books = ask(chatbot, "cuanto tiempo", "s1", last_category="books")
+    computers = ask(chatbot, "cuanto tiempo", "s2", last_category="computers")
+
+    assert (books["source"], computers["source"]) == ("books", "computers")
+    assert ("cuanto tiempo", "books") in chatbot.answer_cache.entries
+    assert ("cuanto tiempo", "computers") in chatbot.answer_cache.entries
+    assert ("cuanto tiempo", "*") not in chatbot.answer_cache.entries
+
+    hits = chatbot.answer_cache.hits
+    assert ask(chatbot, "cuanto tiempo", "s3", last_category="books")["source"] == "books"
+    assert chatbot.answer_cache.hits == hits + 1
+
+
+def test_reload_flushes_the_cache(chatbot, capsys):
+    ask(chatbot, "cuantos libros puedo pedir prestados", "s1")
+    assert chatbot.answer_cache.entries
+    flushes = chatbot.answer_cache.flushes
+
+    chatbot.load_resources()
+    assert not chatbot.answer_cache.entries
+    assert chatbot.answer_cache.flushes == flushes + 1
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.chatbot.answer_pool import AnswerPoolClosedError, AnswerProcessPool
+from src.chatbot.cascade import CascadeMetrics
+from src.chatbot.near_duplicate import NearDuplicateCache
+from src.main import create_app
+
+
+class PoolChatBot:
+    """Lo que usan AnswerProcessPool y sus procesos hijos"""
+
+    def __init__(self):
+        self.near_duplicate_cache = NearDuplicateCache()
+        self.cascade_metrics = CascadeMetrics()
+        self.version = 1
+
+    def _answer_question(self, question, question_for_processing, context_category):
+        started = time.perf_counter()
+        self.cascade_metrics.record("exact", started, True)
+        self.cascade_metrics.record_exit("exact")
+        self.near_duplicate_cache.lookup(context_category or "general", question_for_processing)
+        return {"answer": f"{question} v{self.version}", "pid": os.getpid()}
+
+
+@pytest.fixture
+def pool():
+    pool = AnswerProcessPool(PoolChatBot(), workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def test_answers_come_from_child_processes(pool):
+    decision = pool.answer("hola", "hola")
+    assert decision["answer"] == "hola v1"
+    assert decision["pid"] != os.getpid()
+
+
+def test_restart_picks_up_new_state(pool):
+    pool.chatbot.version = 2
+    pool.restart()
+    assert pool.answer("hola", "hola")["answer"] == "hola v2"
+    assert pool.get_stats()["restarts"] == 2
+
+
+def test_stats_are_collected_from_children(pool):
+    for i in range(6):
+        pool.answer(f"pregunta {i}", f"pregunta {i}")
+
+    # Las métricas del proceso principal no cambian
+    assert pool.chatbot.cascade_metrics.get_stats()["questions"] == 0
+
+    cascade = pool.get_cascade_stats()
+    assert cascade["questions"] == 6
+    assert cascade["stages"]["exact"]["runs"] == 6
+
+    near_duplicate = pool.get_near_duplicate_stats()
+    assert near_duplicate["misses"] == 6
+    assert near_duplicate["hit_rate"] == 0.0
+
+
+def test_stats_of_replaced_children_are_kept(pool):
+    pool.answer("uno", "uno")
+    pool.restart()
+    pool.answer("dos", "dos")
+    assert pool.get_cascade_stats()["questions"] == 2
+
+
+def test_answer_after_shutdown_raises_closed_error(pool):
+    pool.shutdown()
+    with pytest.raises(AnswerPoolClosedError):
+        pool.answer("hola", "hola")
+    # Un reinicio tardío (p.ej. de un reentrenamiento) no vuelve a crear procesos
+    pool.restart()
+    assert pool.executor is None
+
+
+def test_restart_from_another_thread_runs_on_the_loop():
+    forks = []
+
+    async def scenario():
+        pool = AnswerProcessPool(PoolChatBot(), workers=1)
+        original = pool._restart
+
+        def recording_restart():
+            forks.append(threading.current_thread() is threading.main_thread())
+            original()
+
+        pool._restart = recording_restart
+        try:
+            thread = threading.Thread(target=pool.restart)
+            thread.start()
+            thread.join(5)
+            # Desde otro hilo solo se programa; el fork ocurre en el loop
+            assert forks == []
+            while not forks:
+                await asyncio.sleep(0.01)
+            return pool.get_stats()["restarts"]
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(scenario()) == 2
+    assert forks == [True]
+
+
+class ClosedPoolChatBot:
+    """ChatBot cuyo pool se detuvo con una pregunta en curso"""
+
+    answer_pool = None
+    use_spacy = False
+
+    def process_question(self, question, session_id):
+        raise AnswerPoolClosedError("El pool de procesos está detenido")
+
+    def get_warmup_status(self):
+        return {"state": "done"}
+
+
+def test_closed_pool_maps_to_503(monkeypatch):
+    monkeypatch.delenv("CHATBOT_EXECUTION_MODE", raising=False)
+    app = create_app(chatbot=ClosedPoolChatBot())
+    with TestClient(app) as client:
+        response = client.post("/chatbot/query", json={"question": "hola", "session_id": "s"})
+    assert response.status_code == 503
+    assert response.json()["detail"]["error"] == "SHUTTING_DOWN"
+    assert response.headers["Retry-After"] == "5"
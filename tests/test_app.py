@@ -0,0 +1,174 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import src.main
+from src.main import create_app
+
+
+class StubRateLimiter:
+    max_requests = 2
+    window_seconds = 10
+
+
+class StubChatBot:
+    """Lo minimo que usan create_app y los endpoints, sin base ni modelos"""
+
+    def __init__(self, warmup_gate: threading.Event = None):
+        self.rate_limiter = StubRateLimiter()
+        self.answer_pool = None
+        self.use_spacy = False
+        self.warmup_gate = warmup_gate
+        self.warmup_state = "pending"
+        self.questions = []
+
+    def process_question(self, question, session_id):
+        self.questions.append((question, session_id))
+        if question == "demasiadas":
+            return {"answer": "Espera", "rate_limited": True, "wait_time": 5}
+        return {
+            "answer": f"respuesta a {question}",
+            "confidence": 0.9,
+            "source": "books",
+            "entities": {"resources": ["libro"]},
+            "alternatives": [{"answer": "otra", "confidence": 0.4, "source": "general"}],
+            "session_id": session_id,
+            "rate_limited": False,
+            "rate_limit_remaining": 1
+        }
+
+    def warmup(self, questions=None):
+        self.warmup_state = "running"
+        if self.warmup_gate is not None:
+            self.warmup_gate.wait(5)
+        self.warmup_state = "done"
+        return self.get_warmup_status()
+
+    def get_warmup_status(self):
+        return {"state": self.warmup_state}
+
+    def get_readiness(self):
+        return {
+            "ready": self.warmup_state == "done",
+            "components": {"warmup": self.warmup_state},
+            "warmup": self.get_warmup_status()
+        }
+
+
+def wait_for(client, path, status_code, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get(path)
+        if response.status_code == status_code or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+
+@pytest.fixture(autouse=True)
+def default_environment(monkeypatch):
+    for name in ("CHATBOT_WARMUP", "CHATBOT_WARMUP_FILE", "CHATBOT_EXECUTION_MODE",
+                 "CHATBOT_BACKGROUND_STARTUP"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_query_uses_injected_chatbot():
+    chatbot = StubChatBot()
+    with TestClient(create_app(chatbot=chatbot)) as client:
+        response = client.post("/chatbot/query", json={"question": "libros", "session_id": "s1"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["answer"] == "respuesta a libros"
+        assert body["source"] == "books"
+        assert body["alternatives"][0]["answer"] == "otra"
+        assert response.headers["X-RateLimit-Limit"] == "2"
+        assert response.headers["X-Session-ID"] == "s1"
+        assert chatbot.questions == [("libros", "s1")]
+
+        assert client.app.state.executor.get_stats()["completed"] == 1
+
+
+def test_query_rate_limited():
+    with TestClient(create_app(chatbot=StubChatBot())) as client:
+        response = client.post("/chatbot/query", json={"question": "demasiadas", "session_id": "s1"})
+        assert response.status_code == 429
+        assert response.json()["detail"]["error"] == "TOO_MANY_REQUESTS"
+
+
+def test_ready_waits_for_warmup():
+    gate = threading.Event()
+    chatbot = StubChatBot(warmup_gate=gate)
+    with TestClient(create_app(chatbot=chatbot)) as client:
+        response = client.get("/chatbot/ready")
+        assert response.status_code == 503
+        assert response.json()["ready"] is False
+        assert response.json()["components"]["chatbot"] == "ready"
+
+        # Las consultas se atienden mientras el calentamiento sigue
+        assert client.post("/chatbot/query", json={"question": "x", "session_id": "s"}).status_code == 200
+
+        gate.set()
+        response = wait_for(client, "/chatbot/ready", 200)
+        assert response.status_code == 200
+        assert response.json()["components"] == {"chatbot": "ready", "warmup": "done"}
+
+
+def test_warmup_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("CHATBOT_WARMUP", "false")
+    received = []
+
+    class RecordingChatBot(StubChatBot):
+        def warmup(self, questions=None):
+            received.append(questions)
+            return super().warmup(questions)
+
+    with TestClient(create_app(chatbot=RecordingChatBot())) as client:
+        assert wait_for(client, "/chatbot/ready", 200).status_code == 200
+    assert received == [[]]
+
+
+def test_background_startup_answers_503_until_built(monkeypatch):
+    gate = threading.Event()
+    chatbot = StubChatBot()
+
+    def slow_build():
+        gate.wait(5)
+        return chatbot
+
+    monkeypatch.setattr(src.main, "build_chatbot", slow_build)
+
+    with TestClient(create_app(background=True)) as client:
+        response = client.post("/chatbot/query", json={"question": "x", "session_id": "s"})
+        assert response.status_code == 503
+        assert response.json()["detail"]["error"] == "STARTING"
+        assert response.headers["Retry-After"] == "5"
+
+        response = client.get("/chatbot/ready")
+        assert response.status_code == 503
+        assert response.json()["components"] == {"chatbot": "starting"}
+        assert client.get("/chatbot/health").json()["status"] == "starting"
+
+        gate.set()
+        assert wait_for(client, "/chatbot/ready", 200).status_code == 200
+        assert client.app.state.chatbot is chatbot
+
+
+def test_background_startup_failure(monkeypatch):
+    def failing_build():
+        raise RuntimeError("sin base")
+
+    monkeypatch.setattr(src.main, "build_chatbot", failing_build)
+
+    with TestClient(create_app(background=True)) as client:
+        deadline = time.monotonic() + 5
+        while client.app.state.startup_error is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        response = client.get("/chatbot/ready")
+        assert response.status_code == 503
+        assert response.json()["components"] == {"chatbot": "failed"}
+        assert response.json()["error"] == "sin base"
+        detail = client.post("/chatbot/query", json={"question": "x", "session_id": "s"}).json()["detail"]
+        assert detail["error"] == "STARTUP_FAILED"
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+from src.chatbot.cascade import CASCADE_STAGES, CascadeMetrics
+
+
+class RecordingMetrics(CascadeMetrics):
+    """CascadeMetrics que además guarda el orden de las etapas ejecutadas"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def record(self, stage, started, decided):
+        self.calls.append((stage, decided))
+        return super().record(stage, started, decided)
+
+    def record_exit(self, stage):
+        self.calls.append(("exit", stage))
+        super().record_exit(stage)
+
+
+@pytest.fixture
+def metrics(chatbot):
+    chatbot.cascade_metrics = RecordingMetrics()
+    return chatbot.cascade_metrics
+
+
+def answer(chatbot, question, context_category=None):
+    return chatbot._answer_question(question, chatbot.matcher.normalize_text(question), context_category)
+
+
+def test_exact_question_exits_at_the_first_stage(chatbot, metrics):
+    decision = answer(chatbot, "¿Puedo entregar un libro tarde?")
+    category, rule_id = chatbot.knowledge_base.get_exact("puedo entregar un libro tarde")
+
+    assert metrics.calls == [("exact", True), ("exit", "exact")]
+    assert decision["stage"] == "exact"
+    assert decision["answer"] == chatbot.knowledge_base.get_knowledge(category)[rule_id]["respuesta"]
+
+
+def test_stages_run_in_order_until_one_decides(chatbot, metrics):
+    for question in chatbot.warmup_questions + ["mi pc no enciende", "zzz qqq"]:
+        metrics.calls = []
+        decision = answer(chatbot, question)
+
+        stages = [stage for stage, _ in metrics.calls if stage != "exit"]
+        assert stages == sorted(stages, key=CASCADE_STAGES.index), question
+        assert metrics.calls[-1] == ("exit", decision["stage"])
+        # Ninguna de estas preguntas está en la base tal cual
+        assert metrics.calls[0] == ("exact", False)
+        assert stages[1] == "keyword"
+        if decision["stage"] == "token":
+            assert stages[2:] == ["token"]
+        else:
+            assert stages[-2:] == ["priors", "global"]
+
+
+def test_keyword_stage_records_exclusive_words(chatbot, metrics):
+    answer(chatbot, "mi pc no enciende")
+    assert ("keyword", True) in metrics.calls
+
+    metrics.calls = []
+    answer(chatbot, "zzz qqq")
+    assert ("keyword", False) in metrics.calls
+
+
+def test_disabled_cascade_goes_straight_to_the_global_search(chatbot, metrics):
+    chatbot.enable_cascade = False
+    decision = answer(chatbot, "¿Puedo entregar un libro tarde?")
+
+    assert [stage for stage, _ in metrics.calls] == ["priors", "global", "exit"]
+    assert decision["stage"] == "global"
+
+
+def test_token_stage_picks_the_rule_of_the_full_category_search(chatbot):
+    questions = [p for knowledge in chatbot.knowledge_base.knowledge.values()
+                 for rule in knowledge.values() for p in rule["preguntas"]]
+    # Variantes que no son coincidencias exactas
+    questions = [f"{question} por favor" for question in questions] + \
+        [" ".join(question.split()[1:]) for question in questions]
+
+    separated = 0
+    for question in questions:
+        analysis = chatbot.analyze_question(question)
+        category = chatbot._categorize(analysis.normalized, analysis=analysis)[0]
+        result = chatbot._token_stage(category, analysis)
+        if result is None:
+            continue
+
+        separated += 1
+        knowledge = chatbot.knowledge_base.get_knowledge(category)
+        rule_id, confidence = chatbot._search_category(category, analysis, list(knowledge))
+        assert result == (knowledge[rule_id]["respuesta"], confidence), question
+    assert separated > 0
+
+
+def test_snapshots_merge_into_totals():
+    child_a, child_b, parent = CascadeMetrics(), CascadeMetrics(), CascadeMetrics()
+    child_a.record("exact", time.perf_counter(), True)
+    child_a.record_exit("exact")
+    child_b.record("exact", time.perf_counter(), False)
+    child_b.record("global", time.perf_counter(), True)
+    child_b.record_exit("global")
+
+    parent.merge(child_a.snapshot())
+    parent.merge(child_b.snapshot())
+    stats = parent.get_stats()
+
+    assert stats["questions"] == 2
+    assert stats["stages"]["exact"]["runs"] == 2
+    assert stats["stages"]["exact"]["decided"] == 1
+    assert stats["stages"]["global"]["exits"] == 1
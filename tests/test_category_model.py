@@ -0,0 +1,145 @@
+import contextlib
+import io
+import os
+
+import numpy as np
+import pytest
+
+from src.chatbot.category_model import CLASSIFIER_PARAMS, LinearCategoryModel, RuleModel, build_vectorizer
+from src.chatbot.knowledge_base import KnowledgeBase
+from src.chatbot.matcher import QueryMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Las probabilidades se calculan con otra suma de punto flotante que sklearn
+TOLERANCE = 1e-9
+
+FEATURE_CONFIGURATIONS = [
+    pytest.param("tfidf", None, id="tfidf"),
+    pytest.param("hashing", 2 ** 12, id="hashing-2^12"),
+    pytest.param("hashing", 2 ** 14, id="hashing-2^14"),
+]
+
+PROBES = [
+    "",
+    "zzz",
+    "horario de la biblioteca",
+    "como reservo un cubiculo",
+    "multa por devolver un libro tarde",
+    "prestan computadoras",
+    "hola biblio",
+]
+
+
+@pytest.fixture(scope="module")
+def training_data():
+    """Preguntas normalizadas, categoria y regla, como ChatBot._classifier_training_data"""
+    matcher = QueryMatcher(os.path.join(ROOT, "synonyms"))
+    knowledge_base = KnowledgeBase(os.path.join(ROOT, "knowledge"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        knowledge_base.load_all_knowledge(matcher)
+
+    texts, labels, rules = [], [], []
+    for category, knowledge in knowledge_base.knowledge.items():
+        for rule_id, rule_data in knowledge.items():
+            for pregunta in rule_data.get("preguntas", []):
+                normalized = matcher.normalize_text(pregunta)
+                if normalized and len(normalized) > 3:
+                    texts.append(normalized)
+                    labels.append(category)
+                    rules.append((category, rule_id))
+    return texts, labels, rules
+
+
+def _fit(feature_mode, n_features, texts, labels, **vectorizer_changes):
+    from sklearn.linear_model import LogisticRegression
+
+    vectorizer, _ = build_vectorizer(feature_mode, n_features or 2 ** 14)
+    vectorizer.set_params(**vectorizer_changes)
+    classifier = LogisticRegression(**CLASSIFIER_PARAMS)
+    classifier.fit(vectorizer.fit_transform(texts), labels)
+    return vectorizer, classifier
+
+
+def _assert_matches_sklearn(model, vectorizer, classifier, texts):
+    for text in texts:
+        X = vectorizer.transform([text])
+        expected = classifier.predict_proba(X)[0]
+
+        np.testing.assert_allclose(model.predict_proba(text), expected, rtol=0, atol=TOLERANCE, err_msg=text)
+        np.testing.assert_allclose(model.decision_function(text).ravel(),
+                                   classifier.decision_function(X).ravel(), rtol=0, atol=TOLERANCE)
+
+        label, probability = model.predict(text)
+        assert label == classifier.predict(X)[0], text
+        assert probability == pytest.approx(expected.max(), abs=TOLERANCE)
+
+
+@pytest.mark.parametrize("feature_mode, n_features", FEATURE_CONFIGURATIONS)
+def test_predictions_match_sklearn(training_data, feature_mode, n_features):
+    texts, labels, _ = training_data
+    vectorizer, classifier = _fit(feature_mode, n_features, texts, labels)
+    model = LinearCategoryModel(vectorizer, classifier)
+
+    assert model.fast_path
+    assert model.hashing == (feature_mode == "hashing")
+    _assert_matches_sklearn(model, vectorizer, classifier, texts + PROBES)
+
+
+@pytest.mark.parametrize("feature_mode, n_features", FEATURE_CONFIGURATIONS)
+def test_features_match_vectorizer(training_data, feature_mode, n_features):
+    texts, labels, _ = training_data
+    vectorizer, classifier = _fit(feature_mode, n_features, texts, labels)
+    model = LinearCategoryModel(vectorizer, classifier)
+
+    for text in texts + PROBES:
+        row = vectorizer.transform([text]).tocsr()
+        row.sort_indices()
+        indices, values = model.features(text)
+        np.testing.assert_array_equal(indices, row.indices)
+        np.testing.assert_allclose(values, row.data, rtol=0, atol=1e-12)
+
+
+def test_hashing_with_alternate_sign_matches_sklearn(training_data):
+    # Con signo alterno las colisiones de signo opuesto se cancelan
+    texts, labels, _ = training_data
+    vectorizer, classifier = _fit("hashing", 2 ** 8, texts, labels, alternate_sign=True)
+    model = LinearCategoryModel(vectorizer, classifier)
+    _assert_matches_sklearn(model, vectorizer, classifier, texts + PROBES)
+
+
+def test_binary_classifier_matches_sklearn(training_data):
+    texts, labels, _ = training_data
+    binary_labels = ["books" if label == "books" else "other" for label in labels]
+    vectorizer, classifier = _fit("tfidf", None, texts, binary_labels)
+    model = LinearCategoryModel(vectorizer, classifier)
+
+    assert model.binary
+    _assert_matches_sklearn(model, vectorizer, classifier, texts + PROBES)
+
+
+@pytest.mark.parametrize("feature_mode, n_features", FEATURE_CONFIGURATIONS)
+def test_rule_model_top_k_matches_sklearn_ranking(training_data, feature_mode, n_features):
+    from sklearn.linear_model import LogisticRegression
+
+    texts, labels, rules = training_data
+    vectorizer, _ = _fit(feature_mode, n_features, texts, labels)
+    rule_labels = sorted(set(rules))
+    rule_index = {rule: index for index, rule in enumerate(rule_labels)}
+    classifier = LogisticRegression(**CLASSIFIER_PARAMS)
+    classifier.fit(vectorizer.transform(texts), [rule_index[rule] for rule in rules])
+    model = RuleModel(vectorizer, classifier, rule_labels)
+
+    for text in texts[::7] + PROBES:
+        expected = classifier.predict_proba(vectorizer.transform([text]))[0]
+        top = model.top_k(text, 5)
+        assert [probability for _, _, probability in top] == \
+            pytest.approx(sorted(expected, reverse=True)[:5], abs=TOLERANCE)
+        for category, rule_id, probability in top:
+            assert expected[rule_index[(category, rule_id)]] == pytest.approx(probability, abs=TOLERANCE)
+
+        in_category = model.top_k(text, 3, category="books")
+        assert len(in_category) == 3
+        assert all(category == "books" for category, _, _ in in_category)
+
+    assert model.top_k("libro", 5, category="inexistente") == []
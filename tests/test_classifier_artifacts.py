@@ -0,0 +1,138 @@
+import contextlib
+import io
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def models_workdir(tmp_path):
+    # Directorio de modelos propio (vacío) para ver qué archivos se escriben
+    return tmp_path
+
+
+def saved_files(chatbot):
+    return sorted(os.listdir(chatbot.ml_model_dir))
+
+
+def test_filename_includes_the_feature_mode(chatbot):
+    [filename] = saved_files(chatbot)
+    assert filename.startswith("category_classifier_tfidf_")
+    assert chatbot._classifier_artifacts_path("0" * 64).endswith("category_classifier_tfidf_0000000000000000.pkl")
+
+
+def test_save_keeps_artifacts_of_other_feature_modes(chatbot):
+    [tfidf_file] = saved_files(chatbot)
+    other_mode = os.path.join(chatbot.ml_model_dir, "category_classifier_hashing_0123456789abcdef.pkl")
+    unrelated = os.path.join(chatbot.ml_model_dir, "otro_modelo.pkl")
+    for path in (other_mode, unrelated):
+        with open(path, "wb") as f:
+            f.write(b"x")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        chatbot._save_classifier_artifacts("f" * 64, {"ml_model": None})
+
+    # Solo se reemplaza la versión anterior del mismo modo
+    assert saved_files(chatbot) == [
+        "category_classifier_hashing_0123456789abcdef.pkl",
+        "category_classifier_tfidf_ffffffffffffffff.pkl",
+        "otro_modelo.pkl"
+    ]
+    assert tfidf_file != "category_classifier_tfidf_ffffffffffffffff.pkl"
+
+
+def build_again(chatbot):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return type(chatbot)(
+            knowledge_path=chatbot.knowledge_base.knowledge_path,
+            synonyms_path=chatbot.matcher.synonyms_path,
+            use_spacy=False
+        )
+
+
+def test_second_start_loads_the_saved_model(chatbot):
+    assert chatbot.get_ml_training_status()["source"] == "trained"
+
+    restarted = build_again(chatbot)
+    assert restarted.get_ml_training_status()["source"] == "loaded"
+    assert saved_files(restarted) == saved_files(chatbot)
+
+    texts, _, _ = chatbot._classifier_training_data()
+    for text in texts:
+        assert restarted.ml_model.predict(text) == chatbot.ml_model.predict(text)
+
+
+def test_key_depends_on_training_data_and_configuration(chatbot):
+    texts, labels, rules = chatbot._classifier_training_data()
+    params = ({"a": 1}, {"b": 2})
+    key = chatbot._classifier_artifacts_key(texts, labels, rules, *params)
+
+    assert chatbot._classifier_artifacts_key(texts, labels, rules, *params) == key
+    assert chatbot._classifier_artifacts_key(texts[:-1], labels[:-1], rules[:-1], *params) != key
+    assert chatbot._classifier_artifacts_key(texts, labels, rules, {"a": 2}, params[1]) != key
+
+    chatbot.ml_feature_mode = "hashing"
+    assert chatbot._classifier_artifacts_key(texts, labels, rules, *params) != key
+
+
+def test_unreadable_or_foreign_artifacts_are_retrained(chatbot):
+    [filename] = saved_files(chatbot)
+    filepath = os.path.join(chatbot.ml_model_dir, filename)
+
+    with open(filepath, "wb") as f:
+        f.write(b"no es un pickle")
+    assert build_again(chatbot).get_ml_training_status()["source"] == "trained"
+
+    # Un archivo con otra llave en la misma ruta tampoco se usa
+    with open(filepath, "rb") as f:
+        artifacts = pickle.load(f)
+    artifacts["key"] = "otra"
+    with open(filepath, "wb") as f:
+        pickle.dump(artifacts, f)
+    assert build_again(chatbot).get_ml_training_status()["source"] == "trained"
+
+
+def test_concurrent_retrains_are_coalesced(chatbot):
+    release = threading.Event()
+    started = threading.Event()
+    trainings = []
+
+    def blocking_train():
+        trainings.append(threading.current_thread().name)
+        started.set()
+        release.wait(5)
+        return True
+
+    chatbot._train_classifier = blocking_train
+    chatbot.retrain_classifier_async()
+    assert started.wait(5)
+
+    # Las recargas durante un entrenamiento se juntan en un solo reentrenamiento
+    for _ in range(5):
+        assert chatbot.retrain_classifier_async()["pending_retrain"] is True
+
+    thread = chatbot.ml_training_thread
+    release.set()
+    thread.join(5)
+
+    assert trainings == ["ml-classifier-retrain"] * 2
+    assert chatbot.ml_training_thread is None
+    assert chatbot.get_ml_training_status()["pending_retrain"] is False
+
+
+def test_retrain_swaps_the_model_and_flushes_caches(chatbot):
+    model = chatbot.ml_model
+    flushes = chatbot.answer_cache.flushes, chatbot.near_duplicate_cache.flushes
+
+    chatbot.retrain_classifier_async()
+    deadline = time.time() + 30
+    while chatbot.ml_training_thread is not None and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert chatbot.ml_model is not model
+    assert chatbot.get_ml_training_status()["state"] == "ready"
+    assert chatbot.answer_cache.flushes == flushes[0] + 1
+    assert chatbot.near_duplicate_cache.flushes == flushes[1] + 1
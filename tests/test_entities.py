@@ -0,0 +1,71 @@
+import json
+
+from src.chatbot.matcher import QueryMatcher
+
+
+def extract_reference(words):
+    """extract_entities antes de la tabla palabra -> tipo (conjuntos fijos en cadena if/elif)"""
+    entities = {"locations": [], "resources": [], "actions": [], "time_related": [], "urgency": []}
+    location_keywords = {"cubiculo", "sala", "cabina", "espacio", "area"}
+    resource_keywords = {"libro", "computadora", "ordenador", "texto", "obra", "volumen"}
+    action_keywords = {"reservar", "prestar", "devolver", "usar", "utilizar", "solicitar"}
+    time_keywords = {"hora", "dia", "plazo", "tiempo", "minuto"}
+    urgency_keywords = {"urgente", "problema", "multa", "cobro", "error", "emergencia"}
+
+    for word in words:
+        word_lower = word.lower()
+        if word_lower in location_keywords and word_lower not in entities["locations"]:
+            entities["locations"].append(word_lower)
+        elif word_lower in resource_keywords and word_lower not in entities["resources"]:
+            entities["resources"].append(word_lower)
+        elif word_lower in action_keywords and word_lower not in entities["actions"]:
+            entities["actions"].append(word_lower)
+        elif word_lower in time_keywords and word_lower not in entities["time_related"]:
+            entities["time_related"].append(word_lower)
+        elif word_lower in urgency_keywords and word_lower not in entities["urgency"]:
+            entities["urgency"].append(word_lower)
+
+    return {k: v for k, v in entities.items() if v}
+
+
+def test_matches_previous_extraction_on_knowledge_questions(chatbot):
+    questions = [p for knowledge in chatbot.knowledge_base.knowledge.values()
+                 for rule in knowledge.values() for p in rule["preguntas"]]
+    questions += ["reservar una sala y un cubiculo a la hora de la multa", "libro libro texto"]
+
+    for question in questions:
+        analysis = chatbot.analyze_question(question)
+        expected = extract_reference(analysis.tokens + analysis.entity_lemmas)
+        assert chatbot.extract_entities(question, analysis) == expected, question
+
+
+def test_order_follows_types_then_first_appearance(chatbot):
+    entities = chatbot.extract_entities("multa por el libro y la sala, otra multa y el texto")
+    assert list(entities) == ["locations", "resources", "urgency"]
+    assert entities["resources"] == ["libro", "texto"]
+    assert entities["urgency"] == ["multa"]
+
+
+def test_exact_stage_entities_match_analysis(chatbot):
+    for normalized, entities in chatbot._exact_entities.items():
+        assert entities == chatbot.extract_entities(normalized)
+
+
+def test_lexicon_file_is_normalized_and_first_type_wins(chatbot, tmp_path, capsys):
+    (tmp_path / "entities.json").write_text(json.dumps({
+        "places": ["Cubículo", "Sala"],
+        "things": ["sala", "Libro"]
+    }), encoding="utf-8")
+
+    entity_types, entity_lookup = chatbot._load_entity_lexicon(QueryMatcher(str(tmp_path)))
+    assert entity_types == ["places", "things"]
+    assert entity_lookup == {"cubiculo": "places", "sala": "places", "libro": "things"}
+
+    entities = chatbot._entities_from_words(["sala", "libro", "cubiculo"], [], entity_types, entity_lookup)
+    assert entities == {"places": ["sala", "cubiculo"], "things": ["libro"]}
+
+
+def test_missing_lexicon_uses_default_types(chatbot, tmp_path, capsys):
+    entity_types, entity_lookup = chatbot._load_entity_lexicon(QueryMatcher(str(tmp_path)))
+    assert entity_types == ["locations", "resources", "actions", "time_related", "urgency"]
+    assert entity_lookup["computadora"] == "resources"
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.api.executor import QueryExecutor, QueueFullError
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_inline_mode_runs_on_the_calling_thread():
+    executor = QueryExecutor(mode="inline")
+    caller = threading.get_ident()
+
+    assert run(executor.run(threading.get_ident)) == caller
+    stats = executor.get_stats()
+    assert stats["mode"] == "inline"
+    assert stats["completed"] == 1
+    assert executor.pool is None
+
+
+def test_thread_mode_runs_in_the_pool():
+    executor = QueryExecutor(mode="thread", max_workers=2)
+    caller = threading.get_ident()
+    try:
+        assert run(executor.run(threading.get_ident)) != caller
+        assert run(executor.run(lambda a, b: a + b, 2, 3)) == 5
+        assert executor.get_stats()["completed"] == 2
+    finally:
+        executor.shutdown()
+
+
+def test_unknown_mode_falls_back_to_thread():
+    executor = QueryExecutor(mode="otro")
+    try:
+        assert executor.mode == "thread"
+        assert executor.pool is not None
+    finally:
+        executor.shutdown()
+
+
+def test_exceptions_propagate_and_count_as_completed():
+    executor = QueryExecutor(mode="thread", max_workers=1)
+
+    def fail():
+        raise ValueError("falla")
+
+    try:
+        with pytest.raises(ValueError):
+            run(executor.run(fail))
+        assert executor.get_stats()["completed"] == 1
+        assert executor.get_stats()["running"] == 0
+    finally:
+        executor.shutdown()
+
+
+def test_queue_limit_rejects_excess_calls():
+    executor = QueryExecutor(mode="thread", max_workers=1, max_queue=2)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    async def scenario():
+        # Una llamada ocupa el unico hilo y dos esperan en la cola
+        running = asyncio.ensure_future(executor.run(blocking))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        waiting = [asyncio.ensure_future(executor.run(blocking)) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert executor.get_stats()["queue_depth"] == 2
+
+        with pytest.raises(QueueFullError):
+            await executor.run(blocking)
+
+        release.set()
+        return await asyncio.gather(running, *waiting)
+
+    try:
+        assert run(scenario()) == ["ok", "ok", "ok"]
+        stats = executor.get_stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 3
+        assert stats["max_queue_depth"] == 2
+        assert stats["queue_depth"] == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_cancelled_call_leaves_the_queue():
+    executor = QueryExecutor(mode="thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(blocking))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        waiting = asyncio.ensure_future(executor.run(blocking))
+        await asyncio.sleep(0)
+        assert executor.get_stats()["queue_depth"] == 1
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert executor.get_stats()["queue_depth"] == 0
+
+        release.set()
+        await running
+
+    try:
+        run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
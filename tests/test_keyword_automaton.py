@@ -0,0 +1,97 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.chatbot.keyword_automaton import KeywordAutomaton
+
+
+def find_reference(patterns, text, suffixes=("s", "es")):
+    """Busqueda ingenua: cada patron en cada posición, con la misma regla de límites"""
+    hits = []
+    for pattern, payload in patterns:
+        start = text.find(pattern)
+        while start >= 0:
+            end = start + len(pattern)
+            if start == 0 or text[start - 1] == " ":
+                if end == len(text) or text[end] == " ":
+                    hits.append((start, end, payload))
+                else:
+                    for suffix in suffixes:
+                        suffix_end = end + len(suffix)
+                        if text.startswith(suffix, end) and (suffix_end == len(text) or text[suffix_end] == " "):
+                            hits.append((start, suffix_end, payload))
+                            break
+            start = text.find(pattern, start + 1)
+    return hits
+
+
+def build(patterns):
+    automaton = KeywordAutomaton()
+    for pattern, payload in patterns:
+        automaton.add(pattern, payload)
+    automaton.build()
+    return automaton
+
+
+def test_matches_only_whole_words():
+    automaton = build([("pc", "pc"), ("red", "red")])
+    assert automaton.find_all("tengo una pc") == [(10, 12, "pc")]
+    assert automaton.find_all("pcs de la red") == [(0, 3, "pc"), (10, 13, "red")]
+    # Dentro de otras palabras ya no coincide
+    assert automaton.find_all("epcot credencial redondo") == []
+
+
+def test_accepts_plural_suffixes():
+    automaton = build([("libro", "libro"), ("impresora", "impresora"), ("red", "red")])
+    assert automaton.find_all("libros") == [(0, 6, "libro")]
+    assert automaton.find_all("impresoras") == [(0, 10, "impresora")]
+    assert automaton.find_all("redes") == [(0, 5, "red")]
+    assert automaton.find_all("libroes librosa") == [(0, 7, "libro")]
+
+
+def test_overlapping_and_multiword_patterns():
+    automaton = build([("que haces", 1), ("haces", 2), ("que", 3), ("como usar", 4)])
+    hits = automaton.find_all("que haces y como usar")
+    assert sorted(hits) == [(0, 3, 3), (0, 9, 1), (4, 9, 2), (12, 21, 4)]
+
+
+def test_empty_pattern_is_ignored():
+    automaton = build([("", "vacio"), ("libro", "libro")])
+    assert automaton.patterns == 1
+    assert automaton.find_all("") == []
+
+
+def test_matches_reference_with_category_keywords(chatbot):
+    normalize = chatbot.matcher.normalize_text
+    patterns = []
+    for category, data in chatbot.category_keywords.items():
+        for palabra in data["exclusivas"] + data["palabras"]:
+            patterns.append((normalize(palabra), (category, palabra)))
+    automaton = build(patterns)
+
+    vocabulary = sorted({word for pattern, _ in patterns for word in pattern.split()})
+    generator = random.Random(7)
+    texts = [normalize(p) for knowledge in chatbot.knowledge_base.knowledge.values()
+             for rule in knowledge.values() for p in rule["preguntas"]]
+    for _ in range(300):
+        words = generator.choices(vocabulary + ["la", "de", "es", "s", "xpc"], k=generator.randint(1, 8))
+        texts.append(" ".join(word + generator.choice(["", "", "s", "es", "x"]) for word in words))
+
+    for text in texts:
+        assert Counter(automaton.find_all(text)) == Counter(find_reference(patterns, text)), text
+
+
+@pytest.mark.parametrize("question, category", [
+    ("quiero reservar un cubiculo", "cubicles"),
+    ("mi pc no enciende", "computers"),
+    ("hay wc", "general"),
+    ("los libros de ese autor", "books"),
+])
+def test_exclusive_keyword_fixes_the_category(chatbot, question, category):
+    assert chatbot._categorize(question)[:2] == (category, 1.0)
+
+
+def test_exclusive_priority_follows_category_order(chatbot):
+    # "libro" (books) se agrega al automata antes que "computadora" (computers)
+    assert chatbot._categorize("computadora para buscar un libro")[0] == "books"
@@ -0,0 +1,99 @@
+import pytest
+
+from src.chatbot.near_duplicate import NearDuplicateCache
+
+
+def test_exact_and_near_duplicate_texts_hit():
+    cache = NearDuplicateCache()
+    cache.store("books", "cuantos libros puedo pedir prestados", ["regla"])
+
+    assert cache.lookup("books", "cuantos libros puedo pedir prestados")[0] == ["regla"]
+    assert cache.lookup("books", "cuantos libros puedo pedir prestado")[0] == ["regla"]
+    assert cache.lookup("books", "donde estan los cubiculos")[0] is None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_lookups_are_scoped_by_category():
+    cache = NearDuplicateCache()
+    cache.store("books", "cuantos libros puedo pedir prestados", ["books"])
+
+    assert cache.lookup("cubicles", "cuantos libros puedo pedir prestados")[0] is None
+    assert cache.lookup("cubicles", "cuantos libros puedo pedir prestado")[0] is None
+
+    cache.store("cubicles", "cuantos libros puedo pedir prestados", ["cubicles"])
+    assert cache.lookup("books", "cuantos libros puedo pedir prestado")[0] == ["books"]
+    assert cache.lookup("cubicles", "cuantos libros puedo pedir prestado")[0] == ["cubicles"]
+
+
+def test_similarity_threshold_is_respected():
+    strict = NearDuplicateCache(threshold=1.0)
+    strict.store("books", "renovar un libro", ["regla"])
+    assert strict.lookup("books", "renovar un libros")[0] is None
+    assert strict.lookup("books", "renovar un libro")[0] == ["regla"]
+
+
+def test_eviction_removes_entry_and_its_buckets():
+    cache = NearDuplicateCache(max_size=2)
+    cache.store("books", "renovar un libro", 1)
+    cache.store("books", "multa por retraso", 2)
+    cache.lookup("books", "renovar un libro")
+    cache.store("books", "reservar cubiculo", 3)
+
+    assert cache.evictions == 1
+    assert set(cache.entries) == {("books", "renovar un libro"), ("books", "reservar cubiculo")}
+    assert cache.lookup("books", "multa por retraso")[0] is None
+
+    # Ninguna banda apunta a la entrada desalojada
+    indexed = set().union(*cache.buckets.values())
+    assert indexed == set(cache.entries)
+
+
+def test_store_replaces_existing_entry():
+    cache = NearDuplicateCache()
+    cache.store("books", "renovar un libro", 1)
+    cache.store("books", "renovar un libro", 2)
+
+    assert len(cache.entries) == 1
+    assert cache.lookup("books", "renovar un libro")[0] == 2
+
+
+def test_clear_discards_results_computed_before_it():
+    cache = NearDuplicateCache()
+    _, signature = cache.lookup("books", "renovar un libro")
+    generation = cache.generation
+    cache.store("books", "multa por retraso", 1)
+
+    assert cache.clear() == 1
+    assert cache.buckets == {}
+    assert cache.store("books", "renovar un libro", 2, signature, generation) is False
+    assert cache.lookup("books", "renovar un libro")[0] is None
+
+
+def test_bands_must_divide_permutations():
+    with pytest.raises(ValueError):
+        NearDuplicateCache(num_perm=64, bands=10)
+
+
+def search(chatbot, question, scope):
+    analysis = chatbot.analyze_question(question)
+    return chatbot.search_all(analysis.expanded_queries, analysis, {"computers": 0.8}, scope=scope)
+
+
+def test_search_all_rescores_cached_rules_for_the_new_query(chatbot):
+    search(chatbot, "necesito usar una computadora para imprimir", "computers")
+    hits = chatbot.near_duplicate_cache.hits
+
+    reused = search(chatbot, "necesito usar una computadora para imprimir ya", "computers")
+    full = search(chatbot, "necesito usar una computadora para imprimir ya", None)
+
+    assert chatbot.near_duplicate_cache.hits == hits + 1
+    # Las reglas se toman de la consulta anterior, pero el puntaje es el de esta
+    assert reused == full
+
+
+def test_search_all_does_not_share_rules_across_categories(chatbot):
+    search(chatbot, "necesito usar una computadora para imprimir", "computers")
+    hits = chatbot.near_duplicate_cache.hits
+
+    search(chatbot, "necesito usar una computadora para imprimir ya", "books")
+    assert chatbot.near_duplicate_cache.hits == hits
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from benchmarks.normalize_reference import knowledge_texts, normalize_reference
+from src.chatbot.matcher import QueryMatcher, _normalize_cached
+
+EDGE_CASES = [
+    "",
+    " ",
+    "\t\n",
+    "¿Cuál es el HORARIO?",
+    "ÁÉÍÓÚ Ü Ñ áéíóú ü ñ",
+    "¡¡Hola!!  ¿¿qué tal??",
+    "libro/revista - (préstamo) [urgente]; fin.",
+    "comillas \"dobles\" y 'simples'",
+    "guion_bajo se_mantiene",
+    "números 123 y 4.5 y 1,000",
+    "CONSEGUIR un cubículo, OBTENER un libro, TOMAR prestado",
+    "reconseguirlo obtenerse tomaremos",
+    "emoji 📚 y símbolos @#$%&*+=<>|~^`",
+    "espacios\u00a0no\u2003separables",
+    "àèìòù âêîôû ç",
+    "línea\r\nnueva\ttab",
+    "...",
+    "¿?¡!.,;:()[]\"'-/",
+]
+
+
+def random_texts(count: int = 5000, seed: int = 3):
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ áéíóúüñÁÉÍÓÚÜÑ ¿?¡!.,;:()[]\"'-/@#_\t\n0123456789"
+    fragments = ["conseguir", "obtener", "tomar", "CONSEGUIR", "cubículo", "préstamo"]
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 8)):
+            if rng.random() < 0.2:
+                parts.append(rng.choice(fragments))
+            else:
+                parts.append("".join(rng.choice(alphabet) for _ in range(rng.randint(0, 10))))
+        texts.append(rng.choice(["", " ", "  "]).join(parts))
+    return texts
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+def test_edge_cases_match_reference(text):
+    assert QueryMatcher("").normalize_text(text) == normalize_reference(text)
+
+
+def test_knowledge_base_matches_reference():
+    matcher = QueryMatcher("")
+    texts = knowledge_texts()
+    assert texts
+    for text in texts:
+        assert matcher.normalize_text(text) == normalize_reference(text), text
+
+
+def test_random_texts_match_reference():
+    matcher = QueryMatcher("")
+    for text in random_texts():
+        assert matcher.normalize_text(text) == normalize_reference(text), repr(text)
+
+
+def test_memo_returns_same_result():
+    _normalize_cached.cache_clear()
+    matcher = QueryMatcher("")
+    first = matcher.normalize_text("¿Cómo RESERVO un cubículo?")
+    second = matcher.normalize_text("¿Cómo RESERVO un cubículo?")
+    assert first == second == "como reservo un cubiculo"
+    assert _normalize_cached.cache_info().hits >= 1
@@ -0,0 +1,123 @@
+import threading
+import time
+
+from src.chatbot.rwlock import ReadWriteLock
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(3, timeout=5)
+
+    def reader():
+        with lock.read():
+            # Los tres lectores llegan aquí a la vez; con exclusión se bloquearía
+            inside.wait()
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not any(thread.is_alive() for thread in threads)
+
+
+def test_writer_excludes_readers_and_writers():
+    lock = ReadWriteLock()
+    active = []
+    overlaps = []
+    guard = threading.Lock()
+
+    def enter(kind):
+        with guard:
+            if "writer" in active or (kind == "writer" and active):
+                overlaps.append((kind, list(active)))
+            active.append(kind)
+
+    def leave(kind):
+        with guard:
+            active.remove(kind)
+
+    def reader():
+        for _ in range(200):
+            with lock.read():
+                enter("reader")
+                leave("reader")
+
+    def writer():
+        for _ in range(100):
+            with lock.write():
+                enter("writer")
+                time.sleep(0)
+                leave("writer")
+
+    threads = [threading.Thread(target=reader) for _ in range(4)] + \
+        [threading.Thread(target=writer) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert overlaps == []
+
+
+def test_waiting_writer_blocks_new_readers():
+    lock = ReadWriteLock()
+    order = []
+    reader_inside = threading.Event()
+    release_reader = threading.Event()
+
+    def first_reader():
+        with lock.read():
+            reader_inside.set()
+            release_reader.wait(5)
+            order.append("first reader")
+
+    def writer():
+        with lock.write():
+            order.append("writer")
+
+    def late_reader():
+        with lock.read():
+            order.append("late reader")
+
+    threads = [threading.Thread(target=first_reader)]
+    threads[0].start()
+    reader_inside.wait(5)
+
+    threads.append(threading.Thread(target=writer))
+    threads[1].start()
+    while not lock._writers_waiting:
+        time.sleep(0.001)
+
+    threads.append(threading.Thread(target=late_reader))
+    threads[2].start()
+    time.sleep(0.05)
+    # El lector nuevo espera detrás del escritor
+    assert order == []
+
+    release_reader.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["first reader", "writer", "late reader"]
+
+
+def test_lock_released_on_exception():
+    lock = ReadWriteLock()
+    for context in (lock.read, lock.write):
+        try:
+            with context():
+                raise RuntimeError("falla")
+        except RuntimeError:
+            pass
+
+    acquired = threading.Event()
+
+    def writer():
+        with lock.write():
+            acquired.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    thread.join(5)
+    assert acquired.is_set()
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+PRIORS = [
+    {},
+    {"books": 0.9},
+    {"computers": 0.6, "cubicles": 0.4, "general": 0.1},
+    {"biblio": 1.0, "general": 1.0},
+]
+
+
+def questions(chatbot, count=120):
+    phrases = [p for knowledge in chatbot.knowledge_base.knowledge.values()
+               for rule in knowledge.values() for p in rule["preguntas"]]
+    generator = random.Random(3)
+    variants = []
+    for phrase in generator.sample(phrases, count):
+        words = phrase.split()
+        generator.shuffle(words)
+        variants.append(" ".join(words[:generator.randint(1, len(words))]))
+    return variants + ["zzz", "hola", "horario de la biblioteca el sabado"]
+
+
+def score_every_rule(chatbot, analysis, weights):
+    """Puntaje exacto de cada regla por separado, en el orden de desempate de search_all"""
+    categories = sorted(weights, key=lambda category: -weights[category])
+    scored = []
+    for category in categories:
+        for rule_id in chatbot.knowledge_base.knowledge[category]:
+            found, confidence = chatbot._search_category(category, analysis, [rule_id])
+            if found is not None:
+                scored.append((category, rule_id, confidence, confidence * weights[category]))
+    return sorted(scored, key=lambda result: -result[3])
+
+
+@pytest.mark.parametrize("priors", PRIORS)
+@pytest.mark.parametrize("top_k", [1, 3, 10])
+def test_top_k_matches_scoring_every_rule(chatbot, priors, top_k):
+    for question in questions(chatbot):
+        analysis = chatbot.analyze_question(question)
+        weights = {category: 0.5 + priors.get(category, 0.0) * 0.5
+                   for category, knowledge in chatbot.knowledge_base.knowledge.items() if knowledge}
+
+        results = chatbot.search_all(analysis.expanded_queries, analysis, priors, top_k=top_k)
+        assert results == score_every_rule(chatbot, analysis, weights)[:top_k], question
+
+
+@pytest.mark.parametrize("priors", PRIORS)
+def test_best_result_matches_per_category_search(chatbot, priors):
+    # Antes: la mejor regla de cada categoría y después la de mayor confianza ponderada
+    for question in questions(chatbot):
+        analysis = chatbot.analyze_question(question)
+        best = None
+        for category, knowledge in chatbot.knowledge_base.knowledge.items():
+            rule_id, confidence = chatbot._search_category(category, analysis, list(knowledge))
+            ranked = confidence * (0.5 + priors.get(category, 0.0) * 0.5)
+            if rule_id is not None and (best is None or ranked > best[3]):
+                best = (category, rule_id, confidence, ranked)
+
+        results = chatbot.search_all(analysis.expanded_queries, analysis, priors, top_k=1)
+        if best is None:
+            assert results == []
+        else:
+            assert results[0][2:] == pytest.approx(best[2:]), question
@@ -0,0 +1,151 @@
+import contextlib
+import io
+import os
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+import src.chatbot.matcher
+from src.chatbot.knowledge_base import KnowledgeBase
+from src.chatbot.matcher import QueryMatcher
+from src.chatbot.similarity import char_masks, char_positions, lcs_length, ratio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# fallback_threshold por defecto de ChatBot
+FALLBACK_THRESHOLD = 0.25
+
+
+def _lcs_reference(a: str, b: str) -> int:
+    """LCS por programacion dinamica clasica"""
+    previous = [0] * (len(b) + 1)
+    for char_a in a:
+        current = [0]
+        for j, char_b in enumerate(b):
+            if char_a == char_b:
+                current.append(previous[j] + 1)
+            else:
+                current.append(max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+def _sequence_matcher_ratio(a, b, score_cutoff=0.0, masks=None, positions=None):
+    """ratio() de referencia con la misma firma"""
+    result = SequenceMatcher(None, a, b).ratio()
+    return result if result >= score_cutoff else 0.0
+
+
+@pytest.fixture(scope="module")
+def knowledge():
+    matcher = QueryMatcher(os.path.join(ROOT, "synonyms"))
+    knowledge_base = KnowledgeBase(os.path.join(ROOT, "knowledge"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        knowledge_base.load_all_knowledge(matcher)
+    return matcher, knowledge_base
+
+
+@pytest.fixture(scope="module")
+def kb_phrases(knowledge):
+    _, knowledge_base = knowledge
+    return sorted({
+        phrase["normalized"]
+        for rules in knowledge_base.compiled.values()
+        for rule_phrases in rules.values()
+        for phrase in rule_phrases
+    })
+
+
+def test_lcs_matches_dynamic_programming():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 40)))
+        b = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 40)))
+        assert lcs_length(a, b) == _lcs_reference(a, b)
+        assert lcs_length(a, b, masks=char_masks(a)) == _lcs_reference(a, b)
+
+
+def test_lcs_beyond_machine_word():
+    a = "reservar un cubiculo para estudiar en grupo " * 3
+    b = "quiero reservar una sala de estudio para mi grupo " * 3
+    assert lcs_length(a, b) == _lcs_reference(a, b)
+
+
+def test_ratio_edge_cases():
+    assert ratio("", "") == SequenceMatcher(None, "", "").ratio() == 1.0
+    assert ratio("abc", "") == 0.0
+    assert ratio("", "abc") == 0.0
+    assert ratio("horario", "horario") == 1.0
+
+
+def test_ratio_matches_sequence_matcher_on_random_strings():
+    rng = random.Random(5)
+    for _ in range(2000):
+        a = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 30)))
+        b = "".join(rng.choice("abcde ") for _ in range(rng.randint(0, 30)))
+        expected = SequenceMatcher(None, a, b).ratio()
+        assert ratio(a, b) == expected, (a, b)
+        assert ratio(a, b, masks=char_masks(b), positions=char_positions(b)) == expected
+
+
+def test_ratio_matches_sequence_matcher_with_autojunk():
+    # Desde 200 caracteres SequenceMatcher ignora los caracteres populares de b
+    rng = random.Random(9)
+    words = ["libro", "prestamo", "cubiculo", "reservar", "horario", "sala", "de", "la"]
+    for _ in range(50):
+        a = " ".join(rng.choice(words) for _ in range(rng.randint(5, 60)))
+        b = " ".join(rng.choice(words) for _ in range(rng.randint(40, 60)))
+        assert len(b) >= 200
+        assert ratio(a, b) == SequenceMatcher(None, a, b).ratio(), (a, b)
+
+
+def test_ratio_cutoff_is_exact_above_cutoff():
+    rng = random.Random(11)
+    words = ["libro", "prestamo", "cubiculo", "reservar", "horario", "computadora", "multa"]
+    for _ in range(300):
+        a = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        b = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        cutoff = rng.random()
+        exact = SequenceMatcher(None, a, b).ratio()
+        bounded = ratio(a, b, score_cutoff=cutoff)
+        if exact >= cutoff:
+            assert bounded == exact
+        else:
+            assert bounded == 0.0
+
+
+def test_ratio_matches_sequence_matcher_on_knowledge_base(kb_phrases):
+    assert kb_phrases
+    reference = SequenceMatcher(None)
+    for b in kb_phrases:
+        masks = char_masks(b)
+        positions = char_positions(b)
+        reference.set_seq2(b)
+        for a in kb_phrases:
+            reference.set_seq1(a)
+            assert ratio(a, b, masks=masks, positions=positions) == reference.ratio(), (a, b)
+
+
+def test_rule_scores_and_fallback_decisions_match_sequence_matcher(knowledge, monkeypatch):
+    matcher, knowledge_base = knowledge
+    questions = [
+        phrase
+        for rules in knowledge_base.compiled.values()
+        for rule_phrases in rules.values()
+        for phrase in rule_phrases
+    ]
+    rules = [rule_phrases for rules in knowledge_base.compiled.values() for rule_phrases in rules.values()]
+
+    def best_scores():
+        return [
+            max(matcher.calculate_similarity_compiled([question], rule_phrases) for rule_phrases in rules)
+            for question in questions
+        ]
+
+    scores = best_scores()
+    monkeypatch.setattr(src.chatbot.matcher, "ratio", _sequence_matcher_ratio)
+    reference = best_scores()
+
+    assert scores == reference
+    assert [s >= FALLBACK_THRESHOLD for s in scores] == [s >= FALLBACK_THRESHOLD for s in reference]